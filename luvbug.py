@@ -1,275 +1,4032 @@
-import tkinter as tk
-from tkinter import scrolledtext, messagebox, ttk
-import ccxt
-import pandas as pd
+import importlib
+import numpy as np
 import time
 import threading
-from queue import Queue
-from playsound import playsound
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from queue import Queue, Empty
+from collections import deque
 import os
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import json
+import random
+import math
+import copy
+import itertools
+import tracemalloc
+import signal
+import bisect
+from multiprocessing import shared_memory
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import sys
+
+# tkinter 는 GUI 모드에서만 _load_gui() 로 불러옵니다 (헤드리스 서버에는 tk 가 없을 수 있음).
+tk = scrolledtext = messagebox = ttk = None
+
+
+def _load_gui():
+    global tk, scrolledtext, messagebox, ttk
+    import tkinter as tk
+    from tkinter import scrolledtext, messagebox, ttk
+
+
+class _LazyModule:
+    """처음 속성에 접근할 때 모듈을 불러옵니다. ccxt/pandas 는 합쳐서 1초 가까이 걸려 시작을 늦춥니다."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+ccxt = _LazyModule('ccxt')
+pd = _LazyModule('pandas')
+
+# -----------------------------------------------------------------------------
+# 전략 규칙 (실거래와 백테스트가 공유)
+# -----------------------------------------------------------------------------
+BREAKOUT_LOOKBACK = 30          # 돌파 기준 고점을 구하는 직전 봉 개수
+SL_BUFFER_RATIO = 0.995         # 손절가 = 돌파 기준 가격 * 0.995
+MAX_REINVESTMENT_WINS = 2       # 재투자 연속 성공 허용 횟수
+
+
+def select_risk_amount(risk_per_trade_usd, reinvestment_percent, target_achieved, last_trade_profit, consecutive_wins):
+    """재투자 규칙에 따라 (리스크 금액, 재투자 여부)를 반환합니다."""
+    if target_achieved and last_trade_profit > 0 and consecutive_wins < MAX_REINVESTMENT_WINS:
+        return last_trade_profit * reinvestment_percent, True
+    return risk_per_trade_usd, False
+
+
+def calc_contract_amount(risk_amount_usd, entry_price, sl_price, contract_size=1.0):
+    """리스크 금액과 손절 폭으로 주문 계약 수를 계산합니다. 손절 폭이 0이면 None.
+
+    create_market_order 의 amount 와 같은 단위(계약 수)이며, 계약 수 × contract_size 가 기초자산 수량입니다.
+    """
+    price_risk_per_unit = abs(entry_price - sl_price)
+    if price_risk_per_unit == 0:
+        return None
+    position_size_base = risk_amount_usd / price_risk_per_unit
+    return position_size_base / contract_size
+
+
+# -----------------------------------------------------------------------------
+# 캔들 캐시 (심볼/타임프레임별 NumPy 링버퍼)
+# -----------------------------------------------------------------------------
+OHLCV_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+TS, OPEN, HIGH, LOW, CLOSE, VOLUME = range(len(OHLCV_COLUMNS))
+
+
+def timeframe_to_ms(timeframe):
+    """'5m', '1h' 같은 타임프레임 문자열을 밀리초로 바꿉니다."""
+    units = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+    return int(timeframe[:-1]) * units[timeframe[-1]] * 1000
+
+
+class CandleBuffer:
+    """고정 크기 NumPy 링버퍼에 OHLCV 캔들을 보관합니다.
+
+    각 캔들을 i, i + capacity 두 위치에 기록해 최근 n개 캔들을 항상 복사 없는 연속 슬라이스로 돌려줍니다.
+    """
+
+    def __init__(self, capacity=500):
+        self.capacity = capacity
+        self.lock = threading.RLock()
+        self._data = np.zeros((capacity * 2, len(OHLCV_COLUMNS)), dtype=np.float64)
+        self._head = 0
+        self.count = 0
+        self.revision = 0           # 마지막 이전 봉을 고쳐 쓴 횟수. 파생 상태(돌파 탐지기 등)를 다시 만들 때 씁니다.
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def last_timestamp(self):
+        if self.count == 0: return None
+        return int(self._data[self._head - 1 + self.capacity, TS])
+
+    @property
+    def last_price(self):
+        """최신 봉의 종가. 체결로 갱신한 값이든 거래소 봉으로 덮어쓴 값이든 항상 최신 봉과 일치합니다."""
+        if self.count == 0: return None
+        return float(self._data[self._head - 1 + self.capacity, CLOSE])
+
+    def clear(self):
+        self._head = 0
+        self.count = 0
+
+    def _write(self, idx, row):
+        self._data[idx] = row
+        self._data[idx + self.capacity] = row
+
+    def append(self, row):
+        self._write(self._head, row)
+        self._head = (self._head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def merge(self, rows):
+        """새 캔들을 반영합니다. 마지막 캔들과 같은 시각이면 덮어쓰고(미완성 봉), 더 오래된 캔들은 버퍼 안에
+        같은 시각의 봉이 있을 때만 덮어씁니다(체결로 만든 봉을 거래소 확정 봉으로 교체). 없는 시각은 무시합니다."""
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(OHLCV_COLUMNS))
+        last_ts = self.last_timestamp
+        changed = 0
+        for row in rows:
+            ts = int(row[TS])
+            if last_ts is not None and ts < last_ts:
+                changed += self._revise(row)
+                continue
+            if last_ts is not None and ts == last_ts:
+                self._write((self._head - 1) % self.capacity, row)
+            else:
+                self.append(row)
+                last_ts = ts
+            changed += 1
+        return changed
+
+    def _revise(self, row):
+        view = self.view()
+        i = int(np.searchsorted(view[:, TS], row[TS]))
+        if i == len(view) or view[i, TS] != row[TS] or np.array_equal(view[i], row):
+            return 0
+        self._write((self._head - len(view) + i) % self.capacity, row)
+        self.revision += 1
+        return 1
+
+    def apply_trade(self, price, timestamp, tf_ms, amount=0.0):
+        """체결 한 건을 미완성 봉에 반영합니다. 새 봉 구간이면 그 체결가로 새 봉을 엽니다."""
+        last_ts = self.last_timestamp
+        if last_ts is None or timestamp < last_ts:
+            return False
+        if timestamp >= last_ts + tf_ms:
+            bar_ts = timestamp - timestamp % tf_ms
+            self.append((bar_ts, price, price, price, price, amount))
+            return True
+        idx = (self._head - 1) % self.capacity
+        row = self._data[idx]
+        row[HIGH] = max(row[HIGH], price)
+        row[LOW] = min(row[LOW], price)
+        row[CLOSE] = price
+        row[VOLUME] += amount
+        self._data[idx + self.capacity] = row
+        return True
+
+    def view(self, n=None):
+        """최근 n개 캔들을 (n, 6) 배열 뷰로 반환합니다. 버퍼와 메모리를 공유하므로 수정하지 마세요."""
+        n = self.count if n is None else min(n, self.count)
+        end = self._head + self.capacity
+        return self._data[end - n:end]
+
+
+class OHLCVCache:
+    """(심볼, 타임프레임)별 CandleBuffer 를 관리하고 마지막 캔들 이후 데이터만 증분 조회합니다."""
+
+    def __init__(self, exchange, capacity=500, store=None):
+        self.exchange = exchange
+        self.capacity = capacity
+        self.store = store
+        self._buffers = {}
+        self._resamplers = {}
+        self._breakouts = {}
+        self._revisions = {}        # 파생 상태 키 -> 마지막으로 반영한 기본 버퍼 revision
+        self._lock = threading.Lock()
+
+    def buffer(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        with self._lock:
+            buf = self._buffers.get(key)
+            if buf is None:
+                buf = self._buffers[key] = CandleBuffer(self.capacity)
+            return buf
+
+    def update(self, symbol, timeframe, limit=100):
+        """새 캔들만 조회해 버퍼에 반영한 뒤 버퍼를 반환합니다.
+
+        버퍼가 비었거나 요청 개수보다 적거나 공백이 limit 봉을 넘으면 limit 개를 새로 받습니다.
+        """
+        limit = min(limit, self.capacity)
+        buf = self.buffer(symbol, timeframe)
+        with buf.lock:
+            last_ts = buf.last_timestamp
+            tf_ms = self.exchange.parse_timeframe(timeframe) * 1000
+            now = self.exchange.milliseconds()
+            missing = 0 if last_ts is None else (now - last_ts) // tf_ms
+            if self.store is not None and (last_ts is None or missing >= limit):
+                # 저장소를 최신으로 채운 뒤 버퍼를 저장소에서 다시 읽습니다.
+                self.store.backfill(self.exchange, symbol, timeframe, since=now - tf_ms * self.capacity)
+                buf.clear()
+                buf.merge(self.store.read(symbol, timeframe)[-self.capacity:])
+                last_ts = buf.last_timestamp
+                missing = 0 if last_ts is None else (now - last_ts) // tf_ms
+            if last_ts is None or len(buf) < limit or missing >= limit:
+                ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+                buf.clear()
+            else:
+                # 마지막(미완성) 봉부터 다시 받아 덮어씁니다.
+                ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, since=last_ts, limit=missing + 2)
+            if ohlcv:
+                buf.merge(ohlcv)
+            if self.store is not None and len(buf):
+                rows = buf.view()
+                self.store.append(symbol, timeframe, rows[rows[:, TS] + tf_ms <= now])
+        return buf
+
+    def resampled(self, symbol, base_timeframe, target_timeframe, seed_limit=200):
+        """기본 타임프레임 버퍼에서 만든 상위 타임프레임 버퍼를 반환합니다.
+
+        과거 봉은 처음 한 번만 REST 로 채우고, 이후에는 기본 봉만으로 갱신하므로 추가 요청이 없습니다.
+        """
+        key = (symbol, base_timeframe, target_timeframe)
+        with self._lock:
+            resampler = self._resamplers.get(key)
+        if resampler is None:
+            # REST 조회 동안 다른 심볼의 buffer()/update() 를 막지 않도록 캐시 잠금 밖에서 채운 뒤 등록합니다.
+            seeded = TimeframeResampler(target_timeframe, self.capacity)
+            if seed_limit:
+                seeded.seed(self.exchange.fetch_ohlcv(symbol, target_timeframe, limit=min(seed_limit, self.capacity)))
+            with self._lock:
+                resampler = self._resamplers.setdefault(key, seeded)   # 다른 스레드가 먼저 등록했으면 그것을 씁니다.
+        base = self.buffer(symbol, base_timeframe)
+        with base.lock:
+            if self._revisions.get(key, base.revision) != base.revision:
+                resampler.rewind()
+            self._revisions[key] = base.revision
+            return resampler.sync(base.view())
+
+    def breakout(self, symbol, timeframe, lookback=BREAKOUT_LOOKBACK):
+        """(심볼, 타임프레임, lookback)별 돌파 탐지기를 버퍼의 확정 봉까지 갱신해 반환합니다."""
+        key = (symbol, timeframe, lookback)
+        with self._lock:
+            detector = self._breakouts.get(key)
+            if detector is None:
+                detector = self._breakouts[key] = BreakoutDetector(lookback)
+        buf = self.buffer(symbol, timeframe)
+        with buf.lock:
+            if self._revisions.get(key, buf.revision) != buf.revision:
+                # 확정 봉이 고쳐졌으면 고점/저점 창을 다시 만듭니다 (lookback 봉만 읽으므로 비용이 작습니다).
+                detector = self._breakouts[key] = BreakoutDetector(lookback)
+            self._revisions[key] = buf.revision
+            detector.sync(buf.view()[:-1])
+        return detector
+
+
+# -----------------------------------------------------------------------------
+# 로컬 캔들 저장소 (이어쓰기 이진 파일 + 메모리 맵 읽기)
+# -----------------------------------------------------------------------------
+DEFAULT_DATA_DIR = 'ohlcv_data'
+CANDLE_ROW_BYTES = len(OHLCV_COLUMNS) * 8
+
+
+def read_candle_file(path):
+    """저장소 파일을 (n, 6) float64 메모리 맵으로 엽니다. 복사 없이 읽기 전용으로 공유됩니다."""
+    rows = os.path.getsize(path) // CANDLE_ROW_BYTES if os.path.exists(path) else 0
+    if rows == 0:
+        return np.empty((0, len(OHLCV_COLUMNS)), dtype=np.float64)
+    return np.memmap(path, dtype=np.float64, mode='r', shape=(rows, len(OHLCV_COLUMNS)))
+
+
+class OHLCVStore:
+    """심볼/타임프레임별 확정 캔들을 float64 이진 파일에 시간순으로 이어 씁니다.
+
+    봇, 백테스트, 분석 코드가 같은 파일을 메모리 맵으로 읽고, 빈 구간은 페이지 단위 일괄 요청으로 채웁니다.
+    """
+
+    def __init__(self, root=DEFAULT_DATA_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def path(self, symbol, timeframe):
+        name = symbol.replace('/', '_').replace(':', '_')
+        return os.path.join(self.root, f"{name}_{timeframe}.f64")
+
+    def read(self, symbol, timeframe):
+        return read_candle_file(self.path(symbol, timeframe))
+
+    def last_timestamp(self, symbol, timeframe):
+        path = self.path(symbol, timeframe)
+        rows = os.path.getsize(path) // CANDLE_ROW_BYTES if os.path.exists(path) else 0
+        if rows == 0:
+            return None
+        with open(path, 'rb') as f:
+            f.seek((rows - 1) * CANDLE_ROW_BYTES)
+            return int(np.frombuffer(f.read(CANDLE_ROW_BYTES), dtype=np.float64)[TS])
+
+    def append(self, symbol, timeframe, rows):
+        """저장된 마지막 봉 이후의 봉만 파일 끝에 추가하고 추가한 개수를 반환합니다."""
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(OHLCV_COLUMNS))
+        path = self.path(symbol, timeframe)
+        with self._lock:
+            last = self.last_timestamp(symbol, timeframe)
+            if last is not None:
+                rows = rows[rows[:, TS] > last]
+            if len(rows) == 0:
+                return 0
+            with open(path, 'ab') as f:
+                # 이전 쓰기가 중간에 끊겨 남은 조각은 잘라냅니다.
+                size = f.tell()
+                if size % CANDLE_ROW_BYTES:
+                    f.truncate(size - size % CANDLE_ROW_BYTES)
+                f.write(np.ascontiguousarray(rows).tobytes())
+        return len(rows)
+
+    def find_gaps(self, symbol, timeframe):
+        """저장된 봉 사이의 빈 구간을 (첫 누락 시각, 마지막 누락 시각) 목록으로 반환합니다."""
+        data = self.read(symbol, timeframe)
+        if len(data) < 2:
+            return []
+        tf_ms = timeframe_to_ms(timeframe)
+        ts = data[:, TS]
+        idx = np.flatnonzero(np.diff(ts) > tf_ms)
+        return [(int(ts[i]) + tf_ms, int(ts[i + 1]) - tf_ms) for i in idx]
+
+    def backfill(self, exchange, symbol, timeframe, since=None, page_limit=1000):
+        """마지막 저장 봉(없으면 since) 이후의 확정 봉을 페이지 단위로 받아 저장하고 추가한 개수를 반환합니다."""
+        tf_ms = timeframe_to_ms(timeframe)
+        now = exchange.milliseconds()
+        last = self.last_timestamp(symbol, timeframe)
+        if last is not None:
+            cursor = last + tf_ms
+        else:
+            cursor = since if since is not None else now - tf_ms * page_limit
+        added = 0
+        while cursor + tf_ms <= now:
+            page = exchange.fetch_ohlcv(symbol, timeframe, since=cursor, limit=page_limit)
+            if not page:
+                cursor += tf_ms * page_limit  # 거래가 없던 구간은 건너뜁니다.
+                continue
+            page = np.asarray(page, dtype=np.float64)
+            added += self.append(symbol, timeframe, page[page[:, TS] + tf_ms <= now])
+            next_cursor = int(page[-1, TS]) + tf_ms
+            if next_cursor <= cursor:
+                break
+            cursor = next_cursor
+        return added
+
+    def fill_gaps(self, exchange, symbol, timeframe, page_limit=1000):
+        """중간의 빈 구간을 받아 채우고 채운 봉 수를 반환합니다. 파일은 정렬된 새 파일로 원자적으로 교체됩니다."""
+        tf_ms = timeframe_to_ms(timeframe)
+        fetched = []
+        for start, end in self.find_gaps(symbol, timeframe):
+            cursor = start
+            while cursor <= end:
+                limit = min(page_limit, (end - cursor) // tf_ms + 1)
+                page = exchange.fetch_ohlcv(symbol, timeframe, since=cursor, limit=limit)
+                if not page:
+                    break  # 거래소에도 없는 구간
+                page = np.asarray(page, dtype=np.float64)
+                page = page[(page[:, TS] >= start) & (page[:, TS] <= end)]
+                if len(page) == 0:
+                    break
+                fetched.append(page)
+                cursor = int(page[-1, TS]) + tf_ms
+        if not fetched:
+            return 0
+
+        path = self.path(symbol, timeframe)
+        with self._lock:
+            old = np.array(self.read(symbol, timeframe))
+            merged = np.concatenate([old] + fetched)
+            merged = merged[np.argsort(merged[:, TS], kind='stable')]
+            keep = np.r_[True, merged[1:, TS] != merged[:-1, TS]]
+            merged = merged[keep]
+            tmp = path + '.tmp'
+            merged.tofile(tmp)
+            os.replace(tmp, path)
+        return len(merged) - len(old)
+
+
+# -----------------------------------------------------------------------------
+# 타임프레임 리샘플링 (기본 봉으로 상위 타임프레임 생성)
+# -----------------------------------------------------------------------------
+def resample_candles(candles, target_ms):
+    """시간순 캔들 배열을 target_ms 길이의 상위 봉으로 한 번에 묶습니다. 봉 시작은 UTC 기준으로 정렬됩니다."""
+    candles = np.asarray(candles, dtype=np.float64)
+    if len(candles) == 0:
+        return candles.copy()
+    ts = candles[:, TS].astype(np.int64)
+    bucket = ts - ts % target_ms
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(candles)] - 1
+    out = np.empty((len(starts), len(OHLCV_COLUMNS)), dtype=np.float64)
+    out[:, TS] = bucket[starts]
+    out[:, OPEN] = candles[starts, OPEN]
+    out[:, HIGH] = np.maximum.reduceat(candles[:, HIGH], starts)
+    out[:, LOW] = np.minimum.reduceat(candles[:, LOW], starts)
+    out[:, CLOSE] = candles[ends, CLOSE]
+    out[:, VOLUME] = np.add.reduceat(candles[:, VOLUME], starts)
+    return out
+
+
+def can_resample(base_timeframe, target_timeframe):
+    base_ms, target_ms = timeframe_to_ms(base_timeframe), timeframe_to_ms(target_timeframe)
+    return target_ms > base_ms and target_ms % base_ms == 0
+
+
+class TimeframeResampler:
+    """기본 타임프레임 캔들 버퍼에서 상위 타임프레임 봉을 증분으로 만들어 CandleBuffer 에 씁니다.
+
+    진행 중인 상위 봉은 (이미 확정된 기본 봉 집계) + (마지막 기본 봉)으로 매번 다시 계산하므로,
+    기본 봉의 미완성 값이 덮어써져도 중복 집계되지 않습니다.
+    """
+
+    def __init__(self, target_timeframe, capacity=500):
+        self.target_ms = timeframe_to_ms(target_timeframe)
+        self.buffer = CandleBuffer(capacity)
+        self._bucket_ts = None
+        self._closed = None     # 현재 상위 봉에서 확정된 기본 봉들의 집계
+        self._pending = None    # 아직 바뀔 수 있는 마지막 기본 봉
+        self._resync_from = None
+
+    def seed(self, candles):
+        """REST 로 받은 상위 타임프레임 과거 봉을 채웁니다. 마지막(미완성) 봉은 이후 기본 봉으로 다시 계산합니다."""
+        with self.buffer.lock:
+            self.buffer.clear()
+            self.buffer.merge(candles)
+
+    @staticmethod
+    def _fold(agg, row):
+        if agg is None:
+            return row.copy()
+        agg[HIGH] = max(agg[HIGH], row[HIGH])
+        agg[LOW] = min(agg[LOW], row[LOW])
+        agg[CLOSE] = row[CLOSE]
+        agg[VOLUME] += row[VOLUME]
+        return agg
+
+    def update(self, row):
+        ts = int(row[TS])
+        if self._pending is not None:
+            pending_ts = int(self._pending[TS])
+            if ts < pending_ts:
+                return
+            if ts > pending_ts:
+                if ts - ts % self.target_ms == self._bucket_ts:
+                    self._closed = self._fold(self._closed, self._pending)
+                else:
+                    self._closed = None
+        self._bucket_ts = ts - ts % self.target_ms
+        self._pending = np.array(row, dtype=np.float64)
+
+        bar = self._fold(None if self._closed is None else self._closed.copy(), self._pending)
+        bar[TS] = self._bucket_ts
+        bar[OPEN] = (self._closed if self._closed is not None else self._pending)[OPEN]
+        self.buffer.merge([bar])
+
+    def rewind(self):
+        """이미 반영한 기본 봉이 고쳐 쓰였을 때 직전/현재 상위 봉을 기본 봉에서 다시 계산하게 합니다."""
+        if self._bucket_ts is not None:
+            self._resync_from = self._bucket_ts - self.target_ms
+        self._pending = self._closed = None
+
+    def sync(self, base_candles):
+        """기본 봉 중 아직 반영하지 않은(또는 바뀌었을 수 있는 마지막) 봉만 반영하고 상위 봉 버퍼를 반환합니다."""
+        with self.buffer.lock:
+            if self._pending is None:
+                last, self._resync_from = self._resync_from or self.buffer.last_timestamp, None
+                start = 0 if last is None else np.searchsorted(base_candles[:, TS], last, side='left')
+            else:
+                start = np.searchsorted(base_candles[:, TS], self._pending[TS], side='left')
+            for row in base_candles[start:]:
+                self.update(row)
+        return self.buffer
+
+
+# -----------------------------------------------------------------------------
+# 돌파 탐지 (스트리밍 롤링 고점/저점)
+# -----------------------------------------------------------------------------
+class RollingExtremum:
+    """최근 window 개 값의 최댓값(또는 최솟값)을 단조 덱으로 유지합니다. 값 추가는 분할 상환 O(1)입니다."""
+    __slots__ = ('window', 'sign', 'count', '_deque')
+
+    def __init__(self, window, mode='max'):
+        self.window = window
+        self.sign = 1.0 if mode == 'max' else -1.0
+        self.count = 0
+        self._deque = deque()      # (순번, 부호 적용 값), 값이 단조 감소
+
+    def push(self, value):
+        value = self.sign * value
+        dq = self._deque
+        while dq and dq[-1][1] <= value:
+            dq.pop()
+        dq.append((self.count, value))
+        self.count += 1
+        if dq[0][0] <= self.count - 1 - self.window:
+            dq.popleft()
+
+    @property
+    def ready(self):
+        return self.count >= self.window
+
+    @property
+    def value(self):
+        return self.sign * self._deque[0][1] if self._deque else None
+
+
+class BreakoutDetector:
+    """확정 봉의 직전 lookback 봉 고점/저점을 스트리밍으로 유지해 현재 봉의 돌파 여부를 O(1)로 판단합니다.
+
+    규칙은 breakout_signals 와 같습니다: 현재 봉 고가 > 직전 lookback 확정 봉 고가의 최댓값.
+    """
+
+    def __init__(self, lookback=BREAKOUT_LOOKBACK):
+        self.lookback = lookback
+        self.highs = RollingExtremum(lookback, 'max')
+        self.lows = RollingExtremum(lookback, 'min')
+        self.last_timestamp = None
+
+    @property
+    def high_water_mark(self):
+        return self.highs.value if self.highs.ready else None
+
+    @property
+    def low_water_mark(self):
+        return self.lows.value if self.lows.ready else None
+
+    def update(self, row):
+        ts = int(row[TS])
+        if self.last_timestamp is not None and ts <= self.last_timestamp:
+            return
+        self.highs.push(float(row[HIGH]))
+        self.lows.push(float(row[LOW]))
+        self.last_timestamp = ts
+
+    def sync(self, closed_candles):
+        """아직 반영하지 않은 확정 봉만 반영합니다. 처음에는 마지막 lookback 봉만 읽습니다."""
+        rows = _rows_after(closed_candles, self.last_timestamp)
+        for row in rows[-self.lookback:] if self.last_timestamp is None else rows:
+            self.update(row)
+
+    def check(self, high, low):
+        """현재 봉 고가/저가로 +1(고점 돌파), -1(저점 이탈), 0(없음 또는 데이터 부족)을 반환합니다."""
+        if not self.highs.ready:
+            return 0
+        if high > self.highs.value:
+            return 1
+        if low < self.lows.value:
+            return -1
+        return 0
+
+
+# -----------------------------------------------------------------------------
+# ICT 오더블록 / FVG 탐지
+# -----------------------------------------------------------------------------
+OB_MAX_ZONES = 20               # 동시에 추적하는 활성 오더블록 최대 개수
+OB_MAX_AGE = 500                # 오더블록 유효 기간(봉)
+OB_HISTORY = 300                # 실거래 시 오더블록 탐지에 쓰는 캔들 개수
+TREND_EMA_PERIOD = 50           # 추세 필터 EMA 기간 (trend_timeframe 기준)
+
+
+class OrderBlock:
+    """FVG 를 만든 변위 직전의 반대 방향 캔들 구역입니다. side 는 진입 방향('buy'/'sell')."""
+    __slots__ = ('side', 'top', 'bottom', 'entry', 'ob_timestamp', 'age')
+
+    def __init__(self, side, top, bottom, entry_level, ob_timestamp, age=0):
+        self.side = side
+        self.top = float(top)
+        self.bottom = float(bottom)
+        # 매수 구역은 위에서부터, 매도 구역은 아래에서부터 entry_level 만큼 들어간 가격에서 진입합니다.
+        if side == 'buy':
+            self.entry = self.top - entry_level * (self.top - self.bottom)
+        else:
+            self.entry = self.bottom + entry_level * (self.top - self.bottom)
+        self.ob_timestamp = int(ob_timestamp)
+        self.age = age
+
+    @property
+    def stop_price(self):
+        if self.side == 'buy':
+            return self.bottom * SL_BUFFER_RATIO
+        return self.top * (2 - SL_BUFFER_RATIO)
+
+
+def orderblock_zones(candles, entry_level):
+    """모든 FVG 에 대한 오더블록 구역을 벡터 연산으로 계산합니다.
+
+    i-2 봉과 i 봉 사이에 갭이 생기면(FVG) i-2 봉 이전의 마지막 반대 방향 캔들을 오더블록으로 봅니다.
+    반환값은 (FVG 봉 인덱스, 방향 +1/-1, 상단, 하단, 진입가, 오더블록 캔들 인덱스) 배열 튜플이며 FVG 봉 순으로 정렬됩니다.
+    """
+    n = len(candles)
+    open_, high, low, close = (candles[:, c] for c in (OPEN, HIGH, LOW, CLOSE))
+    idx = np.arange(n)
+    last_bear = np.maximum.accumulate(np.where(close < open_, idx, -1))
+    last_bull = np.maximum.accumulate(np.where(close > open_, idx, -1))
+
+    parts = []
+    for sign, fvg_cond, last_ob in ((1, lambda: low[2:] > high[:-2], last_bear),
+                                    (-1, lambda: high[2:] < low[:-2], last_bull)):
+        if n < 3:
+            continue
+        bars = np.flatnonzero(fvg_cond()) + 2
+        ob = last_ob[bars - 2]
+        keep = ob >= 0
+        bars, ob = bars[keep], ob[keep]
+        # 같은 오더블록 캔들이 연속 FVG 에 다시 잡히면 처음 것만 남깁니다.
+        first = np.ones(len(ob), dtype=bool)
+        first[1:] = ob[1:] != ob[:-1]
+        bars, ob = bars[first], ob[first]
+        top, bottom = high[ob], low[ob]
+        entry = top - entry_level * (top - bottom) if sign > 0 else bottom + entry_level * (top - bottom)
+        parts.append((bars, np.full(len(bars), sign), top, bottom, entry, ob))
+
+    if not parts:
+        empty = np.empty(0)
+        return empty.astype(np.int64), empty.astype(np.int64), empty, empty, empty, empty.astype(np.int64)
+    merged = [np.concatenate(cols) for cols in zip(*parts)]
+    order = np.lexsort((-merged[5], merged[0]))  # FVG 봉 순, 같은 봉이면 최근 오더블록 우선
+    return tuple(col[order] for col in merged)
+
+
+def orderblock_outcomes(candles, bars, sides, tops, bottoms, entries, max_age=OB_MAX_AGE, batch=4096):
+    """각 구역이 생성 후 max_age 봉 안에 처음 진입가에 닿는 봉과 무효화(종가 이탈)되는 봉의 오프셋을 구합니다.
+
+    해당 사건이 없으면 오프셋은 0 입니다. 데이터 끝 이후는 사건이 없는 것으로 봅니다.
+    """
+    n = len(candles)
+    pad_hi = np.full(max_age, -np.inf)
+    pad_lo = np.full(max_age, np.inf)
+    win_low = np.lib.stride_tricks.sliding_window_view(np.r_[candles[:, LOW], pad_lo], max_age)
+    win_high = np.lib.stride_tricks.sliding_window_view(np.r_[candles[:, HIGH], pad_hi], max_age)
+    win_close_lo = np.lib.stride_tricks.sliding_window_view(np.r_[candles[:, CLOSE], pad_lo], max_age)
+    win_close_hi = np.lib.stride_tricks.sliding_window_view(np.r_[candles[:, CLOSE], pad_hi], max_age)
+
+    touch = np.zeros(len(bars), dtype=np.int64)
+    invalid = np.zeros(len(bars), dtype=np.int64)
+    for start in range(0, len(bars), batch):
+        sl = slice(start, start + batch)
+        rows = np.minimum(bars[sl] + 1, n)
+        buy = (sides[sl] > 0)[:, None]
+        hit = np.where(buy, win_low[rows] <= entries[sl, None], win_high[rows] >= entries[sl, None])
+        broken = np.where(buy, win_close_lo[rows] < bottoms[sl, None], win_close_hi[rows] > tops[sl, None])
+        touch[sl] = np.where(hit.any(axis=1), hit.argmax(axis=1) + 1, 0)
+        invalid[sl] = np.where(broken.any(axis=1), broken.argmax(axis=1) + 1, 0)
+    return touch, invalid
+
+
+def ema_trend(closes, period=TREND_EMA_PERIOD):
+    """종가와 EMA 를 비교한 추세 방향(+1/-1/0) 배열을 반환합니다."""
+    ema = pd.Series(closes).ewm(span=period, adjust=False).mean().to_numpy()
+    return np.sign(closes - ema).astype(np.int64)
+
+
+class TrendFilter:
+    """trend_timeframe 확정 봉 종가의 EMA 로 추세 방향을 봉당 O(1)로 갱신합니다."""
+
+    def __init__(self, period=TREND_EMA_PERIOD):
+        self.alpha = 2.0 / (period + 1)
+        self.ema = None
+        self.last_close = None
+        self.last_timestamp = None
+
+    @property
+    def direction(self):
+        """+1 상승, -1 하락, 0 판단 불가."""
+        if self.ema is None: return 0
+        return int(np.sign(self.last_close - self.ema))
+
+    def update(self, row):
+        ts = int(row[TS])
+        if self.last_timestamp is not None and ts <= self.last_timestamp:
+            return
+        close = float(row[CLOSE])
+        self.ema = close if self.ema is None else self.ema + self.alpha * (close - self.ema)
+        self.last_close = close
+        self.last_timestamp = ts
+
+    def sync(self, closed_candles):
+        """아직 반영하지 않은 확정 봉만 반영합니다."""
+        for row in _rows_after(closed_candles, self.last_timestamp):
+            self.update(row)
+
+
+def _rows_after(candles, last_timestamp):
+    if last_timestamp is None:
+        return candles
+    return candles[np.searchsorted(candles[:, TS], last_timestamp, side='right'):]
+
+
+class OrderBlockDetector:
+    """ICT 오더블록/FVG 를 확정 봉 단위로 증분 탐지합니다.
+
+    과거 데이터는 warmup 에서 벡터 연산으로 한 번에 처리하고, 이후 봉마다 비용은 추적 중인 구역 수(최대 max_zones)로 고정됩니다.
+    """
+
+    def __init__(self, entry_level=0.7, max_zones=OB_MAX_ZONES, max_age=OB_MAX_AGE):
+        self.entry_level = entry_level
+        self.max_zones = max_zones
+        self.max_age = max_age
+        self.zones = deque(maxlen=max_zones)
+        self.last_timestamp = None
+        self._prev = deque(maxlen=2)           # 직전 두 확정 봉
+        self._last_ob = {'buy': deque(maxlen=2), 'sell': deque(maxlen=2)}  # 직전 두 시점의 마지막 음봉/양봉
+        self._last_ob_ts = {'buy': None, 'sell': None}
+
+    def warmup(self, candles):
+        """확정 봉 전체를 벡터 연산으로 처리해 현재 살아있는 구역과 증분 상태를 만듭니다."""
+        candles = np.asarray(candles, dtype=np.float64)
+        n = len(candles)
+        self.zones.clear()
+        if n == 0:
+            return
+        bars, sides, tops, bottoms, entries, obs = orderblock_zones(candles, self.entry_level)
+        touch, invalid = orderblock_outcomes(candles, bars, sides, tops, bottoms, entries, self.max_age)
+        age = n - 1 - bars
+        alive = (touch == 0) & (invalid == 0) & (age < self.max_age)
+        for k in np.flatnonzero(alive)[-self.max_zones:]:
+            side = 'buy' if sides[k] > 0 else 'sell'
+            self.zones.append(OrderBlock(side, tops[k], bottoms[k], self.entry_level, candles[obs[k], TS], int(age[k])))
+        for side, sign in (('buy', 1), ('sell', -1)):
+            picked = obs[sides == sign]
+            self._last_ob_ts[side] = int(candles[picked[-1], TS]) if len(picked) else None
+
+        self._prev.clear()
+        for row in candles[-2:]:
+            self._prev.append(row.copy())
+        for side, cond in (('buy', candles[:, CLOSE] < candles[:, OPEN]), ('sell', candles[:, CLOSE] > candles[:, OPEN])):
+            hist = self._last_ob[side]
+            hist.clear()
+            for end in (n - 1, n):
+                found = np.flatnonzero(cond[:end])
+                hist.append(candles[found[-1]].copy() if len(found) else None)
+        self.last_timestamp = int(candles[-1, TS])
+
+    def update(self, row):
+        """확정 봉 하나를 반영합니다."""
+        ts = int(row[TS])
+        if self.last_timestamp is not None and ts <= self.last_timestamp:
+            return
+
+        alive = []
+        for zone in self.zones:
+            zone.age += 1
+            if zone.side == 'buy':
+                done = row[LOW] <= zone.entry or row[CLOSE] < zone.bottom
+            else:
+                done = row[HIGH] >= zone.entry or row[CLOSE] > zone.top
+            if not done and zone.age < self.max_age:
+                alive.append(zone)
+        self.zones = deque(alive, maxlen=self.max_zones)
+
+        if len(self._prev) == 2:
+            first = self._prev[0]
+            if row[LOW] > first[HIGH]:
+                self._add_zone('buy', self._last_ob['buy'][0])
+            if row[HIGH] < first[LOW]:
+                self._add_zone('sell', self._last_ob['sell'][0])
+
+        for side, is_ob in (('buy', row[CLOSE] < row[OPEN]), ('sell', row[CLOSE] > row[OPEN])):
+            hist = self._last_ob[side]
+            hist.append(row.copy() if is_ob else (hist[-1] if hist else None))
+        self._prev.append(row.copy())
+        self.last_timestamp = ts
+
+    def _add_zone(self, side, ob):
+        if ob is None or int(ob[TS]) == self._last_ob_ts[side]:
+            return
+        self._last_ob_ts[side] = int(ob[TS])
+        self.zones.append(OrderBlock(side, ob[HIGH], ob[LOW], self.entry_level, ob[TS]))
+
+    def sync(self, closed_candles):
+        """처음이면 warmup, 이후에는 새 확정 봉만 update 합니다."""
+        if self.last_timestamp is None:
+            self.warmup(closed_candles)
+            return
+        for row in _rows_after(closed_candles, self.last_timestamp):
+            self.update(row)
+
+    def match(self, low, high, trend=None):
+        """진행 중인 봉의 저가/고가가 진입가에 닿은 구역을 찾습니다. trend 가 주어지면 같은 방향만 봅니다."""
+        for zone in reversed(self.zones):
+            if zone.side == 'buy' and low <= zone.entry and (trend is None or trend > 0):
+                return zone
+            if zone.side == 'sell' and high >= zone.entry and (trend is None or trend < 0):
+                return zone
+        return None
+
+    def consume(self, zone):
+        try:
+            self.zones.remove(zone)
+        except ValueError:
+            pass
+
+
+# -----------------------------------------------------------------------------
+# 거래소 연결 (공유 세션 및 요청 한도)
+# -----------------------------------------------------------------------------
+MARKETS_CACHE_FILE = 'gateio_markets.json'
+MARKETS_TTL = 6 * 3600          # 마켓/계약 메타데이터 디스크 캐시 유지 시간(초)
+_markets_memo = {}              # 경로 -> (저장 시각, markets, currencies), 같은 프로세스의 봇들이 공유
+_markets_lock = threading.Lock()
+
+
+def create_exchange(api_key, api_secret, enable_rate_limit=True, markets_cache=MARKETS_CACHE_FILE):
+    """게이트아이오 USDT 무기한 선물 클라이언트를 만듭니다. markets_cache 가 있으면 마켓 목록을 디스크 캐시에서 채웁니다."""
+    exchange = ccxt.gateio({
+        'apiKey': api_key,
+        'secret': api_secret,
+        'enableRateLimit': enable_rate_limit,
+        'options': {'defaultType': 'swap', 'settle': 'usdt'},
+    })
+    if markets_cache:
+        try:
+            load_cached_markets(exchange, markets_cache)
+        except Exception as e:
+            # 캐시를 못 쓰면 ccxt 가 첫 요청 때 평소처럼 마켓 목록을 받습니다.
+            logging.getLogger(__name__).warning("마켓 캐시 사용 실패: %s", e)
+    return exchange
+
+
+def load_cached_markets(exchange, path=MARKETS_CACHE_FILE, ttl=MARKETS_TTL):
+    """TTL 안의 마켓 캐시(메모리, 없으면 디스크)를 set_markets 로 넣고, 없거나 오래됐으면 받아서 저장합니다.
+
+    캐시를 썼으면 True, 네트워크로 새로 받았으면 False 를 반환합니다.
+    """
+    key = os.path.abspath(path)
+    with _markets_lock:
+        cached = _markets_memo.get(key)
+        if cached is None and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            cached = _markets_memo[key] = (data['saved'], data['markets'], data.get('currencies'))
+        if cached is not None and time.time() - cached[0] < ttl:
+            exchange.set_markets(cached[1], cached[2])
+            return True
+
+        exchange.load_markets()
+        saved = time.time()
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'saved': saved, 'markets': exchange.markets, 'currencies': exchange.currencies}, f)
+        os.replace(tmp, path)
+        _markets_memo[key] = (saved, exchange.markets, exchange.currencies)
+        return False
+
+
+PRIORITY_ORDER, PRIORITY_ACCOUNT, PRIORITY_MARKET, PRIORITY_BACKGROUND = range(4)
+# 우선순위별로 남겨 둬야 하는 토큰 비율(버스트 대비). 낮은 우선순위일수록 더 많이 남겨 주문/포지션 조회가 먼저 나갑니다.
+PRIORITY_RESERVE = (0.0, 0.25, 0.5, 0.75)
+REQUEST_PRIORITIES = (
+    (('create_', 'cancel_', 'edit_'), PRIORITY_ORDER),
+    (('fetch_order', 'fetch_open_orders', 'fetch_positions', 'fetch_balance'), PRIORITY_ACCOUNT),
+    (('fetch_ohlcv', 'fetch_ticker', 'fetch_trades'), PRIORITY_MARKET),
+)
+RATE_LIMIT_BURST = 8
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def request_priority(name):
+    for prefixes, priority in REQUEST_PRIORITIES:
+        if name.startswith(prefixes):
+            return priority
+    return PRIORITY_BACKGROUND
+
+
+class RateLimiter:
+    """여러 스레드가 공유하는 토큰 버킷 요청 제한기입니다.
+
+    우선순위가 낮은 요청은 PRIORITY_RESERVE 만큼 토큰이 남아 있을 때만 통과하므로,
+    한도가 빠듯할 때 남은 예산은 주문과 포지션 조회에 먼저 돌아갑니다.
+    """
+
+    def __init__(self, rate_per_sec, burst=1):
+        self.rate = rate_per_sec
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, priority=PRIORITY_ORDER):
+        need = max(1.0, min(self.burst, 1 + PRIORITY_RESERVE[priority] * self.burst))
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= need:
+                    self._tokens -= 1
+                    return
+                wait = (need - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def shared_rate_limiter(rate_per_sec, burst=RATE_LIMIT_BURST):
+    """프로세스 안의 모든 봇/스캐너가 함께 쓰는 요청 예산. 처음 호출한 설정으로 만들어집니다."""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(rate_per_sec, burst)
+        return _shared_limiter
+
+
+class RateLimitedExchange:
+    """ccxt 클라이언트를 감싸 REST 호출마다 공유 RateLimiter 의 토큰을 요청 종류별 우선순위로 소비하게 합니다."""
+
+    REST_PREFIXES = ('fetch_', 'create_', 'cancel_', 'edit_', 'load_markets')
+
+    def __init__(self, exchange, limiter):
+        self._exchange = exchange
+        self.limiter = limiter
+
+    def __getattr__(self, name):
+        attr = getattr(self._exchange, name)
+        if callable(attr) and name.startswith(self.REST_PREFIXES):
+            priority = request_priority(name)
+
+            def call(*args, **kwargs):
+                self.limiter.acquire(priority)
+                return attr(*args, **kwargs)
+            return call
+        return attr
+
+
+# -----------------------------------------------------------------------------
+# 요청 스케줄링 (봉 마감 시점과 포지션 상태에 맞춘 폴링 간격)
+# -----------------------------------------------------------------------------
+SCHED_MIN_INTERVAL = 2.0            # 진입 직전(hot) 상태의 봉 마감 직전 현재가 폴링 간격(초)
+SCHED_ARMED_INTERVAL = 30.0         # 현재가가 진입 기준가에 가까울(armed) 때 봉 중간 현재가 폴링 간격(초)
+SCHED_IDLE_INTERVAL = 120.0         # 현재가가 진입 기준가에서 멀 때 봉 중간 현재가 폴링 간격(초)
+SCHED_FLAT_POSITION_INTERVAL = 300.0    # 포지션이 없을 때 포지션 확인 간격(초). 진입은 봇이 직접 하므로 외부 변경 확인용입니다.
+SCHED_POSITION_INTERVAL = 120.0     # 포지션 보유 중 확인 간격 상한(초). 기본은 봉 길이의 1/4, 최소 30초
+SCHED_CLOSE_GRACE = 1.5             # 봉 마감 후 확정 봉이 조회되기까지 기다리는 시간(초)
+SCHED_NEAR_FRACTION = 0.1           # 봉 길이 중 마감 직전으로 보는 비율 (최대 60초)
+SCHED_ARMED_DISTANCE = 1.0          # 진입 기준가까지 거리가 평균 봉 폭의 이 배수 이내면 armed
+SCHED_HOT_DISTANCE = 0.25           # 이 배수 이내면 hot: 마감 직전 구간을 촘촘히 확인합니다.
+SCHED_REACH_FRACTION = 0.125        # 평균 봉 폭 d 배를 움직이는 데 봉 길이 × d² 가 걸린다고 보고(랜덤워크) 그 비율만큼 기다립니다.
+
+
+class RequestScheduler:
+    """포지션 확인과 진입 신호 확인의 다음 폴링까지 기다릴 시간을 따로 정합니다.
+
+    포지션은 보유 중이면 봉 길이에 비례한 간격(position_interval)으로, 없으면 flat_position_interval 로 확인합니다.
+    신호는 봉 마감 직후 한 번 캔들을 받고, 봉 중간에는 현재가만 확인합니다. 현재가 확인 간격은 진입 기준가까지의
+    거리(평균 봉 폭 단위)로 정하며, 마감 직전 min_interval 폴링은 기준가에 아주 가까울(hot) 때만 더합니다.
+    """
+
+    def __init__(self, timeframe, min_interval=SCHED_MIN_INTERVAL, armed_interval=SCHED_ARMED_INTERVAL,
+                 idle_interval=SCHED_IDLE_INTERVAL, position_interval=None,
+                 flat_position_interval=SCHED_FLAT_POSITION_INTERVAL, close_grace=SCHED_CLOSE_GRACE):
+        self.tf = timeframe_to_ms(timeframe) / 1000
+        self.min_interval = min_interval
+        self.armed_interval = armed_interval
+        self.idle_interval = idle_interval
+        self.position_interval = position_interval or min(SCHED_POSITION_INTERVAL, max(30.0, self.tf / 4))
+        self.flat_position_interval = flat_position_interval
+        self.close_grace = close_grace
+        self.near_window = min(60.0, max(min_interval * 3, self.tf * SCHED_NEAR_FRACTION))
+
+    def position_delay(self, in_position=False):
+        """다음 포지션 확인까지의 초."""
+        return self.position_interval if in_position else self.flat_position_interval
+
+    def signal_delay(self, now_ms, distance=None):
+        """now_ms(거래소 시각) 기준 다음 신호 확인까지의 초.
+
+        distance 는 현재가와 진입 기준가 사이 거리(평균 봉 폭 단위)이고, 모르면 None(armed 로 취급)입니다.
+        """
+        elapsed = (now_ms / 1000) % self.tf
+        to_close = self.tf - elapsed
+        next_close_poll = to_close + self.close_grace     # 확정 봉을 받는 마감 직후 폴링
+        if elapsed < self.close_grace:
+            next_close_poll = self.close_grace - elapsed
+        if distance is not None and distance > SCHED_ARMED_DISTANCE:
+            wait = self.idle_interval
+        elif distance is not None and distance <= SCHED_HOT_DISTANCE:
+            # 마감 직전 구간이 시작될 때 깨어나 그 구간은 촘촘히 확인합니다.
+            wait = self.min_interval if to_close <= self.near_window else min(self.armed_interval, to_close - self.near_window)
+        elif distance is not None:
+            wait = min(self.idle_interval, max(self.armed_interval, self.tf * distance ** 2 * SCHED_REACH_FRACTION))
+        else:
+            wait = self.armed_interval
+        return max(0.05, min(wait, next_close_poll))
+
+
+# -----------------------------------------------------------------------------
+# 계측 (거래소 호출 지연/오류, 루프 단계별 시간)
+# -----------------------------------------------------------------------------
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+RATE_WINDOW_SECONDS = 10
+
+
+class LatencyHistogram:
+    """고정 로그 간격 버킷(LATENCY_BUCKETS_MS)으로 지연 분포를 누적합니다."""
+    __slots__ = ('counts', 'count', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q):
+        """버킷 상한으로 근사한 q 분위수(ms)."""
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if c and seen >= target:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return 0.0
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ms / self.count if self.count else 0.0,
+            'max_ms': self.max_ms,
+            'p50_ms': self.percentile(0.5), 'p90_ms': self.percentile(0.9), 'p99_ms': self.percentile(0.99),
+            'buckets': {f"le_{b}": c for b, c in zip(LATENCY_BUCKETS_MS + ('inf',), self.counts)},
+        }
+
+
+class MetricsRegistry:
+    """지연 히스토그램, 카운터, 주기별 단계 시간, 최근 요청률을 모읍니다. 여러 스레드에서 공유합니다."""
+
+    def __init__(self, rate_limit_per_sec=None):
+        self.rate_limit_per_sec = rate_limit_per_sec
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._cycles = {}               # 심볼 -> 마지막 주기의 단계별 시간(ms)
+        self._recent_calls = deque()    # 최근 RATE_WINDOW_SECONDS 동안의 요청 시각
+
+    def observe(self, name, seconds):
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = LatencyHistogram()
+            hist.observe(seconds * 1000)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def record_call(self):
+        now = time.monotonic()
+        with self._lock:
+            self._recent_calls.append(now)
+            while self._recent_calls and self._recent_calls[0] < now - RATE_WINDOW_SECONDS:
+                self._recent_calls.popleft()
+
+    def record_cycle(self, key, phases):
+        with self._lock:
+            self._cycles[key] = dict(phases)
+
+    @contextmanager
+    def timer(self, name, phases=None):
+        """블록 실행 시간을 name 히스토그램에 기록하고, phases 딕셔너리가 있으면 ms 값도 남깁니다."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe(name, elapsed)
+            if phases is not None:
+                phases[name] = elapsed * 1000
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            recent = sum(1 for t in self._recent_calls if t >= now - RATE_WINDOW_SECONDS)
+            rate = recent / RATE_WINDOW_SECONDS
+            return {
+                'uptime_s': time.time() - self.started,
+                'latency': {name: h.snapshot() for name, h in self._histograms.items()},
+                'counters': dict(self._counters),
+                'cycles': {key: dict(phases) for key, phases in self._cycles.items()},
+                'rate': {
+                    'requests_per_sec': rate,
+                    'limit_per_sec': self.rate_limit_per_sec,
+                    'utilization': rate / self.rate_limit_per_sec if self.rate_limit_per_sec else None,
+                },
+            }
+
+
+class InstrumentedExchange:
+    """ccxt 클라이언트를 감싸 REST 호출별 지연, 호출/오류 수, 요청률을 MetricsRegistry 에 기록합니다."""
+
+    REST_PREFIXES = RateLimitedExchange.REST_PREFIXES
+
+    def __init__(self, exchange, metrics):
+        self._exchange = exchange
+        self.metrics = metrics
+        if metrics.rate_limit_per_sec is None and getattr(exchange, 'rateLimit', None):
+            metrics.rate_limit_per_sec = 1000 / exchange.rateLimit
+
+    def __getattr__(self, name):
+        attr = getattr(self._exchange, name)
+        if callable(attr) and name.startswith(self.REST_PREFIXES):
+            metrics = self.metrics
+
+            def call(*args, **kwargs):
+                metrics.record_call()
+                metrics.incr(f"exchange.{name}.calls")
+                started = time.perf_counter()
+                try:
+                    return attr(*args, **kwargs)
+                except Exception:
+                    metrics.incr(f"exchange.{name}.errors")
+                    raise
+                finally:
+                    metrics.observe(f"exchange.{name}", time.perf_counter() - started)
+            return call
+        return attr
+
+
+class MetricsServer:
+    """로컬 HTTP 로 지표 스냅샷을 JSON 으로 제공합니다 (GET /metrics)."""
+
+    def __init__(self, snapshot_fn, host='127.0.0.1', port=9108):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.rstrip('/') not in ('', '/metrics'):
+                    handler.send_error(404)
+                    return
+                body = json.dumps(snapshot_fn(), ensure_ascii=False).encode('utf-8')
+                handler.send_response(200)
+                handler.send_header('Content-Type', 'application/json; charset=utf-8')
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class MetricsSnapshotWriter:
+    """지표 스냅샷을 interval 초마다 JSON 파일로 원자적으로 씁니다."""
+
+    def __init__(self, snapshot_fn, path, interval=10):
+        self.snapshot_fn = snapshot_fn
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot_fn(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def close(self):
+        self._stop.set()
+        self.write()
+
+
+# -----------------------------------------------------------------------------
+# 계정 스냅샷 캐시 (잔액/포지션)
+# -----------------------------------------------------------------------------
+BALANCE_TTL = 5.0               # 잔액 스냅샷 유지 시간(초)
+POSITION_TTL = 2.0              # 포지션 스냅샷 유지 시간(초)
+
+
+class _Flight:
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SnapshotCache:
+    """조회 결과를 짧은 TTL 동안 재사용하고, 같은 키의 동시 요청은 진행 중인 한 번의 호출로 합칩니다."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock      # 모의 거래소에서는 모의 시계를 넘겨 TTL 을 계산합니다.
+        self._values = {}       # key -> (만료 시각, 값)
+        self._inflight = {}     # key -> _Flight
+        self._lock = threading.Lock()
+
+    def get(self, key, loader, ttl):
+        with self._lock:
+            cached = self._values.get(key)
+            if cached and cached[0] > self.clock():
+                return cached[1]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                # 조회 도중 invalidate 되었다면 결과를 캐시에 남기지 않습니다.
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                    if flight.error is None:
+                        self._values[key] = (self.clock() + ttl, flight.value)
+            flight.event.set()
+        return flight.value
+
+    def put(self, key, value, ttl):
+        """다른 경로(예: 일괄 조회)로 얻은 값을 캐시에 넣습니다."""
+        with self._lock:
+            self._values[key] = (self.clock() + ttl, value)
+
+    def invalidate(self, *keys):
+        """주어진 키(없으면 전체)의 스냅샷을 버립니다. 자체 주문 직후 호출합니다."""
+        with self._lock:
+            for key in keys or set(self._values) | set(self._inflight):
+                self._values.pop(key, None)
+                self._inflight.pop(key, None)
+
+
+# -----------------------------------------------------------------------------
+# 시세 스트림 피드 (이벤트 기반 실행용)
+# -----------------------------------------------------------------------------
+class MarketEvent:
+    """피드가 보내는 시세 이벤트. kind 는 'candle', 'trade', 'error', 'end' 중 하나입니다."""
+    __slots__ = ('kind', 'symbol', 'timeframe', 'candle', 'price', 'amount', 'timestamp', 'error')
+
+    def __init__(self, kind, symbol, timeframe=None, candle=None, price=None, amount=0.0, timestamp=None, error=None):
+        self.kind = kind
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.candle = candle
+        self.price = price
+        self.amount = amount
+        self.timestamp = timestamp
+        self.error = error
+
+
+class MarketDataFeed:
+    """스트리밍 시세 피드 인터페이스입니다. 하위 클래스는 _run 에서 _emit 으로 MarketEvent 를 보냅니다."""
+
+    def __init__(self, symbol, timeframe):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.running = False
+        self._subscribers = []
+        self._thread = None
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def _emit(self, event):
+        for callback in self._subscribers:
+            callback(event)
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def snapshot(self):
+        """시작 시점의 캔들 창을 바로 줄 수 있는 피드는 배열을 반환합니다. 없으면 None (REST 로 워밍업)."""
+        return None
+
+    def _run(self):
+        raise NotImplementedError
+
+
+class ReplayFeed(MarketDataFeed):
+    """기록된 캔들 배열을 캔들 이벤트로 재생합니다. speed 가 None 이면 최대 속도, 아니면 실시간의 speed 배속."""
+
+    def __init__(self, symbol, timeframe, candles, speed=None, tf_seconds=None):
+        super().__init__(symbol, timeframe)
+        self.candles = np.asarray(candles, dtype=np.float64)
+        self.delay = (tf_seconds / speed) if speed and tf_seconds else 0
+
+    def _run(self):
+        for row in self.candles:
+            if not self.running: break
+            self._emit(MarketEvent('candle', self.symbol, self.timeframe, candle=row, price=row[CLOSE], timestamp=int(row[TS])))
+            if self.delay: time.sleep(self.delay)
+        self._emit(MarketEvent('end', self.symbol, self.timeframe))
+
+
+class CcxtProFeed(MarketDataFeed):
+    """ccxt.pro 웹소켓으로 게이트아이오 캔들과 체결을 받아 이벤트로 보냅니다."""
+
+    def __init__(self, symbol, timeframe, trades=True):
+        super().__init__(symbol, timeframe)
+        self.trades = trades
+
+    def _run(self):
+        import asyncio
+        asyncio.run(self._main())
+
+    async def _main(self):
+        import asyncio
+        import ccxt.pro as ccxtpro
+        exchange = ccxtpro.gateio({'options': {'defaultType': 'swap', 'settle': 'usdt'}})
+        watchers = [self._watch_ohlcv(exchange)]
+        if self.trades:
+            watchers.append(self._watch_trades(exchange))
+        try:
+            await asyncio.gather(*watchers)
+        finally:
+            await exchange.close()
+
+    async def _watch_ohlcv(self, exchange):
+        import asyncio
+        while self.running:
+            try:
+                ohlcv = await exchange.watch_ohlcv(self.symbol, self.timeframe)
+                for row in ohlcv[-2:]:
+                    self._emit(MarketEvent('candle', self.symbol, self.timeframe, candle=row, price=row[CLOSE], timestamp=row[TS]))
+            except Exception as e:
+                self._emit(MarketEvent('error', self.symbol, self.timeframe, error=e))
+                await asyncio.sleep(1)
+
+    async def _watch_trades(self, exchange):
+        import asyncio
+        while self.running:
+            try:
+                for trade in await exchange.watch_trades(self.symbol):
+                    self._emit(MarketEvent('trade', self.symbol, self.timeframe, price=trade['price'],
+                                           amount=trade.get('amount') or 0.0, timestamp=trade['timestamp']))
+            except Exception as e:
+                self._emit(MarketEvent('error', self.symbol, self.timeframe, error=e))
+                await asyncio.sleep(1)
+
+
+# -----------------------------------------------------------------------------
+# 공유 메모리 시세 배포 (데이터 데몬 1개 -> 전략 워커 프로세스 N개)
+# -----------------------------------------------------------------------------
+SHM_PREFIX = 'luvbug'
+SHM_HEADER = 4                  # int64 헤더: [시퀀스, 캔들 수, 용량, 예약]
+
+
+def shm_name(prefix, symbol, timeframe):
+    """(심볼, 타임프레임)별 공유 메모리 이름. 영숫자와 밑줄만 씁니다."""
+    raw = f"{prefix}_{symbol}_{timeframe}"
+    return ''.join(ch if ch.isalnum() else '_' for ch in raw)
+
+
+class SharedCandleRing:
+    """공유 메모리에 최근 캔들 창을 담고 시퀀스 락(seqlock)으로 일관된 읽기를 보장합니다.
+
+    쓰는 쪽은 시퀀스를 홀수로 올린 뒤 창 전체를 쓰고 다시 짝수로 올립니다. 읽는 쪽은 시퀀스만 비교해
+    새 데이터를 감지하고, 복사 전후 시퀀스가 같을 때만 결과를 받아들입니다.
+    """
+
+    def __init__(self, name, capacity=500, create=False):
+        size = (SHM_HEADER + capacity * len(OHLCV_COLUMNS)) * 8
+        if create:
+            try:
+                self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+            except FileExistsError:
+                # 이전 데몬이 정리하지 못한 세그먼트는 크기가 맞으면 그대로 다시 씁니다.
+                self._shm = shared_memory.SharedMemory(name)
+                if self._shm.size < size:
+                    self._shm.close()
+                    raise
+        else:
+            self._shm = self._attach(name)
+        self.name = name
+        self.owner = create
+        self._header = np.ndarray((SHM_HEADER,), dtype=np.int64, buffer=self._shm.buf)
+        if create:
+            self._header[:] = (0, 0, capacity, 0)
+        self.capacity = int(self._header[2])
+        self._data = np.ndarray((self.capacity, len(OHLCV_COLUMNS)), dtype=np.float64,
+                                buffer=self._shm.buf, offset=SHM_HEADER * 8)
+
+    @staticmethod
+    def _attach(name):
+        if sys.version_info >= (3, 13):
+            return shared_memory.SharedMemory(name, track=False)
+        # 3.13 미만은 붙기만 한 프로세스도 종료 시 세그먼트를 지우므로 이 세그먼트의 등록만 해제합니다.
+        shm = shared_memory.SharedMemory(name)
+        if os.name == 'posix':      # 등록은 POSIX 에서만 일어납니다.
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+    @property
+    def seq(self):
+        return int(self._header[0])
+
+    def publish(self, rows):
+        """캔들 창(최대 capacity 개)을 통째로 씁니다. 쓰는 쪽은 하나뿐이어야 합니다."""
+        rows = np.asarray(rows, dtype=np.float64)[-self.capacity:]
+        header = self._header
+        header[0] += 1
+        self._data[:len(rows)] = rows
+        header[1] = len(rows)
+        header[0] += 1
+
+    def view(self):
+        """복사 없는 현재 창. 사용 후 seq 가 그대로인지 확인해야 일관성이 보장됩니다."""
+        return self._data[:int(self._header[1])]
+
+    def read(self, n=None):
+        """(시퀀스, 최근 n 개 캔들 복사본)을 일관된 상태로 읽습니다."""
+        header = self._header
+        while True:
+            seq = int(header[0])
+            if seq & 1:
+                time.sleep(0)
+                continue
+            count = int(header[1])
+            rows = self._data[max(0, count - n) if n else 0:count].copy()
+            if int(header[0]) == seq:
+                return seq, rows
+
+    def close(self):
+        del self._header, self._data
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+
+class MarketDataDaemon:
+    """(심볼, 타임프레임)마다 REST 로 한 번만 캔들을 받아 공유 메모리 링으로 배포합니다.
+
+    전략 워커가 몇 개든 시세 요청 수는 구독 수 × (1 / interval) 로 고정됩니다.
+    """
+
+    def __init__(self, exchange, subscriptions, capacity=500, interval=5.0, prefix=SHM_PREFIX):
+        self.cache = OHLCVCache(exchange, capacity=capacity)
+        self.capacity = capacity
+        self.interval = interval
+        self.rings = {(symbol, tf): SharedCandleRing(shm_name(prefix, symbol, tf), capacity, create=True)
+                      for symbol, tf in subscriptions}
+        self._published = {}
+        self._stop = threading.Event()
+        self.logger = logging.getLogger(__name__)
+
+    def poll_once(self):
+        """모든 구독을 갱신하고 바뀐 창만 배포합니다. 배포한 링 수를 반환합니다."""
+        published = 0
+        for (symbol, tf), ring in self.rings.items():
+            try:
+                buf = self.cache.update(symbol, tf, limit=self.capacity)
+                with buf.lock:
+                    rows = buf.view()
+                    if not len(rows):
+                        continue
+                    marker = (len(rows), *rows[-1])
+                    if self._published.get((symbol, tf)) == marker:
+                        continue
+                    ring.publish(rows)
+                self._published[(symbol, tf)] = marker
+                published += 1
+            except Exception as e:
+                self.logger.warning("%s %s 캔들 갱신 오류: %s", symbol, tf, e)
+        return published
+
+    def run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.poll_once()
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        for ring in self.rings.values():
+            ring.close()
+            ring.unlink()
+
+
+class SharedMemoryFeed(MarketDataFeed):
+    """MarketDataDaemon 이 배포하는 공유 메모리 링을 폴링해 새 캔들을 이벤트로 보냅니다.
+
+    시퀀스가 바뀔 때만 창을 읽으므로 데이터가 그대로면 폴링 비용은 정수 비교 하나입니다.
+    """
+
+    def __init__(self, symbol, timeframe, prefix=SHM_PREFIX, poll_interval=0.2):
+        super().__init__(symbol, timeframe)
+        self.name = shm_name(prefix, symbol, timeframe)
+        self.poll_interval = poll_interval
+        self._ring = None
+        self._seq = None
+        self._last_ts = None
+
+    def _ensure_ring(self):
+        if self._ring is None:
+            self._ring = SharedCandleRing(self.name)
+        return self._ring
+
+    def snapshot(self):
+        ring = self._ensure_ring()
+        self._seq, rows = ring.read()
+        if len(rows):
+            self._last_ts = rows[-1, TS]
+        return rows
+
+    def _run(self):
+        while self.running:
+            try:
+                ring = self._ensure_ring()
+                if ring.seq != self._seq:
+                    self._seq, rows = ring.read()
+                    if self._last_ts is not None:
+                        rows = rows[rows[:, TS] >= self._last_ts]
+                    for row in rows:
+                        self._emit(MarketEvent('candle', self.symbol, self.timeframe, candle=row, price=row[CLOSE],
+                                               timestamp=int(row[TS])))
+                    if len(rows):
+                        self._last_ts = rows[-1, TS]
+            except FileNotFoundError as e:
+                self._emit(MarketEvent('error', self.symbol, self.timeframe, error=e))
+                time.sleep(1)
+                continue
+            time.sleep(self.poll_interval)
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+
+# -----------------------------------------------------------------------------
+# 이벤트 버스 (봇 -> GUI/파일/지표 구독자)
+# -----------------------------------------------------------------------------
+class BotEvent:
+    """봇이 발행하는 이벤트의 기본 클래스입니다."""
+    __slots__ = ('timestamp',)
+
+    def __init__(self):
+        self.timestamp = time.time()
+
+
+class LogEvent(BotEvent):
+    __slots__ = ('message',)
+
+    def __init__(self, message):
+        super().__init__()
+        self.message = message
+
+
+class BalanceEvent(BotEvent):
+    __slots__ = ('balance',)
+
+    def __init__(self, balance):
+        super().__init__()
+        self.balance = balance
+
+
+class AlarmEvent(BotEvent):
+    __slots__ = ()
+
+
+class StopEvent(BotEvent):
+    __slots__ = ()
+
+
+class EventBus:
+    """봇 이벤트를 타입별 구독자에게 발행한 스레드에서 바로 전달합니다.
+
+    GUI 처럼 정해진 스레드에서 처리해야 하는 구독자는 Queue.put 을 등록합니다.
+    """
+
+    def __init__(self):
+        self._subscribers = []      # (이벤트 타입, 콜백)
+        self._dispatch = {}         # 실제 타입 -> 콜백 튜플 (구독 변경 시 초기화)
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback, event_type=BotEvent):
+        with self._lock:
+            self._subscribers = self._subscribers + [(event_type, callback)]
+            self._dispatch = {}
+
+    def publish(self, event):
+        callbacks = self._dispatch.get(type(event))
+        if callbacks is None:
+            callbacks = tuple(cb for event_type, cb in self._subscribers if isinstance(event, event_type))
+            self._dispatch[type(event)] = callbacks
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception:
+                logging.getLogger(__name__).exception("이벤트 구독자 오류")
+
+
+LOG_FILE = 'luvbug.log'
+
+
+def create_file_logger(path=LOG_FILE, max_bytes=5 * 1024 * 1024, backup_count=5):
+    """전체 로그를 백그라운드 스레드에서 회전 파일로 기록하는 (로거, 리스너)를 만듭니다."""
+    file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter('[%(asctime)s] %(message)s', '%Y-%m-%d %H:%M:%S'))
+    log_queue = Queue()
+    listener = QueueListener(log_queue, file_handler)
+    logger = logging.getLogger(f"luvbug.file.{os.path.abspath(path)}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.handlers[:] = [QueueHandler(log_queue)]
+    listener.start()
+    return logger, listener
+
+
+class FileLogSink:
+    """로그/잔액 이벤트를 회전 로그 파일에 기록합니다. 파일 쓰기는 백그라운드 스레드에서 합니다."""
+
+    def __init__(self, path=LOG_FILE):
+        self.logger, self.listener = create_file_logger(path)
+
+    def __call__(self, event):
+        if isinstance(event, LogEvent):
+            self.logger.info(event.message)
+        elif isinstance(event, BalanceEvent):
+            self.logger.info(f"잔액: {event.balance:.2f} USDT")
+
+    def close(self):
+        self.listener.stop()
+
+
+class ConsoleSink:
+    def __call__(self, event):
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(event.timestamp))
+        print(f"[{stamp}] {event.message}", flush=True)
+
+
+class MetricsSink:
+    """이벤트 종류별 개수와 마지막 잔액을 집계합니다."""
+
+    def __init__(self):
+        self.counts = {}
+        self.last_balance = None
+
+    def __call__(self, event):
+        name = type(event).__name__
+        self.counts[name] = self.counts.get(name, 0) + 1
+        if isinstance(event, BalanceEvent):
+            self.last_balance = event.balance
+
+    def snapshot(self):
+        return {'events': dict(self.counts), 'balance': self.last_balance}
+
+
+# -----------------------------------------------------------------------------
+# 상태 저널 (재시작 복구용 추가 전용 기록)
+# -----------------------------------------------------------------------------
+DEFAULT_STATE_DIR = 'state'
+JOURNAL_SNAPSHOT_EVERY = 500    # 이 줄 수가 쌓이면 전체 상태 스냅샷 한 줄로 압축합니다.
+JOURNAL_FSYNC_INTERVAL = 1.0    # 일반 기록의 fsync 최소 간격(초). 진입/청산 기록은 즉시 fsync 합니다.
+
+
+def _json_default(value):
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+class StateJournal:
+    """봇 상태 변화와 주문을 JSON Lines 로 덧붙여 기록하고, 재시작 시 마지막 상태를 되살립니다.
+
+    상태는 바뀐 필드만 'state' 줄로 남기고, 줄이 snapshot_every 개를 넘으면 현재 상태 스냅샷 한 줄로
+    파일을 원자적으로 교체합니다. 쓰기 도중 끊긴 마지막 줄은 읽을 때 무시합니다.
+    """
+
+    def __init__(self, path, snapshot_every=JOURNAL_SNAPSHOT_EVERY, fsync_interval=JOURNAL_FSYNC_INTERVAL):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.fsync_interval = fsync_interval
+        self.state = {}
+        self.orders = []            # 마지막 스냅샷 이후 주문 기록
+        self._lines = 0
+        self._lock = threading.Lock()
+        self._batch = 0
+        self._dirty = False
+        self._last_fsync = time.monotonic()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.load()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def load(self):
+        """파일에서 상태를 다시 만듭니다. 마지막 스냅샷 이후의 변경분만 적용합니다."""
+        self.state, self.orders, self._lines = {}, [], 0
+        if not os.path.exists(self.path):
+            return self.state
+        valid_end = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break           # 비정상 종료로 잘린 마지막 줄
+                valid_end += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self._lines += 1
+                kind = record.get('kind')
+                if kind == 'snapshot':
+                    self.state, self.orders = dict(record['state']), []
+                elif kind == 'state':
+                    self.state.update(record['state'])
+                elif kind == 'order':
+                    self.orders.append(record)
+        if valid_end < os.path.getsize(self.path):
+            # 잘린 줄 뒤에 이어 쓰면 다음 기록까지 깨지므로 잘라냅니다.
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_end)
+        return self.state
+
+    def _write(self, record, durable):
+        self._file.write(json.dumps(record, ensure_ascii=False, default=_json_default) + '\n')
+        self._file.flush()
+        self._lines += 1
+        self._dirty = True
+        if self._batch == 0 and (durable or time.monotonic() - self._last_fsync >= self.fsync_interval):
+            self._fsync()
+
+    def _fsync(self):
+        if self._dirty:
+            os.fsync(self._file.fileno())
+            self._dirty = False
+        self._last_fsync = time.monotonic()
+
+    @contextmanager
+    def batch(self):
+        """블록 안의 기록들을 fsync 한 번으로 묶습니다."""
+        with self._lock:
+            self._batch += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch -= 1
+                if self._batch == 0:
+                    self._fsync()
+
+    def update(self, state, durable=False):
+        """바뀐 필드만 기록합니다. 기록한 필드 딕셔너리를 반환합니다.
+
+        값은 복사해 보관합니다. 호출한 쪽이 같은 딕셔너리를 나중에 고쳐도 다음 비교에서 변경으로 잡힙니다.
+        """
+        with self._lock:
+            delta = {k: copy.deepcopy(v) for k, v in state.items() if k not in self.state or self.state[k] != v}
+            if not delta:
+                return delta
+            self.state.update(delta)
+            self._write({'t': time.time(), 'kind': 'state', 'state': delta}, durable)
+            if self._lines >= self.snapshot_every and self._batch == 0:
+                self._compact()
+            return delta
+
+    def record_order(self, role, order, durable=False):
+        fields = {k: order.get(k) for k in ('id', 'type', 'side', 'amount', 'filled', 'average', 'status', 'stopPrice')}
+        record = {'t': time.time(), 'kind': 'order', 'role': role, 'order': fields}
+        with self._lock:
+            self.orders.append(record)
+            self._write(record, durable)
+
+    def _compact(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'t': time.time(), 'kind': 'snapshot', 'state': self.state},
+                               ensure_ascii=False, default=_json_default) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmp, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._lines, self.orders = 1, []
+        self._dirty = False
+
+    def close(self):
+        with self._lock:
+            self._fsync()
+            self._file.close()
+
+
+# -----------------------------------------------------------------------------
+# 트레이딩 봇 로직 클래스
+# -----------------------------------------------------------------------------
+FILL_CONFIRM_TIMEOUT = 5.0      # 진입 체결 확인 최대 대기(초)
+FILL_POLL_INTERVAL = 0.2        # 주문 응답에 체결이 없을 때 fetch_order 재조회 간격(초)
+ORDER_RETRIES = 3               # SL/TP 주문 네트워크 오류 시 최대 시도 횟수
+ORDER_RETRY_DELAY = 0.3
+
+RISK_STATE_FIELDS = ('active_setup', 'last_trade_profit', 'consecutive_reinvestment_wins',
+                     'reinvestment_target_achieved', 'balance_at_trade_start', 'is_reinvestment_trade')
+
+
+class TradingBot:
+    def __init__(self, api_key, api_secret, params, bus, exchange=None, candle_cache=None, account_cache=None,
+                 metrics=None, log_prefix='', position_slots=None):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.bus = bus
+        self.log_prefix = log_prefix
+        
+        self.symbol = params['symbol']
+        self.timeframe = params['timeframe']
+        self.trend_timeframe = params['trend_timeframe']
+        self.rr_ratio = params['rr_ratio']
+        self.risk_per_trade_usd = params['risk_per_trade_usd']
+        self.reinvestment_percent = params['reinvestment_percent']
+        self.initial_capital = params['initial_capital']
+        self.ob_entry_level = params['ob_entry_level']
+        self.strategy = params.get('strategy', 'breakout')
+        self.lookback = int(params.get('lookback', BREAKOUT_LOOKBACK))
+        self.ob_detector = OrderBlockDetector(self.ob_entry_level)
+        self._ob_revision = 0
+        self.trend_filter = TrendFilter()
+        
+        self.reinvestment_target_achieved = False
+        self.consecutive_reinvestment_wins = 0
+        self.last_trade_profit = 0.0
+        self.is_reinvestment_trade = False
+        self.balance_at_trade_start = 0.0
+
+        self.is_running = False
+        self.active_setup = None
+        self.entry_retry_at = 0         # 진입 주문 실패 후 다시 시도할 수 있는 시각(ms)
+        self.position_slots = position_slots    # 다중 심볼 스캐너가 공유하는 동시 포지션 한도
+        self._contract_size = None
+
+        # 다중 심볼 스캐너는 거래소 세션(이미 계측됨)과 캐시, 지표를 공유해서 넘겨줍니다.
+        self.metrics = metrics or MetricsRegistry()
+        if exchange is None:
+            # 같은 프로세스의 모든 봇이 하나의 요청 예산을 나눠 씁니다.
+            raw = create_exchange(self.api_key, self.api_secret, enable_rate_limit=False)
+            exchange = RateLimitedExchange(InstrumentedExchange(raw, self.metrics), shared_rate_limiter(1000 / raw.rateLimit))
+        self.exchange = exchange
+        self.scheduler = RequestScheduler(self.timeframe)
+        self._position_due = 0          # 다음 포지션 확인 시각(거래소 ms)
+        self._signal_due = 0            # 다음 신호 확인 시각(거래소 ms)
+        self._refreshed_bar = None      # 마감 직후 캔들을 받은 마지막 봉의 시작 시각(ms)
+        data_dir = params.get('data_dir', DEFAULT_DATA_DIR)
+        self.candle_cache = candle_cache or OHLCVCache(self.exchange, store=OHLCVStore(data_dir) if data_dir else None)
+        self.account_cache = account_cache or SnapshotCache()
+        self.order_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='orders')   # SL/TP 동시 제출용
+        self.log(f"게이트아이오 실거래 모드로 연결합니다. 심볼: {self.symbol}")
+        self.log(f"초기 자본금: ${self.initial_capital:.2f}")
+        state_dir = params.get('state_dir', DEFAULT_STATE_DIR)
+        journal_path = os.path.join(state_dir, self.symbol.replace('/', '_').replace(':', '_') + '.jsonl') if state_dir else None
+        self.journal = StateJournal(journal_path) if journal_path else None
+        self.restore_state()
+
+    def log(self, message):
+        self.bus.publish(LogEvent(f"{self.log_prefix}{message}"))
+
+    def play_alarm(self):
+        self.bus.publish(AlarmEvent())
+
+    def restore_state(self):
+        """저널에 남은 리스크 상태(진행 중 거래, 재투자 연속 성공 등)를 되살립니다."""
+        if not self.journal or not self.journal.state:
+            return
+        for field in RISK_STATE_FIELDS:
+            if field in self.journal.state:
+                setattr(self, field, copy.deepcopy(self.journal.state[field]))
+        setup = self.active_setup
+        trade = f"{setup['side']} 진입가 ${setup.get('entry_price', 0):.4f}" if setup else "없음"
+        self.log(f"저널에서 상태를 복원했습니다. 진행 중 거래: {trade}, "
+                 f"재투자 연속 성공 {self.consecutive_reinvestment_wins}회, 목표 달성 {self.reinvestment_target_achieved}")
+
+    def save_state(self, durable=False):
+        if self.journal:
+            self.journal.update({field: getattr(self, field) for field in RISK_STATE_FIELDS}, durable=durable)
+
+    def journal_order(self, role, order):
+        if self.journal and order:
+            self.journal.record_order(role, order, durable=True)
+
+    def reconcile(self, positions=None):
+        """복원한 상태를 거래소 포지션과 맞춥니다. positions 는 여러 심볼을 한 번에 조회한 결과(없으면 직접 조회)."""
+        if positions is not None:
+            mine = [p for p in positions if self.symbol in (p.get('symbol'), (p.get('info') or {}).get('contract'))]
+            self.account_cache.put(('positions', self.symbol), mine, POSITION_TTL)
+        position = self.get_position_info()
+        setup = self.active_setup
+        if setup and self.position_slots and not self.position_slots.claim(self.symbol, force=True):
+            self.log(f"⚠️ 진행 중 거래가 동시 포지션 한도({self.position_slots.limit}개)를 넘습니다.")
+        if setup and position:
+            pos_side = 'buy' if float(position['contracts']) > 0 else 'sell'
+            if pos_side != setup['side']:
+                self.log(f"⚠️ 저널의 거래 방향({setup['side']})과 거래소 포지션({pos_side})이 달라 거래소 기준으로 맞춥니다.")
+                self.active_setup = {'side': pos_side}
+                self.save_state(durable=True)
+            else:
+                self.log(f"저널의 진행 중 거래를 거래소 포지션과 확인했습니다. 수량: {position['contracts']}")
+        elif setup:
+            self.log("저널의 거래가 재시작 사이에 청산되었습니다. 다음 주기에 손익을 정산합니다.")
+        return position
+
+    def get_balance(self, fresh=False):
+        """USDT 잔액을 반환합니다. 같은 주기 안에서는 BALANCE_TTL 동안 같은 스냅샷을 재사용합니다."""
+        try:
+            if fresh:
+                self.account_cache.invalidate('balance')
+            balance = self.account_cache.get(
+                'balance', lambda: self.exchange.fetch_balance(params={'settle': 'usdt'}), BALANCE_TTL)
+            return balance['total'].get('USDT', 0)
+        except Exception as e:
+            self.log(f"잔액 조회 오류: {e}")
+            return 0
+            
+    def update_balance_display(self):
+        usdt_balance = self.get_balance()
+        self.bus.publish(BalanceEvent(usdt_balance))
+
+    def fetch_candles(self, timeframe, limit=100):
+        """캔들 캐시를 증분 갱신하고 최근 limit 개 캔들을 NumPy 배열 뷰로 반환합니다."""
+        try:
+            buf = self.candle_cache.update(self.symbol, timeframe, limit=limit)
+            return buf.view(limit)
+        except Exception as e:
+            self.log(f"가격 데이터 조회 오류 ({timeframe}): {e}")
+            return None
+
+    def fetch_ohlcv(self, timeframe, limit=100):
+        candles = self.fetch_candles(timeframe, limit=limit)
+        if candles is None or len(candles) == 0:
+            return pd.DataFrame()
+        df = pd.DataFrame(candles, columns=list(OHLCV_COLUMNS))
+        df['timestamp'] = pd.to_datetime(df['timestamp'].astype('int64'), unit='ms')
+        return df
+
+    def contract_size(self):
+        """계약 1개당 기초자산 수량 (마켓 정보의 contractSize). 처음 한 번만 조회합니다."""
+        if self._contract_size is None:
+            try:
+                self.exchange.load_markets()
+                self._contract_size = float(self.exchange.market(self.symbol).get('contractSize') or 1.0)
+            except Exception as e:
+                self.log(f"계약 단위 조회 오류, 1로 계산합니다: {e}")
+                return 1.0
+        return self._contract_size
+
+    def calculate_position_size(self, entry_price, sl_price):
+        current_balance = self.get_balance()
+        
+        if not self.reinvestment_target_achieved and current_balance >= self.initial_capital * 2:
+            self.reinvestment_target_achieved = True
+            self.log(f"🎉 재투자 목표 달성! 현재 잔액: ${current_balance:.2f}")
+            self.play_alarm()
+
+        risk_amount_usd, self.is_reinvestment_trade = select_risk_amount(
+            self.risk_per_trade_usd, self.reinvestment_percent, self.reinvestment_target_achieved,
+            self.last_trade_profit, self.consecutive_reinvestment_wins)
+        
+        if self.is_reinvestment_trade:
+            self.log(f"🚀 재투자 실행! 직전 수익(${self.last_trade_profit:.2f})의 {self.reinvestment_percent*100}%인 ${risk_amount_usd:.2f}를 리스크로 설정.")
+        else:
+            self.log(f"🛡️ 고정 리스크 실행. 리스크: ${risk_amount_usd:.2f}")
+
+        contract_amount = calc_contract_amount(risk_amount_usd, entry_price, sl_price, self.contract_size())
+        if contract_amount is None:
+            self.log("오류: 진입가와 손절가가 같아 포지션 크기를 계산할 수 없습니다.")
+            return None
+        
+        self.log(f"계산된 계약 수량: {contract_amount:.2f}")
+        return contract_amount
+
+    def check_for_entry(self, refresh=True, last_price=None):
+        """돌파 신호를 평가합니다. refresh=False 면 REST 조회 없이 캐시(스트림으로 갱신된) 캔들을 씁니다."""
+        if self.strategy == 'orderblock':
+            return self.check_orderblock_entry(refresh=refresh, last_price=last_price)
+
+        if refresh:
+            candles = self.fetch_candles(self.timeframe, limit=self.lookback + 1)
+        else:
+            candles = self.candle_cache.buffer(self.symbol, self.timeframe).view(1)
+        if candles is None or len(candles) == 0: return None
+
+        detector = self.candle_cache.breakout(self.symbol, self.timeframe, self.lookback)
+        if detector.check(candles[-1, HIGH], candles[-1, LOW]) > 0:
+            high_water_mark = detector.high_water_mark
+            self.log(f"돌파 신호 포착! 기준 가격: ${high_water_mark}")
+            entry_price = last_price if last_price is not None else self.exchange.fetch_ticker(self.symbol)['last']
+            sl_price = high_water_mark * SL_BUFFER_RATIO
+
+            risk_per_unit = abs(entry_price - sl_price)
+            tp_price = entry_price + (risk_per_unit * self.rr_ratio)
+
+            amount = self.calculate_position_size(entry_price, sl_price)
+            if not amount or amount <= 0:
+                self.log("계산된 주문 수량이 0보다 작아 진입하지 않습니다.")
+                return None
+
+            return {
+                'side': 'buy', 'entry_price': entry_price, 'sl_price': sl_price,
+                'tp_price': tp_price, 'amount': amount
+            }
+        return None
+
+    def trend_direction(self):
+        """trend_timeframe 확정 봉 EMA 기준 추세 방향(+1/-1/0)을 반환합니다.
+
+        trend_timeframe 이 timeframe 의 배수이면 이미 받은 기본 봉으로 만들어 추가 요청을 하지 않습니다.
+        """
+        if can_resample(self.timeframe, self.trend_timeframe):
+            try:
+                candles = self.candle_cache.resampled(self.symbol, self.timeframe, self.trend_timeframe,
+                                                      seed_limit=TREND_EMA_PERIOD * 4).view()
+            except Exception as e:
+                self.log(f"가격 데이터 조회 오류 ({self.trend_timeframe}): {e}")
+                return 0
+        else:
+            candles = self.fetch_candles(self.trend_timeframe, limit=TREND_EMA_PERIOD * 4)
+        if candles is None or len(candles) < 2: return 0
+        self.trend_filter.sync(candles[:-1])
+        return self.trend_filter.direction
+
+    def check_orderblock_entry(self, refresh=True, last_price=None):
+        """추세 방향의 활성 오더블록 진입 레벨(ob_entry_level)에 현재 봉이 닿으면 진입 설정을 만듭니다."""
+        if refresh:
+            candles = self.fetch_candles(self.timeframe, limit=OB_HISTORY)
+        else:
+            candles = self.candle_cache.buffer(self.symbol, self.timeframe).view(OB_HISTORY)
+        if candles is None or len(candles) < 4: return None
+
+        revision = self.candle_cache.buffer(self.symbol, self.timeframe).revision
+        if revision != self._ob_revision:
+            self.ob_detector.last_timestamp = None     # 확정 봉이 고쳐졌으면 warmup 으로 다시 만듭니다.
+            self._ob_revision = revision
+        self.ob_detector.sync(candles[:-1])
+        zone = self.ob_detector.match(candles[-1, LOW], candles[-1, HIGH], self.trend_direction())
+        if zone is None: return None
+        self.ob_detector.consume(zone)
+
+        direction = 1 if zone.side == 'buy' else -1
+        self.log(f"오더블록 {'매수' if direction > 0 else '매도'} 신호 포착! 구역: ${zone.bottom:.4f}~${zone.top:.4f}, 진입 레벨: ${zone.entry:.4f}")
+        entry_price = last_price if last_price is not None else self.exchange.fetch_ticker(self.symbol)['last']
+        sl_price = zone.stop_price
+        if (entry_price - sl_price) * direction <= 0:
+            self.log("현재가가 이미 손절가를 넘어 진입하지 않습니다.")
+            return None
+
+        risk_per_unit = abs(entry_price - sl_price)
+        tp_price = entry_price + direction * risk_per_unit * self.rr_ratio
+
+        amount = self.calculate_position_size(entry_price, sl_price)
+        if not amount or amount <= 0:
+            self.log("계산된 주문 수량이 0보다 작아 진입하지 않습니다.")
+            return None
+
+        return {
+            'side': zone.side, 'entry_price': entry_price, 'sl_price': sl_price,
+            'tp_price': tp_price, 'amount': amount
+        }
+
+    def get_position_info(self, fresh=False):
+        try:
+            if fresh:
+                self.account_cache.invalidate(('positions', self.symbol))
+            positions = self.account_cache.get(
+                ('positions', self.symbol), lambda: self.exchange.fetch_positions(symbols=[self.symbol]), POSITION_TTL)
+            open_positions = [p for p in positions if float(p['contracts']) != 0]
+            if open_positions: return open_positions[0]
+        except Exception as e:
+            self.log(f"포지션 정보 조회 오류: {e}")
+        return None
+
+    def invalidate_account(self):
+        """자체 주문으로 바뀐 잔액/포지션 스냅샷을 버립니다."""
+        self.account_cache.invalidate('balance', ('positions', self.symbol))
+
+    @staticmethod
+    def client_order_id(role):
+        """Gate.io 사용자 주문 ID(text). 't-' 로 시작하고 28자 이내여야 합니다."""
+        return f"t-{role}-{os.urandom(6).hex()}"
+
+    def find_open_order(self, client_id, trigger=False):
+        """client_id(text)로 낸 미체결 주문을 찾습니다. 조회 오류는 호출한 쪽으로 올립니다."""
+        orders = self.exchange.fetch_open_orders(self.symbol, params={'trigger': True} if trigger else {})
+        for order in orders:
+            if client_id in (order.get('clientOrderId'), (order.get('info') or {}).get('text')):
+                return order
+        return None
+
+    def place_entry_order(self, setup):
+        client_id = self.client_order_id('entry')
+        try:
+            self.log(f"포지션 진입 시도: {setup['side']} {setup['amount']:.2f} contracts of {self.symbol}")
+            order = self.exchange.create_market_order(self.symbol, setup['side'], setup['amount'],
+                                                      params={'text': client_id})
+            self.invalidate_account()
+            self.log(f"포지션 진입 성공! 진입 가격: approx ${setup['entry_price']:.4f}")
+            self.play_alarm()
+            return order
+        except ccxt.NetworkError as e:
+            # 응답만 잃었을 수 있으므로 다시 주문하지 않고 포지션으로 체결 여부를 확인합니다.
+            self.log(f"진입 주문 응답 오류: {e}. 포지션으로 체결 여부를 확인합니다.")
+            self.invalidate_account()
+            position = self.get_position_info()
+            if not position:
+                return None
+            contracts = abs(float(position['contracts']))
+            self.log(f"진입 주문이 체결되어 있었습니다. 수량: {contracts}")
+            self.play_alarm()
+            return {'id': None, 'clientOrderId': client_id, 'status': 'closed', 'filled': contracts,
+                    'amount': contracts, 'side': setup['side'], 'type': 'market'}
+        except Exception as e:
+            self.log(f"진입 주문 오류: {e}")
+            return None
+
+    def confirm_fill(self, order):
+        """진입 주문의 체결 수량을 확인합니다. 응답에 체결이 없으면 FILL_CONFIRM_TIMEOUT 동안 fetch_order 로 재조회합니다.
+
+        체결 수량(계약)을 반환하고, 끝내 확인하지 못하면 None 을 반환합니다.
+        """
+        deadline = time.monotonic() + FILL_CONFIRM_TIMEOUT
+        for attempt in itertools.count():
+            status, filled = order.get('status'), float(order.get('filled') or 0)
+            if status == 'closed':
+                return filled or float(order.get('amount') or 0)
+            if status == 'canceled' or not order.get('id') or time.monotonic() >= deadline:
+                return filled or None   # 부분 체결이면 체결된 만큼만 보호합니다.
+            if attempt:
+                time.sleep(FILL_POLL_INTERVAL)
+            try:
+                order = self.exchange.fetch_order(order['id'], self.symbol)
+            except Exception as e:
+                self.log(f"주문 체결 조회 오류: {e}")
+
+    def _submit_order(self, order_type, side, amount, params, role):
+        """보호 주문 하나를 제출합니다. 네트워크 오류만 ORDER_RETRIES 회까지 다시 시도합니다.
+
+        타임아웃이면 주문이 이미 접수됐을 수 있으므로, 다시 내기 전에 같은 사용자 주문 ID 의 미체결 주문을 찾습니다.
+        조회마저 실패하면 중복 주문을 내지 않고 다음 시도에서 다시 조회합니다.
+        """
+        client_id = self.client_order_id(role)
+        params = dict(params, text=client_id)
+        for attempt in range(1, ORDER_RETRIES + 1):
+            try:
+                if attempt > 1:
+                    existing = self.find_open_order(client_id, trigger=True)
+                    if existing:
+                        self.log(f"{order_type} 주문이 이미 접수되어 있어 다시 내지 않습니다.")
+                        return existing
+                return self.exchange.create_order(self.symbol, order_type, side, amount, params=params)
+            except ccxt.NetworkError as e:
+                if attempt == ORDER_RETRIES:
+                    raise
+                self.log(f"{order_type} 주문 재시도 ({attempt}/{ORDER_RETRIES}): {e}")
+                time.sleep(ORDER_RETRY_DELAY * attempt)
+
+    def place_sl_tp_orders(self, setup, amount=None):
+        """SL/TP 주문을 동시에 제출합니다. amount(체결 계약 수)가 없으면 포지션을 조회해 정합니다.
+
+        Gate.io 의 가격 트리거 주문은 일괄 주문/진입 주문 첨부를 지원하지 않으므로 두 주문을 병렬로 보냅니다.
+        손절 주문이 끝내 실패하면 보호되지 않은 포지션을 남기지 않도록 시장가로 종료합니다.
+        """
+        if amount:
+            side = 'sell' if setup['side'] == 'buy' else 'buy'
+        else:
+            position = self.get_position_info()
+            if not position:
+                self.log("SL/TP 설정 실패: 포지션 정보를 찾을 수 없음")
+                return False
+            amount = abs(float(position['contracts']))
+            side = 'sell' if float(position['contracts']) > 0 else 'buy'
+        sl_params = {'reduce_only': True, 'stopPrice': setup['sl_price']}
+        tp_params = {'reduce_only': True, 'stopPrice': setup['tp_price']}
+        self.log(f"손절/익절 주문 설정: ${setup['sl_price']:.4f} / ${setup['tp_price']:.4f}")
+        sl = self.order_pool.submit(self._submit_order, 'stop_market', side, amount, sl_params, 'sl')
+        tp = self.order_pool.submit(self._submit_order, 'take_profit_market', side, amount, tp_params, 'tp')
+        ok = True
+        with self.journal.batch() if self.journal else nullcontext():
+            for name, role, future in (("손절", 'sl', sl), ("익절", 'tp', tp)):
+                try:
+                    order = future.result()
+                    self.journal_order(role, order)
+                    setup.setdefault('orders', {})[role] = order.get('id') if order else None
+                except Exception as e:
+                    ok = False
+                    self.log(f"{name} 주문 설정 오류: {e}")
+        if sl.exception() is not None:
+            self.log("⚠️ 손절 주문 없이 포지션을 유지하지 않도록 시장가로 종료합니다.")
+            self.close_position_market()
+        elif ok:
+            self.log("SL/TP 주문 설정 완료.")
+        return ok
+
+    def close_position_market(self):
+        """현재 포지션을 시장가로 즉시 종료합니다.
+
+        캐시된 포지션은 그 사이 부분 체결이나 SL 체결로 달라졌을 수 있으므로, 대기 주문을 먼저 취소한 뒤
+        포지션을 새로 조회해 수량을 정하고 reduceOnly 로 보내 포지션보다 큰 주문이 반대 포지션을 열지 않게 합니다.
+        """
+        if not self.get_position_info(fresh=True):
+            self.log("종료할 포지션이 없습니다.")
+            return
+
+        try:
+            # 안전을 위해 모든 대기 주문 취소
+            self.exchange.cancel_all_orders(self.symbol)
+            self.log("모든 대기 주문을 취소했습니다.")
+            position = self.get_position_info(fresh=True)
+            if not position:
+                self.log("대기 주문 취소 사이에 포지션이 이미 청산되었습니다.")
+                return
+            side = 'sell' if float(position['contracts']) > 0 else 'buy'
+            amount = abs(float(position['contracts']))
+            self.log(f"시장가 포지션 종료 시도: {side} {amount} contracts")
+            # 포지션 종료 주문
+            order = self.exchange.create_market_order(self.symbol, side, amount, params={'reduceOnly': True})
+            self.invalidate_account()
+            self.log("✅ 포지션이 성공적으로 종료되었습니다.")
+            self.play_alarm()
+            # 포지션 종료 후 상태 초기화
+            self.active_setup = None
+            self.release_position_slot()
+            self.last_trade_profit = 0
+            self.consecutive_reinvestment_wins = 0
+            if self.journal:
+                with self.journal.batch():
+                    self.journal_order('close', order)
+                    self.save_state()
+        except Exception as e:
+            self.log(f"❌ 포지션 종료 중 오류 발생: {e}")
+
+    def sync_position(self):
+        """포지션을 조회하고, 청산된 거래가 있으면 손익을 정리합니다. 현재 포지션(없으면 None)을 반환합니다."""
+        position = self.get_position_info()
+
+        if not position:
+            if self.active_setup:
+                self.log("포지션이 청산되었습니다. 손익을 계산합니다...")
+                self.play_alarm()
+                
+                self.last_trade_profit = self.closed_trade_pnl()
+                
+                if self.last_trade_profit > 0:
+                    self.log(f"✅ 거래 이익: ${self.last_trade_profit:.2f}")
+                    if self.is_reinvestment_trade:
+                        self.consecutive_reinvestment_wins += 1
+                        self.log(f"재투자 연속 성공: {self.consecutive_reinvestment_wins}회")
+                    else:
+                        self.consecutive_reinvestment_wins = 0
+                else:
+                    self.log(f"❌ 거래 손실: ${self.last_trade_profit:.2f}")
+                    self.consecutive_reinvestment_wins = 0
+                    self.last_trade_profit = 0
+                
+                if self.consecutive_reinvestment_wins >= MAX_REINVESTMENT_WINS:
+                    self.log("🔒 2회 연속 재투자 성공! 다음 거래는 고정 리스크로 전환합니다.")
+
+                self.active_setup = None
+                self.release_position_slot()
+                self.save_state(durable=True)
+                self.update_balance_display()
+        else:
+            if not self.active_setup:
+                pos_side = 'buy' if float(position['contracts']) > 0 else 'sell'
+                self.log(f"기존 포지션 발견. 수량: {position['contracts']}, 방향: {pos_side}")
+                if self.position_slots and not self.position_slots.claim(self.symbol, force=True):
+                    self.log(f"⚠️ 기존 포지션이 동시 포지션 한도({self.position_slots.limit}개)를 넘습니다.")
+                self.active_setup = {'side': pos_side}
+                self.save_state(durable=True)
+            
+            self.log(f"포지션 유지 중... 진입가: ${float(position['entryPrice']):.4f}")
+            self.update_balance_display()
+        return position
+
+    def closed_trade_pnl(self):
+        """청산된 거래의 손익(수수료 포함, 펀딩 제외)을 진입 이후 이 심볼의 체결 내역으로 계산합니다.
+
+        계좌 잔액 변화는 다른 심볼의 손익·수수료와 펀딩이 섞이므로, 체결 내역이 진입부터 청산까지를 온전히
+        담지 못할 때(진입 시각을 모르는 복원 거래, 조회 오류)만 잔액 변화로 계산합니다.
+        """
+        opened_at = (self.active_setup or {}).get('opened_at')
+        if opened_at is not None:
+            try:
+                trades = self.exchange.fetch_my_trades(self.symbol, since=opened_at)
+                net = sum(float(t['amount']) * (1 if t['side'] == 'buy' else -1) for t in trades)
+                if trades and abs(net) < 1e-9:
+                    return sum((1 if t['side'] == 'sell' else -1) * float(t['cost'])
+                               - float((t.get('fee') or {}).get('cost') or 0) for t in trades)
+                self.log("체결 내역이 진입·청산 수량과 맞지 않아 잔액 변화로 손익을 계산합니다.")
+            except Exception as e:
+                self.log(f"체결 내역 조회 오류: {e}. 잔액 변화로 손익을 계산합니다.")
+        return self.get_balance(fresh=True) - self.balance_at_trade_start
+
+    def try_entry(self, refresh=True, last_price=None):
+        """진입 신호를 탐색하고 신호가 있으면 진입 및 SL/TP 주문을 냅니다."""
+        if self.exchange.milliseconds() < self.entry_retry_at:
+            return
+        if self.position_slots and not self.position_slots.available(self.symbol):
+            return      # 동시 포지션 한도가 찼으면 진입하지 않습니다.
+        new_setup = self.check_for_entry(refresh=refresh, last_price=last_price)
+        if new_setup and self.position_slots and not self.position_slots.claim(self.symbol):
+            self.log(f"동시 포지션 한도({self.position_slots.limit}개)가 먼저 차서 이번 신호는 건너뜁니다.")
+            return
+        if new_setup:
+            signal_at = time.perf_counter()
+            self.metrics.incr('signals')
+            self.balance_at_trade_start = self.get_balance()
+            self.active_setup = new_setup
+            submitted_at = self.exchange.milliseconds()
+            entry_order = self.place_entry_order(self.active_setup)
+            if not entry_order:
+                self.active_setup = None
+                self.release_position_slot()
+                # 같은 봉에서 체결/캔들 이벤트마다 주문을 다시 내지 않도록 다음 봉까지 진입을 쉽니다.
+                bar_ts = self.candle_cache.buffer(self.symbol, self.timeframe).last_timestamp
+                tf_ms = self.exchange.parse_timeframe(self.timeframe) * 1000
+                self.entry_retry_at = (bar_ts if bar_ts is not None else self.exchange.milliseconds()) + tf_ms
+                self.log("진입 주문이 실패해 다음 봉까지 진입을 시도하지 않습니다.")
+                return
+            self.active_setup['orders'] = {'entry': entry_order.get('id')}
+            self.active_setup['opened_at'] = entry_order.get('timestamp') or submitted_at    # 체결 내역 손익 계산 시작점
+            if self.journal:
+                # 보호 주문보다 먼저 진입 사실을 디스크에 남겨 그 사이 비정상 종료에도 거래 정보를 잃지 않습니다.
+                with self.journal.batch():
+                    self.journal_order('entry', entry_order)
+                    self.save_state()
+            filled = self.confirm_fill(entry_order)
+            self.metrics.observe('signal_to_fill', time.perf_counter() - signal_at)
+            if filled is None:
+                self.log("진입 체결을 확인하지 못해 포지션 조회로 SL/TP 수량을 정합니다.")
+            self.place_sl_tp_orders(self.active_setup, amount=filled)
+            self.metrics.observe('signal_to_protected', time.perf_counter() - signal_at)
+            self.save_state(durable=True)
+            self.update_balance_display()
+
+    def release_position_slot(self):
+        if self.position_slots:
+            self.position_slots.release(self.symbol)
+
+    def run_once(self):
+        """루프 한 주기: 포지션을 동기화하고 포지션이 없으면 진입 신호를 탐색합니다."""
+        phases = {}
+        with self.metrics.timer('cycle.total', phases):
+            with self.metrics.timer('cycle.sync_position', phases):
+                position = self.sync_position()
+            if not position:
+                self.log(f"{self.timeframe}봉 기준, 새로운 진입 신호 탐색 중...")
+                with self.metrics.timer('cycle.try_entry', phases):
+                    self.try_entry()
+        self.metrics.record_cycle(self.symbol, phases)
+        self.save_state()
+
+    def poll_once(self):
+        """실거래 루프 한 주기: 스케줄러가 정한 시각이 된 포지션 확인과 신호 확인만 실행합니다."""
+        now = self.exchange.milliseconds()
+        phases = {}
+        with self.metrics.timer('cycle.total', phases):
+            if now >= self._position_due:
+                with self.metrics.timer('cycle.sync_position', phases):
+                    self.sync_position()
+                self._position_due = now + self.scheduler.position_delay(bool(self.active_setup)) * 1000
+            if not self.active_setup and now >= self._signal_due:
+                with self.metrics.timer('cycle.try_entry', phases):
+                    self.poll_signal(now)
+                if self.active_setup:
+                    self._position_due = now + self.scheduler.position_delay(True) * 1000
+                self._signal_due = now + self.scheduler.signal_delay(now, self.signal_distance()) * 1000
+        self.metrics.record_cycle(self.symbol, phases)
+        self.save_state()
+
+    def poll_signal(self, now):
+        """봉이 바뀐 뒤 첫 확인은 캔들을 받아 확정 봉으로, 그 밖에는 현재가 한 번으로 진입 신호를 확인합니다."""
+        tf_ms = timeframe_to_ms(self.timeframe)
+        bar = now - now % tf_ms
+        buf = self.candle_cache.buffer(self.symbol, self.timeframe)
+        if bar != self._refreshed_bar:
+            self.try_entry()
+            if (buf.last_timestamp or 0) >= bar:
+                self._refreshed_bar = bar
+            return
+        try:
+            ticker = self.exchange.fetch_ticker(self.symbol)
+        except Exception as e:
+            self.log(f"현재가 조회 오류: {e}")
+            return
+        price = ticker.get('last')
+        if price is None:
+            return
+        # 현재가를 체결 한 건처럼 미완성 봉에 반영해 스트림 경로와 같은 방식으로 봉 중간 돌파를 판단합니다.
+        with buf.lock:
+            changed = buf.apply_trade(float(price), ticker.get('timestamp') or now, tf_ms)
+        if changed:
+            self.try_entry(refresh=False, last_price=float(price))
+
+    def signal_distance(self):
+        """현재가와 가장 가까운 진입 기준가 사이 거리를 최근 평균 봉 폭 단위로 반환합니다. 모르면 None."""
+        buf = self.candle_cache.buffer(self.symbol, self.timeframe)
+        with buf.lock:
+            candles = buf.view(self.lookback + 1).copy()
+        if len(candles) < 2:
+            return None
+        price = candles[-1, CLOSE]
+        bar_range = float(np.mean(candles[:-1, HIGH] - candles[:-1, LOW]))
+        if bar_range <= 0:
+            return None
+        if self.strategy == 'orderblock':
+            gaps = [price - zone.entry if zone.side == 'buy' else zone.entry - price for zone in self.ob_detector.zones]
+            if not gaps:
+                return math.inf
+            gap = min(gaps)
+        else:
+            high_water_mark = self.candle_cache.breakout(self.symbol, self.timeframe, self.lookback).high_water_mark
+            if high_water_mark is None:
+                return None
+            gap = high_water_mark - price
+        return max(0.0, gap) / bar_range
+
+    def next_poll_delay(self):
+        """포지션 확인과 신호 확인 중 먼저 돌아오는 것까지의 대기(초)."""
+        due = self._position_due if self.active_setup else min(self._position_due, self._signal_due)
+        return max(0.05, (due - self.exchange.milliseconds()) / 1000)
+
+    def run(self):
+        self.is_running = True
+        self.update_balance_display()
+        self.reconcile()
+
+        while self.is_running:
+            try:
+                self.poll_once()
+
+                wake = time.monotonic() + self.next_poll_delay()
+                while self.is_running and time.monotonic() < wake:
+                    time.sleep(min(1.0, wake - time.monotonic()))
+
+            except Exception as e:
+                self.log(f"런타임 오류 발생: {e}")
+                time.sleep(10)
+
+        self.log("봇이 정지되었습니다.")
+
+    def run_event_driven(self, feed, position_interval=30, warmup=True):
+        """시세 피드의 캔들/체결 이벤트마다 진입 신호를 평가합니다.
+
+        신호 평가는 스트림으로 갱신한 캔들 캐시만 사용하고, 포지션 상태는 position_interval 초마다 확인합니다.
+        """
+        self.is_running = True
+        self.update_balance_display()
+        buf = self.candle_cache.buffer(self.symbol, self.timeframe)
+        tf_ms = self.exchange.parse_timeframe(self.timeframe) * 1000
+        while warmup and self.is_running:
+            # 데이터 데몬이 아직 떠 있지 않으면 스냅샷이 실패하므로 죽지 않고 다시 시도합니다.
+            try:
+                rows = feed.snapshot()
+                if rows is None:
+                    self.fetch_candles(self.timeframe, limit=self.lookback + 1)
+                else:
+                    with buf.lock:
+                        buf.merge(rows)
+                break
+            except Exception as e:
+                self.log(f"초기 캔들 로드 실패, 다시 시도합니다: {e}")
+                time.sleep(1)
+
+        events = Queue()
+        feed.subscribe(events.put)
+        feed.start()
+        self.log(f"{self.timeframe}봉 스트림 기반 신호 탐색을 시작합니다.")
+
+        self.reconcile()
+        position = self.sync_position()
+        next_sync = time.monotonic() + position_interval
+        while self.is_running:
+            try:
+                try:
+                    event = events.get(timeout=max(0.0, next_sync - time.monotonic()))
+                except Empty:
+                    event = None
+
+                if event is not None and event.symbol == self.symbol:
+                    if event.kind == 'end':
+                        self.log("시세 피드가 종료되었습니다.")
+                        break
+                    if event.kind == 'error':
+                        self.log(f"시세 피드 오류: {event.error}")
+                        continue
+                    with buf.lock:
+                        if event.kind == 'candle' and event.timeframe == self.timeframe:
+                            changed = buf.merge([event.candle])
+                        elif event.kind == 'trade':
+                            changed = buf.apply_trade(event.price, event.timestamp, tf_ms, event.amount)
+                        else:
+                            changed = False
+                        last_price = buf.last_price
+                    if changed and not position and not self.active_setup:
+                        # 이전 봉을 고친 캔들 이벤트의 가격은 현재가가 아니므로 버퍼의 최신 봉 종가를 씁니다.
+                        self.try_entry(refresh=False, last_price=last_price)
+                        if self.active_setup:
+                            next_sync = time.monotonic()
+
+                if time.monotonic() >= next_sync:
+                    position = self.sync_position()
+                    next_sync = time.monotonic() + position_interval
+
+            except Exception as e:
+                self.log(f"런타임 오류 발생: {e}")
+                time.sleep(1)
+
+        feed.stop()
+        self.is_running = False
+        self.log("봇이 정지되었습니다.")
+
+    def stop(self):
+        self.is_running = False
+        self.log("봇 정지 신호를 받았습니다. 루프를 종료합니다.")
 
 # -----------------------------------------------------------------------------
-# 트레이딩 봇 로직 클래스
+# 다중 심볼 스캐너
 # -----------------------------------------------------------------------------
-class TradingBot:
-    def __init__(self, api_key, api_secret, params, msg_queue):
-        self.api_key = api_key
-        self.api_secret = api_secret
-        self.msg_queue = msg_queue
-        
-        self.symbol = params['symbol']
-        self.timeframe = params['timeframe']
-        self.trend_timeframe = params['trend_timeframe']
+class PositionSlots:
+    """한 계좌를 나눠 쓰는 봇들의 동시 포지션 수를 limit 개로 제한합니다. 심볼마다 자리는 하나이고 limit 이 None 이면 제한이 없습니다.
+
+    거래 손익은 심볼별 체결 내역으로 계산하므로 여러 심볼이 동시에 포지션을 가져도 손익이 섞이지 않습니다.
+    """
+
+    def __init__(self, limit=None):
+        self._lock = threading.Lock()
+        self.limit = limit
+        self.owners = set()
+
+    def available(self, symbol):
+        return symbol in self.owners or self.limit is None or len(self.owners) < self.limit
+
+    def claim(self, symbol, force=False):
+        """자리를 잡고 한도 안이었는지 반환합니다. force 면 이미 열려 있는 포지션이므로 한도를 넘어도 잡습니다."""
+        with self._lock:
+            ok = self.available(symbol)
+            if ok or force:
+                self.owners.add(symbol)
+            return ok
+
+    def release(self, symbol):
+        with self._lock:
+            self.owners.discard(symbol)
+
+
+class MultiSymbolScanner:
+    """여러 심볼의 TradingBot 을 하나의 거래소 세션과 하나의 요청 한도로 동시에 실행합니다.
+
+    심볼별 전략 상태는 각 TradingBot 이 그대로 갖고, 매 주기 poll_once 를 스레드 풀에서 병렬 실행하므로
+    주기 지연은 심볼 수가 아니라 가장 느린 요청에 비례합니다.
+    """
+
+    def __init__(self, api_key, api_secret, params, bus, symbols, max_workers=8, interval=None):
+        self.bus = bus
+        self.interval = interval        # 지정하면 심볼별 폴링 대기의 상한(초)
+        self.is_running = False
+
+        workers = max(1, min(len(symbols), max_workers))
+        exchange = create_exchange(api_key, api_secret, enable_rate_limit=False)
+        limiter = shared_rate_limiter(1000 / exchange.rateLimit)
+        self.metrics = MetricsRegistry()
+        self.exchange = RateLimitedExchange(InstrumentedExchange(exchange, self.metrics), limiter)
+        data_dir = params.get('data_dir', DEFAULT_DATA_DIR)
+        self.candle_cache = OHLCVCache(self.exchange, store=OHLCVStore(data_dir) if data_dir else None)
+        self.account_cache = SnapshotCache()
+        # 심볼마다 포지션 하나씩, max_positions 를 주면 계좌 전체의 동시 포지션 수도 제한합니다.
+        self.position_slots = PositionSlots(params.get('max_positions'))
+
+        self.bots = {}
+        for symbol in symbols:
+            bot_params = dict(params, symbol=symbol)
+            self.bots[symbol] = TradingBot(api_key, api_secret, bot_params, bus,
+                                           exchange=self.exchange, candle_cache=self.candle_cache,
+                                           account_cache=self.account_cache, metrics=self.metrics,
+                                           log_prefix=f"[{symbol}] ", position_slots=self.position_slots)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scanner')
+
+    def log(self, message):
+        self.bus.publish(LogEvent(message))
+
+    def scan_once(self, symbols=None):
+        """symbols(없으면 전체) 심볼의 poll_once 를 동시에 실행하고 전부 끝날 때까지 기다립니다.
+
+        포지션을 보유한 심볼을 먼저 제출해 요청 예산을 먼저 쓰게 합니다.
+        """
+        bots = [self.bots[s] for s in (symbols or self.bots)]
+        bots.sort(key=lambda bot: not bot.active_setup)
+        futures = {self.executor.submit(bot.poll_once): bot.symbol for bot in bots}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                self.log(f"[{futures[future]}] 런타임 오류 발생: {e}")
+
+    def run(self):
+        self.is_running = True
+        for bot in self.bots.values():
+            bot.is_running = True
+        next(iter(self.bots.values())).update_balance_display()
+        self.log(f"{len(self.bots)}개 심볼 동시 스캔을 시작합니다: {', '.join(self.bots)}")
+        try:
+            # 모든 심볼의 복원 상태를 포지션 조회 한 번으로 확인합니다.
+            positions = self.exchange.fetch_positions(symbols=list(self.bots))
+            for bot in self.bots.values():
+                bot.reconcile(positions)
+        except Exception as e:
+            self.log(f"포지션 일괄 조회 오류: {e}")
+
+        due = dict.fromkeys(self.bots, 0.0)      # 심볼 -> 다음 폴링 시각(monotonic)
+        while self.is_running:
+            started = time.monotonic()
+            ready = [symbol for symbol, at in due.items() if at <= started]
+            if ready:
+                with self.metrics.timer('scan.total'):
+                    self.scan_once(ready)
+                self.log(f"스캔 완료: {len(ready)}개 심볼 ({time.monotonic() - started:.2f}초)")
+                for symbol in ready:
+                    delay = self.bots[symbol].next_poll_delay()
+                    due[symbol] = time.monotonic() + (min(delay, self.interval) if self.interval else delay)
+
+            wake = min(due.values())
+            while self.is_running and time.monotonic() < wake:
+                time.sleep(min(1.0, wake - time.monotonic()))
+
+        self.executor.shutdown(wait=True)
+        self.log("스캐너가 정지되었습니다.")
+
+    def stop(self):
+        self.is_running = False
+        for bot in self.bots.values():
+            bot.is_running = False
+        self.log("스캐너 정지 신호를 받았습니다. 루프를 종료합니다.")
+
+    def close_position_market(self):
+        """모든 심볼의 포지션을 시장가로 종료합니다."""
+        for bot in self.bots.values():
+            bot.close_position_market()
+
+
+# -----------------------------------------------------------------------------
+# 모의 거래소 (오프라인 실행/부하 테스트용)
+# -----------------------------------------------------------------------------
+SIM_TICKS_PER_BAR = 4   # 봉 하나를 시가 -> 고가/저가 -> 종가 4개 가격으로 재생합니다.
+SIM_QUOTE = 'USDT'
+
+
+class _SimMarket:
+    """모의 거래소의 심볼별 캔들 데이터와 포지션 상태."""
+
+    def __init__(self, symbol, candles, contract_size):
+        self.symbol = symbol
+        self.candles = np.ascontiguousarray(candles, dtype=np.float64)
+        self.ts = self.candles[:, TS].astype(np.int64)
+        self.contract_size = contract_size
+        # 양봉은 시가 -> 저가 -> 고가 -> 종가, 음봉은 시가 -> 고가 -> 저가 -> 종가 순서로 움직였다고 봅니다.
+        o, h, l, c = (self.candles[:, k] for k in (OPEN, HIGH, LOW, CLOSE))
+        up = c >= o
+        self.path = np.column_stack([o, np.where(up, l, h), np.where(up, h, l), c])
+        self.path_high = np.maximum.accumulate(self.path, axis=1)
+        self.path_low = np.minimum.accumulate(self.path, axis=1)
+        self.index = -1
+        self.tick = 0
+        self.price = None
+        self.contracts = 0.0      # 부호 있는 보유 계약 수 (롱 +, 숏 -)
+        self.entry_price = 0.0
+
+    def forming_bar(self):
+        """현재 틱까지 진행된 미완성 봉."""
+        i, k = self.index, self.tick
+        bar = self.candles[i].copy()
+        bar[HIGH], bar[LOW], bar[CLOSE] = self.path_high[i, k], self.path_low[i, k], self.path[i, k]
+        bar[VOLUME] *= (k + 1) / SIM_TICKS_PER_BAR
+        return bar
+
+
+class SimulatedExchange:
+    """TradingBot 이 쓰는 ccxt API 일부를 로컬 캔들 데이터로 흉내 내는 모의 거래소.
+
+    시계는 advance() 를 호출할 때만 봉의 1/SIM_TICKS_PER_BAR 씩 움직이므로 실제 시간보다 훨씬 빠르게 재생됩니다.
+    시장가 주문은 현재 가격에, 지정가/스탑/익절 주문은 가격 경로가 트리거를 지날 때 결정적으로 체결됩니다.
+    봉 시가에서 갭으로 트리거를 넘으면 시가에 체결됩니다. 계약 수 × contract_size 가 기초자산 수량입니다.
+    """
+
+    rateLimit = 1
+
+    def __init__(self, markets, timeframe, balance=1000.0, fee_rate=0.0, leverage=10, contract_size=1.0,
+                 start_time=None):
+        self.timeframe = timeframe
+        self.tf_ms = timeframe_to_ms(timeframe)
+        self.tick_ms = self.tf_ms // SIM_TICKS_PER_BAR
+        self.fee_rate = fee_rate
+        self.leverage = leverage
+        self.wallet = float(balance)
+        self.fees_paid = 0.0
+        self.markets = {}
+        self._markets = {symbol: _SimMarket(symbol, candles, contract_size) for symbol, candles in markets.items()}
+        self._orders = {}         # 주문 id -> ccxt 형식 주문
+        self._open = []           # 대기 중인 지정가/트리거 주문
+        self._next_id = 1
+        self.trades = []          # 체결 내역
+        self._lock = threading.RLock()
+        first = min(int(m.ts[0]) for m in self._markets.values())
+        self.end_time = max(int(m.ts[-1]) for m in self._markets.values()) + self.tf_ms - self.tick_ms
+        self.clock = first if start_time is None else int(start_time)
+        self._sync_markets(process=False)
+
+    # --- 시계 ---------------------------------------------------------------
+    def milliseconds(self):
+        return self.clock
+
+    def seconds(self):
+        return self.clock / 1000
+
+    def parse_timeframe(self, timeframe):
+        return timeframe_to_ms(timeframe) // 1000
+
+    def advance(self, ticks=1):
+        """시계를 ticks 틱 진행하며 대기 주문을 처리합니다. 데이터가 끝났으면 False 를 반환합니다."""
+        with self._lock:
+            for _ in range(ticks):
+                if self.clock + self.tick_ms > self.end_time:
+                    return False
+                self.clock += self.tick_ms
+                self._sync_markets(process=True)
+            return True
+
+    def _sync_markets(self, process):
+        for market in self._markets.values():
+            i = int(np.searchsorted(market.ts, self.clock, side='right')) - 1
+            if i < 0:
+                continue
+            k = min(SIM_TICKS_PER_BAR - 1, (self.clock - int(market.ts[i])) // self.tick_ms)
+            if (i, k) == (market.index, market.tick):
+                continue
+            gap = k == 0 or i != market.index
+            previous = market.price
+            market.index, market.tick = i, k
+            market.price = float(market.path[i, k])
+            if process and previous is not None:
+                self._process_orders(market, previous, market.price, gap)
+
+    def _market(self, symbol):
+        market = self._markets.get(symbol)
+        if market is None:
+            raise ccxt.BadSymbol(f"모의 거래소에 없는 심볼: {symbol}")
+        if market.price is None:
+            raise ccxt.BadRequest(f"{symbol} 데이터가 아직 시작되지 않았습니다.")
+        return market
+
+    # --- 시세 ---------------------------------------------------------------
+    def market(self, symbol):
+        return self.load_markets()[symbol]
+
+    def load_markets(self, reload=False):
+        for symbol, market in self._markets.items():
+            self.markets[symbol] = {'id': symbol, 'symbol': symbol, 'type': 'swap', 'swap': True, 'linear': True,
+                                    'settle': SIM_QUOTE, 'quote': SIM_QUOTE, 'contractSize': market.contract_size}
+        return self.markets
+
+    def fetch_ticker(self, symbol, params=None):
+        with self._lock:
+            market = self._market(symbol)
+            return {'symbol': symbol, 'timestamp': self.clock, 'last': market.price, 'close': market.price,
+                    'bid': market.price, 'ask': market.price}
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        with self._lock:
+            market = self._market(symbol)
+            target_ms = timeframe_to_ms(timeframe)
+            if target_ms % self.tf_ms:
+                raise ccxt.NotSupported(f"{timeframe} 는 기본 타임프레임 {self.timeframe} 의 배수가 아닙니다.")
+            end = market.index + 1
+            last_bucket = int(market.ts[market.index]) - int(market.ts[market.index]) % target_ms
+            if since is not None:
+                first_bucket = -(-int(since) // target_ms) * target_ms
+            elif limit:
+                first_bucket = last_bucket - (limit - 1) * target_ms
+            else:
+                first_bucket = None
+            start = 0 if first_bucket is None else int(np.searchsorted(market.ts, first_bucket))
+            if since is not None and limit:
+                end = min(end, int(np.searchsorted(market.ts, first_bucket + limit * target_ms)))
+            if start >= end:
+                return []
+            rows = market.candles[start:end].copy()
+            if end == market.index + 1:
+                rows[-1] = market.forming_bar()
+            if target_ms != self.tf_ms:
+                rows = resample_candles(rows, target_ms)
+            if limit:
+                rows = rows[:limit] if since is not None else rows[-limit:]
+            return rows.tolist()
+
+    # --- 계정 ---------------------------------------------------------------
+    def _used_margin(self):
+        return sum(abs(m.contracts) * m.contract_size * m.price / self.leverage
+                   for m in self._markets.values() if m.contracts)
+
+    def fetch_balance(self, params=None):
+        with self._lock:
+            used = self._used_margin()
+            total = self.wallet
+            account = {'free': total - used, 'used': used, 'total': total}
+            return {SIM_QUOTE: account, 'free': {SIM_QUOTE: account['free']}, 'used': {SIM_QUOTE: used},
+                    'total': {SIM_QUOTE: total}}
+
+    def _position(self, market):
+        size = market.contracts * market.contract_size
+        return {
+            'symbol': market.symbol, 'contracts': market.contracts, 'contractSize': market.contract_size,
+            'side': 'long' if market.contracts > 0 else 'short' if market.contracts < 0 else None,
+            'entryPrice': market.entry_price, 'markPrice': market.price, 'notional': abs(size) * market.price,
+            'unrealizedPnl': size * (market.price - market.entry_price), 'leverage': self.leverage,
+            'timestamp': self.clock,
+        }
+
+    def fetch_positions(self, symbols=None, params=None):
+        with self._lock:
+            names = symbols or list(self._markets)
+            return [self._position(self._markets[s]) for s in names if s in self._markets and self._markets[s].price is not None]
+
+    # --- 주문 ---------------------------------------------------------------
+    def create_market_order(self, symbol, side, amount, price=None, params=None):
+        return self.create_order(symbol, 'market', side, amount, price, params)
+
+    def create_limit_order(self, symbol, side, amount, price, params=None):
+        return self.create_order(symbol, 'limit', side, amount, price, params)
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        params = params or {}
+        with self._lock:
+            market = self._market(symbol)
+            if side not in ('buy', 'sell') or not amount or amount <= 0:
+                raise ccxt.InvalidOrder(f"잘못된 주문: {side} {amount}")
+            if type not in ('market', 'limit', 'stop_market', 'take_profit_market'):
+                raise ccxt.NotSupported(f"모의 거래소가 지원하지 않는 주문 유형: {type}")
+            trigger = params.get('stopPrice', params.get('triggerPrice'))
+            if type in ('stop_market', 'take_profit_market') and trigger is None:
+                raise ccxt.InvalidOrder(f"{type} 주문에는 stopPrice 가 필요합니다.")
+            if type == 'limit' and price is None:
+                raise ccxt.InvalidOrder("지정가 주문에는 price 가 필요합니다.")
+            order = {
+                'id': str(self._next_id), 'symbol': symbol, 'type': type, 'side': side, 'amount': float(amount),
+                'price': price if type == 'limit' else None, 'stopPrice': trigger, 'triggerPrice': trigger,
+                'reduceOnly': bool(params.get('reduce_only', params.get('reduceOnly', False))),
+                'status': 'open', 'filled': 0.0, 'remaining': float(amount), 'average': None,
+                'timestamp': self.clock, 'fee': None, 'clientOrderId': params.get('text'), 'info': {},
+            }
+            self._next_id += 1
+            self._orders[order['id']] = order
+            if type == 'market' or self._triggered(order, market.price):
+                # 이미 조건을 만족한 지정가/트리거 주문은 즉시 현재가에 체결됩니다.
+                self._fill(market, order, market.price)
+            else:
+                if order['reduceOnly'] and not self._reduces(market, side):
+                    raise ccxt.InvalidOrder("reduce_only 주문이지만 줄일 포지션이 없습니다.")
+                self._open.append(order)
+            return dict(order)
+
+    def fetch_order(self, id, symbol=None, params=None):
+        with self._lock:
+            order = self._orders.get(str(id))
+            if order is None:
+                raise ccxt.OrderNotFound(f"주문을 찾을 수 없습니다: {id}")
+            return dict(order)
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        with self._lock:
+            return [dict(o) for o in self._open if symbol is None or o['symbol'] == symbol]
+
+    def fetch_my_trades(self, symbol=None, since=None, limit=None, params=None):
+        with self._lock:
+            trades = [{
+                'id': str(i), 'order': t['order_id'], 'timestamp': t['timestamp'], 'symbol': t['symbol'],
+                'type': t['type'], 'side': t['side'], 'amount': t['amount'], 'price': t['price'],
+                'cost': t['amount'] * self._markets[t['symbol']].contract_size * t['price'],
+                'fee': {'cost': t['fee'], 'currency': SIM_QUOTE}, 'info': dict(t),
+            } for i, t in enumerate(self.trades, 1)
+                if (symbol is None or t['symbol'] == symbol) and (since is None or t['timestamp'] >= since)]
+            return trades[:limit] if limit else trades
+
+    def cancel_order(self, id, symbol=None, params=None):
+        with self._lock:
+            order = self._orders.get(str(id))
+            if order is None or order['status'] != 'open':
+                raise ccxt.OrderNotFound(f"취소할 대기 주문이 없습니다: {id}")
+            self._cancel(order)
+            return dict(order)
+
+    def cancel_all_orders(self, symbol=None, params=None):
+        with self._lock:
+            canceled = [o for o in self._open if symbol is None or o['symbol'] == symbol]
+            for order in canceled:
+                self._cancel(order)
+            return [dict(o) for o in canceled]
+
+    def _cancel(self, order):
+        order['status'] = 'canceled'
+        self._open.remove(order)
+
+    # --- 체결 엔진 ----------------------------------------------------------
+    @staticmethod
+    def _reduces(market, side):
+        return market.contracts < 0 if side == 'buy' else market.contracts > 0
+
+    @staticmethod
+    def _triggered(order, price):
+        """가격이 price 일 때 주문이 체결/발동되는지."""
+        level = order['price'] if order['type'] == 'limit' else order['stopPrice']
+        buy = order['side'] == 'buy'
+        if order['type'] == 'stop_market':
+            return price >= level if buy else price <= level
+        return price <= level if buy else price >= level
+
+    def _process_orders(self, market, previous, price, gap):
+        """previous -> price 로 움직인 구간에서 발동된 대기 주문을 가격에 닿는 순서대로 체결합니다."""
+        pending = [o for o in self._open if o['symbol'] == market.symbol and self._triggered(o, price)]
+        if not pending:
+            return
+        rising = price >= previous
+        level = lambda o: o['price'] if o['type'] == 'limit' else o['stopPrice']
+        pending.sort(key=level, reverse=not rising)
+        for order in pending:
+            if order['status'] != 'open':
+                continue        # 앞선 체결로 포지션이 정리되며 취소된 주문
+            # 봉 시가 갭으로 넘어섰다면 트리거 가격이 아니라 시가에 체결됩니다.
+            fill_price = price if gap else level(order)
+            if order['type'] == 'limit':
+                fill_price = min(fill_price, order['price']) if order['side'] == 'buy' else max(fill_price, order['price'])
+            self._open.remove(order)
+            self._fill(market, order, fill_price)
+
+    def _fill(self, market, order, price):
+        side = 1 if order['side'] == 'buy' else -1
+        amount = order['amount']
+        if order['reduceOnly']:
+            if not self._reduces(market, order['side']):
+                order['status'] = 'canceled'
+                if order['type'] == 'market':
+                    raise ccxt.InvalidOrder("reduce_only 주문이지만 줄일 포지션이 없습니다.")
+                return
+            amount = min(amount, abs(market.contracts))
+        else:
+            opening = amount if market.contracts * side >= 0 else max(0.0, amount - abs(market.contracts))
+            required = opening * market.contract_size * price / self.leverage
+            if required > self.wallet - self._used_margin():
+                order['status'] = 'canceled'
+                if order['type'] == 'market':
+                    raise ccxt.InsufficientFunds(f"증거금 부족: 필요 ${required:.2f}")
+                return
+
+        fee = amount * market.contract_size * price * self.fee_rate
+        realized = 0.0
+        position = market.contracts
+        if position * side < 0:
+            closed = min(amount, abs(position))
+            realized = closed * market.contract_size * (price - market.entry_price) * (1 if position > 0 else -1)
+            market.contracts = position + side * amount
+            if abs(market.contracts) < 1e-12:
+                market.contracts = 0.0
+                market.entry_price = 0.0
+            elif market.contracts * position < 0:
+                market.entry_price = price     # 반대 방향으로 뒤집힘
+        else:
+            total = abs(position) + amount
+            market.entry_price = (market.entry_price * abs(position) + price * amount) / total
+            market.contracts = position + side * amount
+        self.wallet += realized - fee
+        self.fees_paid += fee
+
+        order.update(status='closed', filled=amount, remaining=order['amount'] - amount, average=price,
+                     fee={'cost': fee, 'currency': SIM_QUOTE}, lastTradeTimestamp=self.clock)
+        self.trades.append({'timestamp': self.clock, 'symbol': market.symbol, 'order_id': order['id'],
+                            'type': order['type'], 'side': order['side'], 'amount': amount, 'price': price,
+                            'fee': fee, 'realized_pnl': realized})
+        if market.contracts == 0:
+            # 포지션이 정리되면 남은 reduce_only 주문(반대편 SL/TP)은 취소됩니다.
+            for other in [o for o in self._open if o['symbol'] == market.symbol and o['reduceOnly']]:
+                self._cancel(other)
+
+
+class SimulationRunner:
+    """TradingBot 의 실제 루프(run_once)를 모의 거래소 위에서 실제 시간보다 빠르게 돌립니다."""
+
+    def __init__(self, params, candles, data_timeframe=None, balance=None, fee_rate=0.0, leverage=10,
+                 ticks_per_cycle=1, warmup=OB_HISTORY, bus=None):
+        data_timeframe = data_timeframe or params['timeframe']
+        candles = np.asarray(candles, dtype=np.float64)
+        warmup = min(warmup, len(candles) - 1)
+        self.exchange = SimulatedExchange({params['symbol']: candles}, data_timeframe,
+                                          balance=params['initial_capital'] if balance is None else balance,
+                                          fee_rate=fee_rate, leverage=leverage, contract_size=params.get('contract_size', 1.0),
+                                          start_time=int(candles[warmup, TS]))
+        self.ticks_per_cycle = ticks_per_cycle
+        self.bus = bus or EventBus()
+        # 캐시 TTL 은 모의 시계 기준으로 계산해야 포지션 변화가 다음 틱에 바로 보입니다.
+        self.bot = TradingBot('', '', dict(params, data_dir=None, state_dir=None), self.bus, exchange=self.exchange,
+                              account_cache=SnapshotCache(clock=self.exchange.seconds))
+
+    def run(self, max_cycles=None):
+        """데이터 끝(또는 max_cycles)까지 돌리고 요약 딕셔너리를 반환합니다."""
+        exchange, bot = self.exchange, self.bot
+        started_clock = exchange.milliseconds()
+        started = time.perf_counter()
+        cycles = 0
+        bot.is_running = True
+        while bot.is_running and (max_cycles is None or cycles < max_cycles):
+            bot.run_once()
+            cycles += 1
+            if not exchange.advance(self.ticks_per_cycle):
+                break
+        bot.is_running = False
+        elapsed = time.perf_counter() - started
+        simulated = (exchange.milliseconds() - started_clock) / 1000
+        return {
+            'cycles': cycles,
+            'fills': len(exchange.trades),
+            'final_balance': exchange.wallet,
+            'fees': exchange.fees_paid,
+            'elapsed': elapsed,
+            'simulated_seconds': simulated,
+            'speedup': simulated / elapsed if elapsed else float('inf'),
+        }
+
+
+# -----------------------------------------------------------------------------
+# 백테스트 (로컬 CSV/Parquet OHLCV 재생)
+# -----------------------------------------------------------------------------
+def load_ohlcv_file(path):
+    """CSV/Parquet OHLCV 파일을 시간순 (n, 6) float64 배열로 읽습니다.
+
+    timestamp 컬럼은 밀리초/초 단위 숫자나 날짜 문자열 모두 허용합니다.
+    로컬 저장소 파일(.f64)은 복사 없이 메모리 맵으로 엽니다.
+    """
+    if path.lower().endswith('.f64'):
+        return read_candle_file(path)
+    if path.lower().endswith(('.parquet', '.pq')):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    ts = df['timestamp']
+    if pd.api.types.is_numeric_dtype(ts):
+        ts = ts.astype('int64')
+        if len(ts) and ts.max() < 10**11:  # 초 단위
+            ts = ts * 1000
+    else:
+        ts = (pd.to_datetime(ts, utc=True) - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(milliseconds=1)
+    candles = np.empty((len(df), len(OHLCV_COLUMNS)), dtype=np.float64)
+    candles[:, TS] = ts.to_numpy()
+    for i, col in enumerate(OHLCV_COLUMNS[1:], start=1):
+        candles[:, i] = df[col].to_numpy(dtype=np.float64)
+    candles = candles[np.argsort(candles[:, TS], kind='stable')]
+    keep = np.ones(len(candles), dtype=bool)
+    keep[:-1] = candles[1:, TS] != candles[:-1, TS]  # 중복 시각은 마지막 값 사용
+    return candles[keep]
+
+
+def breakout_signals(candles, lookback=BREAKOUT_LOOKBACK):
+    """모든 봉의 돌파 기준 고점과 돌파 여부를 한 번에 계산합니다.
+
+    check_for_entry 와 같은 규칙: 현재 봉 고가 > 직전 lookback 봉 고가의 최댓값.
+    """
+    high = candles[:, HIGH]
+    hwm = np.full(len(candles), np.nan)
+    if len(candles) > lookback:
+        windows = np.lib.stride_tricks.sliding_window_view(high[:-1], lookback)
+        hwm[lookback:] = windows.max(axis=1)
+    with np.errstate(invalid='ignore'):
+        signal = high > hwm
+    return hwm, signal
+
+
+class BacktestResult:
+    def __init__(self, trades, equity, timestamps, initial_capital):
+        self.trades = trades
+        self.equity = equity
+        self.timestamps = timestamps
+        self.initial_capital = initial_capital
+
+    def summary(self):
+        """총 수익률, 최대 낙폭, 승률 등 주요 지표를 반환합니다."""
+        pnls = np.array([t['pnl'] for t in self.trades], dtype=np.float64)
+        final_equity = float(self.equity[-1]) if len(self.equity) else self.initial_capital
+        if len(self.equity):
+            peak = np.maximum.accumulate(self.equity)
+            max_drawdown = float(((peak - self.equity) / peak).max())
+        else:
+            max_drawdown = 0.0
+        return {
+            'trades': len(self.trades),
+            'win_rate': float((pnls > 0).mean()) if len(pnls) else 0.0,
+            'final_equity': final_equity,
+            'total_return': final_equity / self.initial_capital - 1,
+            'max_drawdown': max_drawdown,
+            'profit_factor': float(pnls[pnls > 0].sum() / -pnls[pnls < 0].sum()) if (pnls < 0).any() else float('inf'),
+            'entry_bar_exits': sum(t['exit_time'] == t['entry_time'] for t in self.trades),
+        }
+
+    def trades_frame(self):
+        df = pd.DataFrame(self.trades)
+        for col in ('entry_time', 'exit_time'):
+            if col in df:
+                df[col] = pd.to_datetime(df[col], unit='ms')
+        return df
+
+
+class Backtester:
+    """TradingBot 과 같은 신호/사이징/SL·TP 규칙으로 과거 캔들을 재생합니다.
+
+    신호와 청산 지점 탐색은 NumPy 로 일괄 처리하고, 파이썬 루프는 거래 단위로만 돕니다.
+    같은 봉에서 SL 과 TP 가 모두 닿으면 보수적으로 SL 체결로 봅니다.
+    진입 봉도 청산을 검사합니다. OHLC 만으로는 진입 전후 순서를 알 수 없으므로 SimulatedExchange 와 같은 봉 내
+    경로를 가정해 진입가를 지난 뒤의 구간에서만 SL/TP 를 봅니다(_entry_bar_exit).
+    """
+
+    def __init__(self, params, fee_rate=0.0):
+        self.rr_ratio = params['rr_ratio']
+        self.risk_per_trade_usd = params['risk_per_trade_usd']
+        self.reinvestment_percent = params['reinvestment_percent']
+        self.initial_capital = params['initial_capital']
+        self.strategy = params.get('strategy', 'breakout')
+        self.ob_entry_level = params.get('ob_entry_level', 0.7)
+        self.timeframe = params.get('timeframe')
+        self.trend_timeframe = params.get('trend_timeframe')
+        self.lookback = int(params.get('lookback', BREAKOUT_LOOKBACK))
+        self.contract_size = params.get('contract_size', 1.0)
+        self.fee_rate = fee_rate
+
+    @staticmethod
+    def _find_exit(low, high, open_, start, side, sl_price, tp_price):
+        """start 봉부터 SL/TP 에 처음 닿는 (봉 인덱스, 청산가)를 찾습니다. 없으면 (None, None)."""
+        n = len(low)
+        chunk = 256
+        while start < n:
+            end = min(n, start + chunk)
+            if side > 0:
+                sl_hit, tp_hit = low[start:end] <= sl_price, high[start:end] >= tp_price
+            else:
+                sl_hit, tp_hit = high[start:end] >= sl_price, low[start:end] <= tp_price
+            hit = sl_hit | tp_hit
+            if hit.any():
+                k = int(hit.argmax())
+                i = start + k
+                if sl_hit[k]:
+                    return i, (min if side > 0 else max)(open_[i], sl_price)
+                return i, (max if side > 0 else min)(open_[i], tp_price)
+            start = end
+            chunk *= 4
+        return None, None
+
+    @staticmethod
+    def _entry_bar_exit(bar, side, entry_price, sl_price, tp_price):
+        """진입 봉 안에서 진입 뒤에 SL/TP 에 닿으면 청산가를, 아니면 None 을 반환합니다.
+
+        SimulatedExchange 와 같은 봉 내 경로(양봉은 시가 -> 저가 -> 고가 -> 종가, 음봉은 시가 -> 고가 -> 저가 -> 종가)에서
+        진입가를 처음 지나는 구간 이후만 검사하고, 같은 지점에서는 SL 을 먼저 봅니다.
+        """
+        o, h, l, c = bar[OPEN], bar[HIGH], bar[LOW], bar[CLOSE]
+        path = (o, l, h, c) if c >= o else (o, h, l, c)
+        k = next((k for k in range(3) if min(path[k], path[k + 1]) <= entry_price <= max(path[k], path[k + 1])), None)
+        if k is None:
+            return None
+        for price in path[k + 1:]:
+            if (price <= sl_price) if side > 0 else (price >= sl_price):
+                return sl_price
+            if (price >= tp_price) if side > 0 else (price <= tp_price):
+                return tp_price
+        return None
+
+    def breakout_signals(self, candles):
+        """돌파 전략의 (신호 봉, 방향, 진입가, 손절가) 배열을 반환합니다."""
+        hwm, signal = breakout_signals(candles, self.lookback)
+        bars = np.flatnonzero(signal)
+        entries = np.maximum(candles[bars, OPEN], hwm[bars])
+        return bars, np.ones(len(bars), dtype=np.int64), entries, hwm[bars] * SL_BUFFER_RATIO
+
+    def orderblock_signals(self, candles, trend=None):
+        """오더블록 전략의 (신호 봉, 방향, 진입가, 손절가) 배열을 반환합니다. trend 는 봉별 추세 방향 배열."""
+        bars, sides, tops, bottoms, entries, _ = orderblock_zones(candles, self.ob_entry_level)
+        touch, invalid = orderblock_outcomes(candles, bars, sides, tops, bottoms, entries)
+        # 종가 무효화와 같은 봉에서 닿았다면 장중에 먼저 진입가를 지난 것으로 봅니다.
+        ok = (touch > 0) & ((invalid == 0) | (touch <= invalid))
+        sig = bars[ok] + touch[ok]
+        sides, tops, bottoms, entries = sides[ok], tops[ok], bottoms[ok], entries[ok]
+        if trend is not None:
+            ok = trend[sig] == sides
+            sig, sides, tops, bottoms, entries = sig[ok], sides[ok], tops[ok], bottoms[ok], entries[ok]
+        open_ = candles[sig, OPEN]
+        entries = np.where(sides > 0, np.minimum(open_, entries), np.maximum(open_, entries))
+        sls = np.where(sides > 0, bottoms * SL_BUFFER_RATIO, tops * (2 - SL_BUFFER_RATIO))
+        ok = (entries - sls) * sides > 0
+        order = np.argsort(sig[ok], kind='stable')
+        return sig[ok][order], sides[ok][order], entries[ok][order], sls[ok][order]
+
+    def trend_series(self, candles, trend_candles):
+        """각 봉 시작 시점까지 확정된 trend_timeframe 봉의 추세 방향을 봉별 배열로 맞춥니다."""
+        trend = ema_trend(trend_candles[:, CLOSE])
+        close_time = trend_candles[:, TS] + timeframe_to_ms(self.trend_timeframe)
+        k = np.searchsorted(close_time, candles[:, TS], side='right') - 1
+        return np.where(k >= 0, trend[np.maximum(k, 0)], 0)
+
+    def prepare(self, candles, data_timeframe=None):
+        """data_timeframe 캔들을 전략 timeframe 으로 묶습니다. 이미 같은 타임프레임이면 그대로 반환합니다."""
+        candles = np.asarray(candles, dtype=np.float64)
+        if data_timeframe and self.timeframe and data_timeframe != self.timeframe:
+            if not can_resample(data_timeframe, self.timeframe):
+                raise ValueError(f"{data_timeframe} 캔들로 {self.timeframe} 봉을 만들 수 없습니다.")
+            candles = resample_candles(candles, timeframe_to_ms(self.timeframe))
+        return candles
+
+    def run(self, candles, trend_candles=None, data_timeframe=None):
+        """백테스트를 실행합니다. 추세 봉이 없으면 trend_timeframe 으로 리샘플링해 만듭니다."""
+        candles = self.prepare(candles, data_timeframe)
+        n = len(candles)
+        ts, open_, high, low = (candles[:, c] for c in (TS, OPEN, HIGH, LOW))
+        if self.strategy == 'orderblock':
+            if trend_candles is None and self.timeframe and self.trend_timeframe and can_resample(self.timeframe, self.trend_timeframe):
+                trend_candles = resample_candles(candles, timeframe_to_ms(self.trend_timeframe))
+            trend = self.trend_series(candles, trend_candles) if trend_candles is not None else None
+            signal_idx, signal_side, signal_entry, signal_sl = self.orderblock_signals(candles, trend)
+        else:
+            signal_idx, signal_side, signal_entry, signal_sl = self.breakout_signals(candles)
+
+        balance = self.initial_capital
+        target_achieved = False
+        last_trade_profit = 0.0
+        consecutive_wins = 0
+        trades = []
+        exit_idx = []
+
+        next_bar = 0
+        while True:
+            k = np.searchsorted(signal_idx, next_bar)
+            if k >= len(signal_idx):
+                break
+            i = int(signal_idx[k])
+            side = int(signal_side[k])
+            entry_price = signal_entry[k]
+            sl_price = signal_sl[k]
+            tp_price = entry_price + side * abs(entry_price - sl_price) * self.rr_ratio
+
+            if not target_achieved and balance >= self.initial_capital * 2:
+                target_achieved = True
+            risk_amount, is_reinvest = select_risk_amount(
+                self.risk_per_trade_usd, self.reinvestment_percent, target_achieved,
+                last_trade_profit, consecutive_wins)
+            amount = calc_contract_amount(risk_amount, entry_price, sl_price, self.contract_size)
+            if not amount or amount <= 0:
+                next_bar = i + 1
+                continue
+
+            exit_price = self._entry_bar_exit(candles[i], side, entry_price, sl_price, tp_price)
+            if exit_price is not None:
+                j = i
+            else:
+                j, exit_price = self._find_exit(low, high, open_, i + 1, side, sl_price, tp_price)
+            if j is None:
+                break  # 데이터 끝까지 청산되지 않은 거래는 제외합니다.
+            qty = amount * self.contract_size
+            fees = self.fee_rate * qty * (entry_price + exit_price)
+            pnl = side * qty * (exit_price - entry_price) - fees
+            balance += pnl
+
+            # TradingBot.sync_position 의 청산 후 처리와 동일
+            if pnl > 0:
+                last_trade_profit = pnl
+                consecutive_wins = consecutive_wins + 1 if is_reinvest else 0
+            else:
+                last_trade_profit = 0.0
+                consecutive_wins = 0
+
+            trades.append({
+                'entry_time': int(ts[i]), 'exit_time': int(ts[j]), 'side': 'buy' if side > 0 else 'sell',
+                'entry_price': float(entry_price), 'sl_price': float(sl_price), 'tp_price': float(tp_price),
+                'exit_price': float(exit_price), 'amount': float(amount), 'risk_usd': float(risk_amount),
+                'reinvestment': is_reinvest, 'pnl': float(pnl), 'balance': float(balance),
+            })
+            exit_idx.append(j)
+            next_bar = j + 1
+            if balance <= 0:
+                break  # 파산
+
+        realized = np.zeros(n)
+        if trades:
+            np.add.at(realized, np.asarray(exit_idx), [t['pnl'] for t in trades])
+        equity = self.initial_capital + np.cumsum(realized)
+        return BacktestResult(trades, equity, ts.astype(np.int64), self.initial_capital)
+
+
+# -----------------------------------------------------------------------------
+# 몬테카를로 (재투자/포지션 사이징 정책의 분포 추정)
+# -----------------------------------------------------------------------------
+MC_CHUNK_PATHS = 65_536         # 한 번에 계산하는 경로 수 (메모리 상한)
+MC_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+class MonteCarloResult:
+    def __init__(self, final_equity, max_drawdown, time_to_target, ruined, initial_capital, elapsed):
+        self.final_equity = final_equity
+        self.max_drawdown = max_drawdown
+        self.time_to_target = time_to_target    # 목표(초기 자본 2배) 도달 거래 순번, 미도달 -1
+        self.ruined = ruined
+        self.initial_capital = initial_capital
+        self.elapsed = elapsed
+
+    def summary(self):
+        """최종 잔액/최대 낙폭/목표 도달 시간의 분위수와 파산·목표 도달 확률을 반환합니다."""
+        reached = self.time_to_target[self.time_to_target >= 0]
+        return {
+            'paths': len(self.final_equity),
+            'final_equity': dict(zip(MC_PERCENTILES, np.percentile(self.final_equity, MC_PERCENTILES).tolist())),
+            'mean_final_equity': float(self.final_equity.mean()),
+            'max_drawdown': dict(zip(MC_PERCENTILES, np.percentile(self.max_drawdown, MC_PERCENTILES).tolist())),
+            'ruin_probability': float(self.ruined.mean()),
+            'target_probability': len(reached) / len(self.final_equity),
+            'time_to_target': dict(zip(MC_PERCENTILES, np.percentile(reached, MC_PERCENTILES).tolist())) if len(reached) else {},
+            'elapsed': self.elapsed,
+        }
+
+
+class MonteCarloSimulator:
+    """TradingBot 의 재투자 규칙(select_risk_amount)을 수많은 가상 거래 순서에 동시에 적용합니다.
+
+    각 거래는 win_rate 확률로 +리스크 × rr_ratio, 아니면 -리스크이며 cost_r 은 거래당 비용(리스크 배수)입니다.
+    경로 축은 NumPy 배열로, 거래 축만 파이썬 루프로 진행합니다. 청산 후 상태 갱신은 sync_position 과 같습니다.
+    """
+
+    def __init__(self, params, win_rate, cost_r=0.0):
         self.rr_ratio = params['rr_ratio']
         self.risk_per_trade_usd = params['risk_per_trade_usd']
         self.reinvestment_percent = params['reinvestment_percent']
         self.initial_capital = params['initial_capital']
-        self.ob_entry_level = params['ob_entry_level']
-        
-        self.reinvestment_target_achieved = False
-        self.consecutive_reinvestment_wins = 0
-        self.last_trade_profit = 0.0
-        self.is_reinvestment_trade = False
-        self.balance_at_trade_start = 0.0
+        self.win_rate = win_rate
+        self.cost_r = cost_r
 
-        self.is_running = False
-        self.active_setup = None
+    def _simulate_chunk(self, rng, paths, trades):
+        goal = self.initial_capital * 2
+        balance = np.full(paths, float(self.initial_capital))
+        peak = balance.copy()
+        max_drawdown = np.zeros(paths)
+        last_profit = np.zeros(paths)
+        wins = np.zeros(paths, dtype=np.int8)
+        target = balance >= goal
+        alive = balance > 0
+        time_to_target = np.full(paths, -1, dtype=np.int32)
+        # 거래마다 새 배열을 만들지 않도록 작업 버퍼를 재사용합니다.
+        risk, pnl, tmp = np.empty(paths), np.empty(paths), np.empty(paths)
+        draws = np.empty(paths, dtype=np.float32)
+        reinvest, mask = np.empty(paths, dtype=bool), np.empty(paths, dtype=bool)
+        loss_r = -1.0 - self.cost_r
+        swing_r = self.rr_ratio + 1.0           # 승리(rr - cost)와 패배(-1 - cost)의 R 차이
 
-        self.exchange = ccxt.gateio({
-            'apiKey': self.api_key,
-            'secret': self.api_secret,
-            'enableRateLimit': True,
-            'options': {'defaultType': 'swap', 'settle': 'usdt'},
-        })
-        self.log(f"게이트아이오 실거래 모드로 연결합니다. 심볼: {self.symbol}")
-        self.log(f"초기 자본금: ${self.initial_capital:.2f}")
+        for t in range(trades):
+            # select_risk_amount: 목표 달성 후 직전 수익이 있고 연속 재투자 승리가 한도 미만이면 재투자
+            np.greater(last_profit, 0, out=reinvest)
+            reinvest &= target
+            np.less(wins, MAX_REINVESTMENT_WINS, out=mask)
+            reinvest &= mask
+            np.multiply(last_profit, self.reinvestment_percent, out=risk)
+            risk -= self.risk_per_trade_usd
+            risk *= reinvest
+            risk += self.risk_per_trade_usd
 
-    def log(self, message):
-        self.msg_queue.put(f"LOG: {message}")
+            rng.random(dtype=np.float32, out=draws)
+            np.less(draws, self.win_rate, out=mask)
+            np.multiply(mask, swing_r, out=pnl)
+            pnl += loss_r
+            pnl *= risk
+            pnl *= alive                        # 파산한 경로는 더 거래하지 않습니다.
+            balance += pnl
 
-    def play_alarm(self):
-        self.msg_queue.put("ALARM")
+            # TradingBot.sync_position 의 청산 후 처리와 동일
+            np.greater(pnl, 0, out=mask)
+            np.multiply(pnl, mask, out=last_profit)
+            mask &= reinvest
+            wins += 1
+            wins *= mask
+            np.greater(balance, 0, out=mask)
+            alive &= mask
 
-    def get_balance(self):
-        try:
-            balance = self.exchange.fetch_balance(params={'settle': 'usdt'})
-            return balance['total'].get('USDT', 0)
-        except Exception as e:
-            self.log(f"잔액 조회 오류: {e}")
-            return 0
-            
-    def update_balance_display(self):
-        usdt_balance = self.get_balance()
-        self.msg_queue.put(f"BALANCE: {usdt_balance:.2f} USDT")
+            np.maximum(peak, balance, out=peak)
+            np.subtract(peak, balance, out=tmp)
+            tmp /= peak
+            np.maximum(max_drawdown, tmp, out=max_drawdown)
+            np.greater_equal(balance, goal, out=mask)
+            np.greater(mask, target, out=mask)  # 이번 거래에서 처음 목표에 닿은 경로
+            time_to_target[mask] = t + 1
+            target |= mask
 
-    def fetch_ohlcv(self, timeframe, limit=100):
-        try:
-            ohlcv = self.exchange.fetch_ohlcv(self.symbol, timeframe, limit=limit)
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            return df
-        except Exception as e:
-            self.log(f"가격 데이터 조회 오류 ({timeframe}): {e}")
-            return pd.DataFrame()
+        return balance, max_drawdown, time_to_target, ~alive
 
-    def calculate_position_size(self, entry_price, sl_price):
-        current_balance = self.get_balance()
-        
-        if not self.reinvestment_target_achieved and current_balance >= self.initial_capital * 2:
-            self.reinvestment_target_achieved = True
-            self.log(f"🎉 재투자 목표 달성! 현재 잔액: ${current_balance:.2f}")
-            self.play_alarm()
+    def run(self, paths=1_000_000, trades=200, seed=None):
+        started = time.perf_counter()
+        rng = np.random.default_rng(seed)
+        parts = [self._simulate_chunk(rng, min(MC_CHUNK_PATHS, paths - start), trades)
+                 for start in range(0, paths, MC_CHUNK_PATHS)]
+        final_equity, max_drawdown, time_to_target, ruined = (np.concatenate(arrays) for arrays in zip(*parts))
+        return MonteCarloResult(final_equity, max_drawdown, time_to_target, ruined, self.initial_capital,
+                                time.perf_counter() - started)
 
-        risk_amount_usd = self.risk_per_trade_usd
-        self.is_reinvestment_trade = False
-        
-        if self.reinvestment_target_achieved and self.last_trade_profit > 0 and self.consecutive_reinvestment_wins < 2:
-            risk_amount_usd = self.last_trade_profit * self.reinvestment_percent
-            self.is_reinvestment_trade = True
-            self.log(f"🚀 재투자 실행! 직전 수익(${self.last_trade_profit:.2f})의 {self.reinvestment_percent*100}%인 ${risk_amount_usd:.2f}를 리스크로 설정.")
-        else:
-            self.log(f"🛡️ 고정 리스크 실행. 리스크: ${risk_amount_usd:.2f}")
 
-        price_risk_per_unit = abs(entry_price - sl_price)
-        if price_risk_per_unit == 0:
-            self.log("오류: 진입가와 손절가가 같아 포지션 크기를 계산할 수 없습니다.")
-            return None
-        
-        position_size_base = risk_amount_usd / price_risk_per_unit
-        contract_amount = position_size_base * entry_price
-        
-        self.log(f"계산된 계약 수량: {contract_amount:.2f}")
-        return contract_amount
+# -----------------------------------------------------------------------------
+# 파라미터 최적화 (프로세스 풀 병렬 백테스트)
+# -----------------------------------------------------------------------------
+OPTIMIZER_INT_PARAMS = frozenset({'lookback'})  # 정수만 뜻이 있는 파라미터. 나머지 수치 파라미터는 실수로 다룹니다.
+_optimizer_state = {}
 
-    def check_for_entry(self):
-        df = self.fetch_ohlcv(self.timeframe, limit=31)
-        if df.empty: return None
 
-        last_30_candles = df.iloc[-31:-1]
-        current_candle = df.iloc[-1]
-        high_water_mark = last_30_candles['high'].max()
-        
-        if current_candle['high'] > high_water_mark:
-            self.log(f"돌파 신호 포착! 기준 가격: ${high_water_mark}")
-            entry_price = self.exchange.fetch_ticker(self.symbol)['last']
-            sl_price = high_water_mark * 0.995
+def _optimizer_worker_init(data_path, data_timeframe, fee_rate):
+    """워커 프로세스마다 한 번 캔들 파일을 메모리 맵으로 엽니다."""
+    _optimizer_state.clear()
+    _optimizer_state.update(candles=read_candle_file(data_path), data_timeframe=data_timeframe,
+                            fee_rate=fee_rate, prepared={})
 
-            risk_per_unit = abs(entry_price - sl_price)
-            tp_price = entry_price + (risk_per_unit * self.rr_ratio)
 
-            amount = self.calculate_position_size(entry_price, sl_price)
-            if not amount or amount <= 0:
-                self.log("계산된 주문 수량이 0보다 작아 진입하지 않습니다.")
-                return None
+def _optimizer_evaluate(params):
+    state = _optimizer_state
+    backtester = Backtester(params, fee_rate=state['fee_rate'])
+    # 같은 타임프레임으로 리샘플링한 캔들은 워커 안에서 재사용합니다.
+    candles = state['prepared'].get(backtester.timeframe)
+    if candles is None:
+        candles = state['prepared'][backtester.timeframe] = backtester.prepare(state['candles'], state['data_timeframe'])
+    return backtester.run(candles).summary()
 
-            return {
-                'side': 'buy', 'entry_price': entry_price, 'sl_price': sl_price,
-                'tp_price': tp_price, 'amount': amount
-            }
-        return None
 
-    def get_position_info(self):
-        try:
-            positions = self.exchange.fetch_positions(symbols=[self.symbol])
-            open_positions = [p for p in positions if float(p['contracts']) != 0]
-            if open_positions: return open_positions[0]
-        except Exception as e:
-            self.log(f"포지션 정보 조회 오류: {e}")
-        return None
+class ParameterOptimizer:
+    """파라미터 조합별 백테스트를 프로세스 풀로 병렬 실행하고 결과를 조합별로 캐시합니다.
 
-    def place_entry_order(self, setup):
-        try:
-            self.log(f"포지션 진입 시도: {setup['side']} {setup['amount']:.2f} contracts of {self.symbol}")
-            order = self.exchange.create_market_order(self.symbol, setup['side'], setup['amount'])
-            self.log(f"포지션 진입 성공! 진입 가격: approx ${setup['entry_price']:.4f}")
-            self.play_alarm()
-            return order
-        except Exception as e:
-            self.log(f"진입 주문 오류: {e}")
-            return None
+    캔들은 .f64 파일 하나를 모든 워커가 읽기 전용 메모리 맵으로 공유하고,
+    결과는 JSON Lines 캐시 파일에 쌓여 같은 조합은 다시 계산하지 않습니다.
+    """
+
+    def __init__(self, base_params, data_path, data_timeframe=None, fee_rate=0.0, workers=None, cache_path=None):
+        self.base_params = dict(base_params)
+        self.data_timeframe = data_timeframe
+        self.fee_rate = fee_rate
+        self.workers = workers or os.cpu_count() or 1
+        self.data_path = self._shared_data_file(data_path)
+        self.cache_path = cache_path or self.data_path + '.opt.jsonl'
+        self.results = self._load_cache()
+
+    @staticmethod
+    def _shared_data_file(path):
+        """CSV/Parquet 은 한 번만 읽어 워커들이 메모리 맵으로 공유할 .f64 파일로 바꿉니다."""
+        if path.lower().endswith('.f64'):
+            return path
+        shared = path + '.f64'
+        if not os.path.exists(shared) or os.path.getmtime(shared) < os.path.getmtime(path):
+            np.ascontiguousarray(load_ohlcv_file(path)).tofile(shared)
+        return shared
+
+    def _key(self, params):
+        stat = os.stat(self.data_path)
+        return json.dumps({
+            'params': params, 'fee_rate': self.fee_rate, 'data_timeframe': self.data_timeframe,
+            'data': [os.path.basename(self.data_path), stat.st_size, int(stat.st_mtime)],
+        }, sort_keys=True)
+
+    def _load_cache(self):
+        results = {}
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        results[record['key']] = record['metrics']
+                    except (ValueError, KeyError):
+                        continue  # 중간에 끊긴 줄
+        return results
+
+    @staticmethod
+    def grid(space):
+        """{이름: [값, ...]} 의 모든 조합을 만듭니다."""
+        names = list(space)
+        return [dict(zip(names, combo)) for combo in itertools.product(*space.values())]
+
+    @staticmethod
+    def random_samples(space, n, seed=None):
+        """{이름: [값, ...] 또는 (하한, 상한)} 에서 n 개 조합을 무작위로 뽑습니다.
+
+        범위는 OPTIMIZER_INT_PARAMS 파라미터면 정수로, 아니면 실수로 뽑습니다.
+        """
+        rng = random.Random(seed)
+        samples = []
+        for _ in range(n):
+            sample = {}
+            for name, values in space.items():
+                if isinstance(values, tuple) and len(values) == 2 and name in OPTIMIZER_INT_PARAMS:
+                    sample[name] = rng.randint(int(values[0]), int(values[1]))
+                elif isinstance(values, tuple) and len(values) == 2:
+                    sample[name] = round(rng.uniform(*values), 6)
+                else:
+                    sample[name] = rng.choice(list(values))
+            samples.append(sample)
+        return samples
+
+    def run(self, candidates):
+        """후보 조합을 평가해 (params, metrics) 목록을 반환합니다."""
+        full = [dict(self.base_params, **c) for c in candidates]
+        keys = [self._key(p) for p in full]
+        todo = {}
+        for key, params in zip(keys, full):
+            if key not in self.results:
+                todo.setdefault(key, params)
+
+        if todo:
+            chunksize = max(1, len(todo) // (self.workers * 4))
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_optimizer_worker_init,
+                                     initargs=(self.data_path, self.data_timeframe, self.fee_rate)) as pool, \
+                    open(self.cache_path, 'a', encoding='utf-8') as cache:
+                for key, metrics in zip(todo, pool.map(_optimizer_evaluate, todo.values(), chunksize=chunksize)):
+                    self.results[key] = metrics
+                    cache.write(json.dumps({'key': key, 'metrics': metrics}) + '\n')
+        return [(params, self.results[key]) for key, params in zip(keys, full)]
+
+
+# -----------------------------------------------------------------------------
+# 벤치마크 (전략 핫패스와 봇 루프 성능 회귀 측정)
+# -----------------------------------------------------------------------------
+BENCH_BASELINE_FILE = 'bench_baseline.json'
+BENCH_TOLERANCE = 0.25          # 기준 대비 이 비율 이상 나빠지면 회귀로 봅니다.
+BENCH_PARAMS = {
+    'symbol': 'BENCH_USDT', 'timeframe': '5m', 'trend_timeframe': '30m', 'rr_ratio': 2.0,
+    'risk_per_trade_usd': 1.0, 'reinvestment_percent': 0.5, 'initial_capital': 1000.0, 'ob_entry_level': 0.7,
+    'strategy': 'breakout', 'data_dir': None, 'state_dir': None,
+}
+
+
+def synthetic_candles(n, timeframe='5m', seed=0, start=1_600_000_000_000, price=100.0, volatility=0.004):
+    """재현 가능한 랜덤워크 OHLCV 배열을 만듭니다."""
+    rng = np.random.default_rng(seed)
+    tf_ms = timeframe_to_ms(timeframe)
+    close = price * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    open_ = np.r_[price, close[:-1]]
+    candles = np.empty((n, len(OHLCV_COLUMNS)), dtype=np.float64)
+    candles[:, TS] = start - start % tf_ms + np.arange(n) * tf_ms
+    candles[:, OPEN] = open_
+    candles[:, HIGH] = np.maximum(open_, close) * (1 + rng.random(n) * volatility)
+    candles[:, LOW] = np.minimum(open_, close) * (1 - rng.random(n) * volatility)
+    candles[:, CLOSE] = close
+    candles[:, VOLUME] = rng.random(n) * 100
+    return candles
+
+
+def _latency_stats(samples):
+    ms = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99)}
+
+
+def _peak_memory_kb(fn):
+    """fn 한 번 실행 동안의 파이썬 할당 최대치(KB)."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def _sim_bots(candles, timeframe, symbols, strategy):
+    """symbols 개 심볼이 같은 데이터를 재생하는 모의 거래소와 봇 목록."""
+    warmup = min(OB_HISTORY, len(candles) - 1)
+    names = [f"SYM{i}_USDT" for i in range(symbols)]
+    exchange = SimulatedExchange({name: candles for name in names}, timeframe, balance=BENCH_PARAMS['initial_capital'],
+                                 leverage=100, start_time=int(candles[warmup, TS]))
+    account_cache = SnapshotCache(clock=exchange.seconds)
+    bus = EventBus()
+    bots = [TradingBot('', '', dict(BENCH_PARAMS, symbol=name, timeframe=timeframe, strategy=strategy), bus,
+                       exchange=exchange, account_cache=account_cache) for name in names]
+    return exchange, bots
+
+
+def bench_check_for_entry(candles, timeframe, strategy, cycles):
+    exchange, (bot,) = _sim_bots(candles, timeframe, 1, strategy)
+    samples = []
+    for _ in range(cycles):
+        started = time.perf_counter()
+        bot.check_for_entry()
+        samples.append(time.perf_counter() - started)
+        if not exchange.advance():
+            break
+    return dict(_latency_stats(samples), throughput=len(samples) / sum(samples), unit='calls/s')
+
+
+def bench_position_size(candles, timeframe, cycles):
+    exchange, (bot,) = _sim_bots(candles, timeframe, 1, 'breakout')
+    price = float(candles[-1, CLOSE])
+    samples = []
+    for i in range(cycles):
+        started = time.perf_counter()
+        bot.calculate_position_size(price, price * (0.99 - (i % 10) * 0.001))
+        samples.append(time.perf_counter() - started)
+    return dict(_latency_stats(samples), throughput=len(samples) / sum(samples), unit='calls/s')
+
+
+def bench_bot_cycle(candles, timeframe, symbols, cycles):
+    """심볼 symbols 개의 run_once 를 차례로 돌리는 한 주기의 비용."""
+    exchange, bots = _sim_bots(candles, timeframe, symbols, 'breakout')
+    samples = []
+    for _ in range(cycles):
+        started = time.perf_counter()
+        for bot in bots:
+            bot.run_once()
+        samples.append(time.perf_counter() - started)
+        if not exchange.advance():
+            break
+    bars = len(samples) / SIM_TICKS_PER_BAR * symbols
+    return dict(_latency_stats(samples), throughput=len(samples) / sum(samples), unit='cycles/s',
+                bars_per_sec=bars / sum(samples))
+
+
+def bench_backtest(candles, timeframe, strategy):
+    params = dict(BENCH_PARAMS, timeframe=timeframe, strategy=strategy)
+    started = time.perf_counter()
+    Backtester(params).run(candles)
+    elapsed = time.perf_counter() - started
+    return {'throughput': len(candles) / elapsed, 'unit': 'bars/s', 'elapsed_s': elapsed}
+
+
+def run_benchmarks(candles=None, timeframe='5m', cycles=2000, symbols=(1, 4, 16), histories=(10_000, 100_000)):
+    """벤치마크 케이스를 모두 돌려 {케이스: 지표} 딕셔너리를 반환합니다. candles 가 없으면 합성 데이터를 씁니다."""
+    recorded = candles is not None
+    if not recorded:
+        candles = synthetic_candles(OB_HISTORY + cycles // SIM_TICKS_PER_BAR + 10, timeframe)
+    cases = {
+        'check_for_entry.breakout': lambda: bench_check_for_entry(candles, timeframe, 'breakout', cycles),
+        'check_for_entry.orderblock': lambda: bench_check_for_entry(candles, timeframe, 'orderblock', cycles),
+        'calculate_position_size': lambda: bench_position_size(candles, timeframe, cycles),
+    }
+    for n in symbols:
+        cases[f"bot_cycle.symbols_{n}"] = lambda n=n: bench_bot_cycle(candles, timeframe, n, max(1, cycles // n))
+    for n in histories:
+        history = candles[:n] if recorded and len(candles) >= n else synthetic_candles(n, timeframe, seed=n)
+        for strategy in ('breakout', 'orderblock'):
+            cases[f"backtest.{strategy}.bars_{n}"] = lambda h=history, s=strategy: bench_backtest(h, timeframe, s)
+
+    results = {}
+    for name, case in cases.items():
+        results[name] = case()
+        # 메모리 측정은 tracemalloc 오버헤드가 시간에 섞이지 않도록 따로 한 번 더 돌립니다.
+        results[name]['peak_kb'] = _peak_memory_kb(case)
+    return results
+
+
+def compare_benchmarks(results, baseline, tolerance=BENCH_TOLERANCE):
+    """기준 결과와 비교해 회귀 설명 목록을 반환합니다. 처리량 감소, p95 지연/최대 메모리 증가를 봅니다."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if current['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append(f"{name}: 처리량 {base['throughput']:.1f} -> {current['throughput']:.1f} {current['unit']}")
+        if 'p95_ms' in base and current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']:.3f} -> {current['p95_ms']:.3f} ms")
+        if current['peak_kb'] > base['peak_kb'] * (1 + tolerance) + 64:
+            regressions.append(f"{name}: 최대 메모리 {base['peak_kb']:.0f} -> {current['peak_kb']:.0f} KB")
+    return regressions
+
+
+# -----------------------------------------------------------------------------
+# 캔들 차트 (GUI 캔버스, 증분 갱신 + 축소 시 봉 묶음)
+# -----------------------------------------------------------------------------
+CHART_MAX_BARS = 50_000         # 차트가 보관하는 최대 봉 수
+CHART_DEFAULT_BARS = 150        # 처음 화면에 보이는 봉 수
+CHART_MIN_BARS = 20
+CHART_MIN_SLOT_PX = 3           # 봉 한 칸의 최소 너비(px). 더 좁아지면 여러 봉을 한 칸으로 묶어 그립니다.
+CHART_REFRESH_MS = 250          # 봇 캔들 버퍼를 읽어 오는 간격
+CHART_AXIS_PX = 70              # 오른쪽 가격 눈금 영역 너비
+CHART_MARGIN_PX = 8
+CHART_UP, CHART_DOWN = '#26a69a', '#ef5350'
+CHART_LINES = (('breakout', '돌파', '#FF9800'), ('entry', '진입', '#2196F3'),
+               ('sl', 'SL', '#f44336'), ('tp', 'TP', '#4CAF50'))
+
+
+def decimate_candles(candles, factor, first_index=0):
+    """factor 봉씩 OHLC 를 묶어 (묶음 번호, 시가, 고가, 저가, 종가) 배열을 반환합니다.
+
+    묶음 경계는 절대 인덱스(candles[0] 이 first_index) 기준이라 새 봉이 붙어도 앞선 묶음은 그대로입니다.
+    """
+    n = len(candles)
+    if factor == 1 or n == 0:
+        return (first_index + np.arange(n), candles[:, OPEN], candles[:, HIGH], candles[:, LOW], candles[:, CLOSE])
+    first_bucket = first_index // factor
+    starts = np.r_[0, np.arange((first_bucket + 1) * factor - first_index, n, factor)]
+    ends = np.r_[starts[1:], n] - 1
+    return (first_bucket + np.arange(len(starts)), candles[starts, OPEN],
+            np.maximum.reduceat(candles[:, HIGH], starts), np.minimum.reduceat(candles[:, LOW], starts),
+            candles[ends, CLOSE])
+
+
+class ChartHistory:
+    """차트가 그리는 캔들 기록. 봇 버퍼(최근 수백 봉)보다 긴 기록을 GUI 쪽에 따로 둡니다.
+
+    용량의 두 배 배열에 이어 쓰다가 가득 차면 최근 max_bars 개만 앞으로 옮깁니다. 절대 인덱스
+    (base + 배열 위치)는 오래된 봉을 잘라내도 바뀌지 않아 봉 묶음 경계가 흔들리지 않습니다.
+    """
+
+    def __init__(self, max_bars=CHART_MAX_BARS):
+        self.max_bars = max_bars
+        self._data = np.empty((max_bars * 2, len(OHLCV_COLUMNS)), dtype=np.float64)
+        self.count = 0
+        self.base = 0               # 잘라낸 봉 수
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def end(self):
+        return self.base + self.count
+
+    @property
+    def last_timestamp(self):
+        return int(self._data[self.count - 1, TS]) if self.count else None
+
+    def view(self):
+        return self._data[:self.count]
+
+    def merge(self, rows):
+        """새 캔들을 반영하고 처음 바뀐 봉의 절대 인덱스를 반환합니다. 바뀐 것이 없으면 None."""
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(OHLCV_COLUMNS))
+        last_ts = self.last_timestamp
+        first = self.end
+        if last_ts is not None:
+            rows = rows[rows[:, TS] >= last_ts]
+            if len(rows) and rows[0, TS] == last_ts:
+                # 마지막(미완성) 봉 덮어쓰기
+                if not np.array_equal(rows[0], self._data[self.count - 1]):
+                    self._data[self.count - 1] = rows[0]
+                    first = self.end - 1
+                rows = rows[1:]
+        if not len(rows):
+            return first if first < self.end else None
+        if len(rows) > self.max_bars:
+            self.base += self.count + len(rows) - self.max_bars
+            self.count = 0
+            rows = rows[-self.max_bars:]
+        elif self.count + len(rows) > len(self._data):
+            keep = self.max_bars - len(rows)
+            self._data[:keep] = self._data[self.count - keep:self.count]
+            self.base += self.count - keep
+            self.count = keep
+        self._data[self.count:self.count + len(rows)] = rows
+        self.count += len(rows)
+        return max(first, self.base)
+
+
+class CandleChart:
+    """Tk Canvas 캔들 차트. 봇 스레드에는 아무 일도 시키지 않고 GUI 타이머에서 봇 캔들 버퍼를 읽어 옵니다.
 
-    def place_sl_tp_orders(self, setup):
+    최신 봉을 따라가는 동안에는 바뀐 마지막 묶음만 다시 그리고, 새 묶음이 생기면 기존 도형을 한 칸 옮깁니다.
+    화면 봉 수가 캔버스 폭을 넘으면 여러 봉을 한 칸으로 묶으므로 도형 수는 봉 수가 아니라 폭에 비례합니다.
+    휠로 확대/축소, 드래그로 이동, 더블클릭으로 최신 봉 따라가기로 돌아갑니다.
+    """
+
+    def __init__(self, parent, height=260):
+        self.canvas = tk.Canvas(parent, height=height, highlightthickness=0)
+        self.history = ChartHistory()
+        self.bars = CHART_DEFAULT_BARS
+        self.offset = 0             # 오른쪽 끝에서 떨어진 봉 수 (0 이면 최신 봉 따라가기)
+        self.levels = {}            # 선 이름 -> 가격
+        self.fg = '#000000'
+        self._bot = None
+        self._buffer = None
+        self._layout = None
+        self._items = {}            # 묶음 번호 -> (심지, 몸통) 도형 ID
+        self._level_items = {}
+        self._drag_x = None
+        self.canvas.bind('<Configure>', lambda e: self.redraw())
+        self.canvas.bind('<MouseWheel>', lambda e: self.zoom(e.delta < 0))
+        self.canvas.bind('<Button-4>', lambda e: self.zoom(False))
+        self.canvas.bind('<Button-5>', lambda e: self.zoom(True))
+        self.canvas.bind('<ButtonPress-1>', self._on_press)
+        self.canvas.bind('<B1-Motion>', self._on_drag)
+        self.canvas.bind('<Double-Button-1>', lambda e: self.follow())
+
+    def attach(self, bot):
+        """bot 의 심볼/타임프레임을 표시합니다. 로컬 캔들 저장소가 있으면 긴 기록을 먼저 채웁니다."""
+        self._bot = bot
+        self.history = ChartHistory()
+        self.offset = 0
+        self.levels = {}
+        cache = bot.candle_cache
+        self._buffer = cache.buffer(bot.symbol, bot.timeframe)
+        if cache.store is not None:
+            self.history.merge(cache.store.read(bot.symbol, bot.timeframe)[-self.history.max_bars:])
+        self.redraw()
+
+    def set_colors(self, bg, fg):
+        self.canvas.configure(bg=bg)
+        self.fg = fg
+        self.redraw()
+
+    def poll(self):
+        """봇 버퍼의 새 캔들과 진행 중 거래 가격을 반영합니다. 봇이 버퍼를 갱신 중이면 다음 틱으로 미룹니다."""
+        if self._bot is None:
+            return
+        buf = self._buffer
+        if not buf.lock.acquire(blocking=False):
+            return
         try:
-            position = self.get_position_info()
-            if not position:
-                self.log("SL/TP 설정 실패: 포지션 정보를 찾을 수 없음")
-                return
-            amount = abs(float(position['contracts']))
-            side = 'sell' if float(position['contracts']) > 0 else 'buy'
-            sl_params = {'reduce_only': True, 'stopPrice': setup['sl_price']}
-            tp_params = {'reduce_only': True, 'stopPrice': setup['tp_price']}
-            self.log(f"손절 주문 설정: ${setup['sl_price']:.4f}")
-            self.exchange.create_order(self.symbol, 'stop_market', side, amount, params=sl_params)
-            self.log(f"익절 주문 설정: ${setup['tp_price']:.4f}")
-            self.exchange.create_order(self.symbol, 'take_profit_market', side, amount, params=tp_params)
-            self.log("SL/TP 주문 설정 완료.")
-        except Exception as e:
-            self.log(f"SL/TP 주문 설정 오류: {e}")
+            rows = buf.view()
+            last_ts = self.history.last_timestamp
+            if last_ts is not None:
+                rows = rows[np.searchsorted(rows[:, TS], last_ts):]
+            rows = rows.copy()
+        finally:
+            buf.lock.release()
 
-    def close_position_market(self):
-        """현재 포지션을 시장가로 즉시 종료합니다."""
-        position = self.get_position_info()
-        if not position:
-            self.log("종료할 포지션이 없습니다.")
+        end = self.history.end
+        changed = self.history.merge(rows)
+        if self.offset:
+            self.offset += self.history.end - end   # 과거를 보는 중이면 화면을 그 자리에 둡니다.
+        levels = self._current_levels()
+        if changed is not None:
+            self.levels = levels
+            self._update(changed)
+        elif levels != self.levels:
+            self.levels = levels
+            self._draw_levels()
+
+    def _current_levels(self):
+        """돌파 기준(직전 lookback 확정 봉 고가의 최댓값)과 진행 중 거래의 진입/SL/TP 가격."""
+        bot = self._bot
+        levels = {}
+        data = self.history.view()
+        if len(data) > bot.lookback:
+            levels['breakout'] = float(data[-bot.lookback - 1:-1, HIGH].max())
+        setup = bot.active_setup or {}
+        for name, key in (('entry', 'entry_price'), ('sl', 'sl_price'), ('tp', 'tp_price')):
+            if setup.get(key) is not None:
+                levels[name] = float(setup[key])
+        return levels
+
+    # --- 확대/이동 ---
+    def zoom(self, out):
+        bars = self.bars * 1.25 if out else self.bars / 1.25
+        self.bars = int(min(max(bars, CHART_MIN_BARS), self.history.max_bars))
+        self.redraw()
+
+    def follow(self):
+        self.offset = 0
+        self.redraw()
+
+    def _on_press(self, event):
+        self._drag_x = event.x
+
+    def _on_drag(self, event):
+        if self._layout is None or self._drag_x is None:
             return
+        bars = int((event.x - self._drag_x) / self._layout['slot'] * self._layout['factor'])
+        if bars:
+            self._drag_x = event.x
+            self.offset = min(max(self.offset + bars, 0), max(len(self.history) - 1, 0))
+            self.redraw()
 
-        side = 'sell' if float(position['contracts']) > 0 else 'buy'
-        amount = abs(float(position['contracts']))
-        
-        try:
-            self.log(f"시장가 포지션 종료 시도: {side} {amount} contracts")
-            # 안전을 위해 모든 대기 주문 취소
-            self.exchange.cancel_all_orders(self.symbol)
-            self.log("모든 대기 주문을 취소했습니다.")
-            # 포지션 종료 주문
-            self.exchange.create_market_order(self.symbol, side, amount, {'reduce_only': True})
-            self.log("✅ 포지션이 성공적으로 종료되었습니다.")
-            self.play_alarm()
-            # 포지션 종료 후 상태 초기화
-            self.active_setup = None
-            self.last_trade_profit = 0
-            self.consecutive_reinvestment_wins = 0
-        except Exception as e:
-            self.log(f"❌ 포지션 종료 중 오류 발생: {e}")
+    # --- 그리기 ---
+    def _x(self, bucket):
+        return (bucket - self._layout['first'] + 0.5) * self._layout['slot']
 
-    def run(self):
-        self.is_running = True
-        self.update_balance_display()
+    def _y(self, price):
+        lay = self._layout
+        return CHART_MARGIN_PX + (lay['top'] - price) / (lay['top'] - lay['bottom']) * (lay['h'] - 2 * CHART_MARGIN_PX)
 
-        while self.is_running:
-            try:
-                position = self.get_position_info()
-
-                if not position:
-                    if self.active_setup:
-                        self.log("포지션이 청산되었습니다. 손익을 계산합니다...")
-                        self.play_alarm()
-                        
-                        current_balance = self.get_balance()
-                        self.last_trade_profit = current_balance - self.balance_at_trade_start
-                        
-                        if self.last_trade_profit > 0:
-                            self.log(f"✅ 거래 이익: ${self.last_trade_profit:.2f}")
-                            if self.is_reinvestment_trade:
-                                self.consecutive_reinvestment_wins += 1
-                                self.log(f"재투자 연속 성공: {self.consecutive_reinvestment_wins}회")
-                            else:
-                                self.consecutive_reinvestment_wins = 0
-                        else:
-                            self.log(f"❌ 거래 손실: ${self.last_trade_profit:.2f}")
-                            self.consecutive_reinvestment_wins = 0
-                            self.last_trade_profit = 0
-                        
-                        if self.consecutive_reinvestment_wins >= 2:
-                            self.log("🔒 2회 연속 재투자 성공! 다음 거래는 고정 리스크로 전환합니다.")
-
-                        self.active_setup = None
-                        self.update_balance_display()
-
-                    self.log(f"{self.timeframe}봉 기준, 새로운 진입 신호 탐색 중...")
-                    new_setup = self.check_for_entry()
-                    if new_setup:
-                        self.balance_at_trade_start = self.get_balance()
-                        self.active_setup = new_setup
-                        entry_order = self.place_entry_order(self.active_setup)
-                        if entry_order:
-                            time.sleep(3)
-                            self.place_sl_tp_orders(self.active_setup)
-                            self.update_balance_display()
-                else:
-                    if not self.active_setup:
-                        pos_side = 'buy' if float(position['contracts']) > 0 else 'sell'
-                        self.log(f"기존 포지션 발견. 수량: {position['contracts']}, 방향: {pos_side}")
-                        self.active_setup = {'side': pos_side}
-                    
-                    self.log(f"포지션 유지 중... 진입가: ${float(position['entryPrice']):.4f}")
-                    self.update_balance_display()
-
-                for _ in range(30):
-                    if not self.is_running: break
-                    time.sleep(1)
+    def redraw(self):
+        """현재 화면 구간을 전부 다시 그립니다. 확대/이동/크기 변경과 가격 범위를 벗어날 때만 호출됩니다."""
+        canvas = self.canvas
+        canvas.delete('all')
+        self._items, self._level_items, self._layout = {}, {}, None
+        hist = self.history
+        stop = hist.end - self.offset
+        if not len(hist) or stop <= hist.base:
+            return
+        w = max(canvas.winfo_width(), CHART_AXIS_PX * 2)
+        h = max(canvas.winfo_height(), CHART_MARGIN_PX * 4)
+        plot_w = w - CHART_AXIS_PX
+        factor = max(1, math.ceil(self.bars / (plot_w / CHART_MIN_SLOT_PX)))
+        slots = math.ceil(self.bars / factor)
+        last_bucket = (stop - 1) // factor
+        first_bucket = last_bucket - slots + 1
+        start = max(hist.base, first_bucket * factor)
+        buckets, opens, highs, lows, closes = decimate_candles(
+            hist.view()[start - hist.base:stop - hist.base], factor, start)
+        top, bottom = float(highs.max()), float(lows.min())
+        pad = (top - bottom) * 0.05 or abs(top) * 0.01 or 1.0
+        self._layout = {'w': w, 'h': h, 'factor': factor, 'slot': plot_w / slots, 'first': first_bucket,
+                        'last': last_bucket, 'top': top + pad, 'bottom': bottom - pad}
 
-            except Exception as e:
-                self.log(f"런타임 오류 발생: {e}")
-                time.sleep(10)
+        for i in range(5):
+            price = bottom + (top - bottom) * i / 4
+            y = self._y(price)
+            canvas.create_line(0, y, plot_w, y, fill=self.fg, dash=(1, 4), tags=('axis',))
+            canvas.create_text(w - 4, y, text=f"{price:.6g}", anchor='e', fill=self.fg, tags=('axis',))
+        for row in zip(buckets, opens, highs, lows, closes):
+            self._draw_bucket(*row)
+        self._draw_levels()
 
-        self.log("봇이 정지되었습니다.")
+    def _update(self, changed):
+        """따라가기 중 마지막 묶음(또는 새로 생긴 묶음 하나)만 다시 그립니다. 그 외에는 전체를 다시 그립니다."""
+        lay = self._layout
+        if lay is None or self.offset:
+            return self.redraw()
+        hist = self.history
+        factor = lay['factor']
+        last_bucket = (hist.end - 1) // factor
+        if changed // factor < lay['last'] or last_bucket > lay['last'] + 1:
+            return self.redraw()
+        start = max(hist.base, changed // factor * factor)
+        buckets, opens, highs, lows, closes = decimate_candles(hist.view()[start - hist.base:], factor, start)
+        if highs.max() > lay['top'] or lows.min() < lay['bottom']:
+            return self.redraw()        # 가격이 화면 범위를 벗어나면 축을 다시 잡습니다.
+        if last_bucket > lay['last']:
+            visible = hist.view()[max(0, (last_bucket - lay['last'] + lay['first']) * factor - hist.base):]
+            if visible[:, HIGH].max() - visible[:, LOW].min() < (lay['top'] - lay['bottom']) / 2:
+                return self.redraw()    # 큰 봉이 화면 밖으로 나가 축이 너무 넓어졌으면 다시 잡습니다.
+            # 새 묶음: 기존 봉을 한 칸 왼쪽으로 옮기고 화면 밖으로 나간 묶음은 지웁니다.
+            self.canvas.move('candle', -lay['slot'], 0)
+            lay['first'] += 1
+            lay['last'] = last_bucket
+            for bucket in [b for b in self._items if b < lay['first']]:
+                self.canvas.delete(*self._items.pop(bucket))
+        for row in zip(buckets, opens, highs, lows, closes):
+            self._draw_bucket(*row)
+        self.canvas.tag_raise('level')
+        self._draw_levels()
+
+    def _draw_bucket(self, bucket, open_, high, low, close):
+        x = self._x(bucket)
+        half = max(1.0, self._layout['slot'] * 0.35)
+        color = CHART_UP if close >= open_ else CHART_DOWN
+        y_open, y_close = self._y(open_), self._y(close)
+        wick = (x, self._y(high), x, self._y(low))
+        body = (x - half, min(y_open, y_close), x + half, max(y_open, y_close) + 1)
+        items = self._items.get(bucket)
+        if items is None:
+            self._items[bucket] = (
+                self.canvas.create_line(*wick, fill=color, tags=('candle',)),
+                self.canvas.create_rectangle(*body, fill=color, outline=color, tags=('candle',)))
+        else:
+            self.canvas.coords(items[0], *wick)
+            self.canvas.coords(items[1], *body)
+            self.canvas.itemconfigure(items[0], fill=color)
+            self.canvas.itemconfigure(items[1], fill=color, outline=color)
+
+    def _draw_levels(self):
+        """돌파 기준/진입/SL/TP 수평선. 화면 범위 밖 가격은 위/아래 가장자리에 붙여 표시합니다."""
+        lay = self._layout
+        if lay is None:
+            return
+        plot_w = lay['w'] - CHART_AXIS_PX
+        for name, label, color in CHART_LINES:
+            price = self.levels.get(name)
+            items = self._level_items.get(name)
+            if price is None:
+                if items:
+                    for item in items:
+                        self.canvas.itemconfigure(item, state='hidden')
+                continue
+            y = min(max(self._y(price), 1), lay['h'] - 1)
+            text = f"{label} {price:.6g}"
+            if items is None:
+                self._level_items[name] = (
+                    self.canvas.create_line(0, y, plot_w, y, fill=color, dash=(4, 2), tags=('level',)),
+                    self.canvas.create_text(plot_w - 4, y - 2, text=text, anchor='se', fill=color, tags=('level',)))
+            else:
+                self.canvas.coords(items[0], 0, y, plot_w, y)
+                self.canvas.coords(items[1], plot_w - 4, y - 2)
+                self.canvas.itemconfigure(items[0], state='normal')
+                self.canvas.itemconfigure(items[1], text=text, state='normal')
 
-    def stop(self):
-        self.is_running = False
-        self.log("봇 정지 신호를 받았습니다. 루프를 종료합니다.")
 
 # -----------------------------------------------------------------------------
 # GUI 애플리케이션 클래스
 # -----------------------------------------------------------------------------
+LOG_MAX_LINES = 2000            # 화면에 남기는 최대 로그 줄 수
+LOG_MAX_PER_TICK = 1000         # process_queue 한 번에 처리하는 최대 메시지 수
+
+
 class App:
     def __init__(self, root):
         self.root = root
         self.root.title("Auto Trading Bot (Gate.io - Live)")
-        self.root.geometry("800x750")
+        self.root.geometry("800x960")
 
+        self.bot = None
         self.bot_thread = None
+        self.stop_requested = threading.Event()
         self.msg_queue = Queue()
+        self.bus = EventBus()
+        self.bus.subscribe(self.msg_queue.put)
+        self.file_logger, self.log_listener = create_file_logger()
         self.is_dark_mode = False
 
         self.FONT_MAIN = ("Helvetica", 11)
@@ -319,7 +4076,7 @@ class App:
         self.api_secret_entry.grid(row=1, column=1, columnspan=2, sticky="ew", padx=5, pady=3)
 
         self.param_labels = []
-        params_texts = ["심볼:", "Timeframe:", "Trend Timeframe:", "손익비 (RR Ratio):", "고정 손실액 (USD):", "초기 자본금 (USD):", "수익 재투자 비율 (%):", "OB 진입 레벨:"]
+        params_texts = ["심볼:", "Timeframe:", "Trend Timeframe:", "손익비 (RR Ratio):", "고정 손실액 (USD):", "초기 자본금 (USD):", "수익 재투자 비율 (%):", "OB 진입 레벨:", "전략:"]
         for i, text in enumerate(params_texts):
             label = tk.Label(self.settings_frame, text=text)
             label.grid(row=i+2, column=0, sticky="w", padx=5, pady=3)
@@ -327,6 +4084,7 @@ class App:
 
         self.symbol_var = tk.StringVar()
         symbols = ['ETC_USDT', 'BTC_USDT', 'ETH_USDT', 'XRP_USDT', 'SOL_USDT']
+        self.symbols = symbols
         self.symbol_menu = ttk.OptionMenu(self.settings_frame, self.symbol_var, symbols[0], *symbols)
         self.symbol_menu.grid(row=2, column=1, sticky="ew", padx=5, pady=3)
 
@@ -353,6 +4111,19 @@ class App:
         
         self.ob_level_entry = tk.Entry(self.settings_frame); self.ob_level_entry.insert(0, "0.7")
         self.ob_level_entry.grid(row=9, column=1, sticky="ew", padx=5, pady=3)
+
+        strategies = ['breakout', 'orderblock']
+        self.strategy_var = tk.StringVar(value=strategies[0])
+        self.strategy_menu = ttk.OptionMenu(self.settings_frame, self.strategy_var, strategies[0], *strategies)
+        self.strategy_menu.grid(row=10, column=1, sticky="ew", padx=5, pady=3)
+
+        self.multi_symbol_on = tk.BooleanVar(value=False)
+        self.multi_symbol_check = tk.Checkbutton(self.settings_frame, text="전체 심볼 동시 스캔", var=self.multi_symbol_on)
+        self.multi_symbol_check.grid(row=11, column=1, sticky="w", padx=5, pady=3)
+
+        self.stream_on = tk.BooleanVar(value=False)
+        self.stream_check = tk.Checkbutton(self.settings_frame, text="실시간 스트림 모드 (웹소켓)", var=self.stream_on)
+        self.stream_check.grid(row=12, column=1, sticky="w", padx=5, pady=3)
         
         # 컨트롤 프레임
         self.control_frame = tk.Frame(self.main_frame)
@@ -373,6 +4144,11 @@ class App:
         self.close_pos_button = tk.Button(self.control_frame, text="포지션 종료", command=self.force_close_position, state="disabled", bg="#FFC107", fg="#000000", width=10, relief=tk.RAISED, borderwidth=2)
         self.close_pos_button.pack(side="right", padx=5)
 
+        # 캔들 차트 (돌파 기준선, 진입/SL/TP)
+        self.chart = CandleChart(self.main_frame)
+        self.chart_bot = None
+        self.chart.canvas.pack(fill="x", pady=(0, 10))
+
         # 로그 프레임 및 버튼
         self.log_control_frame = tk.Frame(self.main_frame)
         self.log_control_frame.pack(fill="x")
@@ -390,11 +4166,12 @@ class App:
         self.alarm_check = tk.Checkbutton(self.log_control_frame, text="알람", var=self.alarm_on)
         self.alarm_check.pack(side="right", padx=5)
         
-        self.log_text = scrolledtext.ScrolledText(self.main_frame, wrap=tk.WORD, height=15)
+        self.log_text = scrolledtext.ScrolledText(self.main_frame, wrap=tk.WORD, height=12)
         self.log_text.pack(fill="both", expand=True, pady=(5,0))
         self.log_text.configure(state='disabled')
 
         self.root.after(100, self.process_queue)
+        self.root.after(CHART_REFRESH_MS, self.refresh_chart)
 
     def toggle_theme(self):
         self.is_dark_mode = not self.is_dark_mode
@@ -419,6 +4196,8 @@ class App:
             widget.configure(bg=theme["entry_bg"], fg=theme["entry_fg"], insertbackground=theme["fg"])
 
         self.alarm_check.configure(bg=theme["bg"], fg=theme["fg"], selectcolor=theme["bg"], activebackground=theme["bg"], font=self.FONT_MAIN)
+        for check in (self.multi_symbol_check, self.stream_check):
+            check.configure(bg=theme["frame_bg"], fg=theme["fg"], selectcolor=theme["frame_bg"], activebackground=theme["frame_bg"], font=self.FONT_MAIN)
 
         self.balance_label.configure(bg=theme["bg"], fg=theme["fg"], font=self.FONT_MAIN)
         self.status_label.configure(bg=theme["bg"], font=self.FONT_MAIN)
@@ -436,6 +4215,7 @@ class App:
         self.stop_button.configure(bg="#f44336")
 
         self.log_text.configure(bg=theme["log_bg"], fg=theme["log_fg"], font=self.FONT_LOG)
+        self.chart.set_colors(theme["log_bg"], theme["log_fg"])
 
         self.style.configure('TLabel', background=theme["frame_bg"], foreground=theme["fg"])
         self.style.configure('TMenubutton', background=theme["entry_bg"], foreground=theme["entry_fg"])
@@ -457,13 +4237,16 @@ class App:
                 'initial_capital': float(self.initial_capital_entry.get()),
                 'reinvestment_percent': float(self.reinvest_pct_entry.get()) / 100.0,
                 'ob_entry_level': float(self.ob_level_entry.get()),
+                'strategy': self.strategy_var.get(),
             }
         except ValueError:
             messagebox.showerror("입력 오류", "숫자 파라미터에 유효한 숫자를 입력하세요.")
             return
             
-        self.bot = TradingBot(api_key, api_secret, params, self.msg_queue)
-        self.bot_thread = threading.Thread(target=self.bot.run, daemon=True)
+        self.bot = None
+        self.stop_requested.clear()
+        self.bot_thread = threading.Thread(target=self.run_bot, daemon=True,
+                                           args=(api_key, api_secret, params, self.multi_symbol_on.get(), self.stream_on.get()))
         self.bot_thread.start()
 
         for child in self.settings_frame.winfo_children():
@@ -477,7 +4260,29 @@ class App:
         self.status_label.config(text="상태: 실행 중", fg=theme["status_run"])
         self.add_log("봇 스레드를 시작합니다.")
 
+    def run_bot(self, api_key, api_secret, params, multi_symbol, stream):
+        """봇 스레드 본체. 거래소 연결(ccxt 로딩, 마켓 목록 다운로드)도 여기서 해서 GUI 가 멈추지 않게 합니다."""
+        try:
+            if multi_symbol:
+                bot = MultiSymbolScanner(api_key, api_secret, params, self.bus, self.symbols)
+                target = bot.run
+            else:
+                bot = TradingBot(api_key, api_secret, params, self.bus)
+                target = bot.run
+                if stream:
+                    feed = CcxtProFeed(params['symbol'], params['timeframe'])
+                    target = lambda: bot.run_event_driven(feed)
+        except Exception as e:
+            self.bus.publish(LogEvent(f"봇 초기화 오류: {e}"))
+            self.bus.publish(StopEvent())
+            return
+        self.bot = bot
+        if self.stop_requested.is_set():
+            return      # 연결하는 동안 정지 버튼을 눌렀습니다.
+        target()
+
     def stop_bot(self):
+        self.stop_requested.set()
         if self.bot:
             self.bot.stop()
         
@@ -514,29 +4319,72 @@ class App:
                 self.add_log("프로그램 종료 중... 포지션을 정리합니다.")
                 threading.Thread(target=self.bot.close_position_market, daemon=True).start()
                 # 봇이 포지션을 정리할 시간을 잠시 줍니다.
-                self.root.after(2000, self.root.destroy)
+                self.root.after(2000, self.shutdown)
             else:
                 return # 종료 취소
         else:
-            self.root.destroy()
+            self.shutdown()
+
+    def shutdown(self):
+        self.log_listener.stop()
+        self.root.destroy()
 
     def process_queue(self):
+        """큐 메시지를 한 틱에 최대 LOG_MAX_PER_TICK 개까지 모아서 한 번에 화면에 반영합니다."""
+        backlog = False
+        try:
+            logs = []
+            balance = None
+            alarm = False
+            for _ in range(LOG_MAX_PER_TICK):
+                try:
+                    event = self.msg_queue.get_nowait()
+                except Empty:
+                    break
+                if isinstance(event, LogEvent): logs.append(event.message)
+                elif isinstance(event, BalanceEvent): balance = event.balance
+                elif isinstance(event, AlarmEvent): alarm = True
+                elif isinstance(event, StopEvent): self.stop_bot()
+            else:
+                backlog = True
+
+            if logs: self.add_logs(logs)
+            if balance is not None: self.balance_label.config(text=f"잔액: {balance:.2f} USDT")
+            if alarm and self.alarm_on.get(): self.play_sound()
+        finally:
+            # 처리하지 못한 메시지가 남았으면 곧바로 다음 틱을 돌립니다.
+            self.root.after(10 if backlog else 100, self.process_queue)
+
+    def refresh_chart(self):
+        """봇 캔들 버퍼를 차트에 반영합니다. 읽기만 하므로 봇 스레드를 기다리게 하지 않습니다."""
         try:
-            while not self.msg_queue.empty():
-                message = self.msg_queue.get_nowait()
-                if message.startswith("LOG:"): self.add_log(message[5:])
-                elif message.startswith("BALANCE:"): self.balance_label.config(text=f"잔액: {message[9:]}")
-                elif message == "ALARM":
-                    if self.alarm_on.get(): self.play_sound()
-                elif message == "STOP_BOT": self.stop_bot()
+            bot = self.bot
+            if isinstance(bot, MultiSymbolScanner):
+                bot = bot.bots.get(self.symbol_var.get())
+            if bot is not None and bot is not self.chart_bot:
+                # 봇 스레드가 거래소 연결을 마친 뒤에 차트를 붙입니다.
+                self.chart_bot = bot
+                self.chart.attach(bot)
+            self.chart.poll()
+        except Exception as e:
+            self.file_logger.warning("차트 갱신 오류: %s", e)
         finally:
-            self.root.after(100, self.process_queue)
+            self.root.after(CHART_REFRESH_MS, self.refresh_chart)
 
     def add_log(self, message):
+        self.add_logs([message])
+
+    def add_logs(self, messages):
+        """여러 로그를 파일에 기록하고, 화면에는 한 번에 삽입한 뒤 LOG_MAX_LINES 줄만 남깁니다."""
+        for message in messages:
+            self.file_logger.info(message)
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
+        text = ''.join(f"[{timestamp}] {message}\n" for message in messages[-LOG_MAX_LINES:])
         self.log_text.configure(state='normal')
-        self.log_text.insert(tk.END, log_message)
+        self.log_text.insert(tk.END, text)
+        line_count = int(self.log_text.index('end-1c').split('.')[0])
+        if line_count > LOG_MAX_LINES:
+            self.log_text.delete('1.0', f"{line_count - LOG_MAX_LINES}.0")
         self.log_text.configure(state='disabled')
         self.log_text.see(tk.END)
 
@@ -544,17 +4392,328 @@ class App:
         def _play():
             try:
                 sound_file = 'alarm.mp3'
-                if os.path.exists(sound_file): playsound(sound_file)
-                else: self.add_log(f"알람 경고: '{sound_file}' 파일을 찾을 수 없습니다.")
+                if os.path.exists(sound_file):
+                    from playsound import playsound
+                    playsound(sound_file)
+                else: self.msg_queue.put(LogEvent(f"알람 경고: '{sound_file}' 파일을 찾을 수 없습니다."))
             except Exception as e:
-                self.add_log(f"알람 재생 오류: {e}")
+                self.msg_queue.put(LogEvent(f"알람 재생 오류: {e}"))
         sound_thread = threading.Thread(target=_play, daemon=True)
         sound_thread.start()
 
+# -----------------------------------------------------------------------------
+# 헤드리스 실행 (서버용, tkinter/playsound 불필요)
+# -----------------------------------------------------------------------------
+class HeadlessRunner:
+    """GUI 없이 TradingBot(또는 MultiSymbolScanner)을 실행하고 이벤트를 파일/콘솔/지표 구독자로 보냅니다."""
+
+    def __init__(self, api_key, api_secret, params, symbols=None, stream=False, log_path=LOG_FILE, console=True,
+                 metrics_port=None, metrics_file=None, shared_memory=False):
+        self.bus = EventBus()
+        self.file_sink = FileLogSink(log_path)
+        self.bus.subscribe(self.file_sink, LogEvent)
+        self.bus.subscribe(self.file_sink, BalanceEvent)
+        if console:
+            self.bus.subscribe(ConsoleSink(), LogEvent)
+        self.metrics = MetricsSink()
+        self.bus.subscribe(self.metrics)
+        self.bus.subscribe(lambda event: self.stop(), StopEvent)
+
+        self.stream = stream and not symbols
+        self.shared_memory = shared_memory and not symbols
+        if symbols:
+            self.bot = MultiSymbolScanner(api_key, api_secret, params, self.bus, symbols)
+        else:
+            self.bot = TradingBot(api_key, api_secret, params, self.bus)
+
+        self.metrics_server = MetricsServer(self.snapshot, port=metrics_port) if metrics_port else None
+        self.metrics_writer = MetricsSnapshotWriter(self.snapshot, metrics_file) if metrics_file else None
+
+    def snapshot(self):
+        return dict(self.bot.metrics.snapshot(), events=self.metrics.snapshot())
+
+    def run(self):
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda *_: self.stop())
+        try:
+            if self.shared_memory:
+                self.bot.run_event_driven(SharedMemoryFeed(self.bot.symbol, self.bot.timeframe))
+            elif self.stream:
+                self.bot.run_event_driven(CcxtProFeed(self.bot.symbol, self.bot.timeframe))
+            else:
+                self.bot.run()
+        finally:
+            if self.metrics_server: self.metrics_server.close()
+            if self.metrics_writer: self.metrics_writer.close()
+            self.file_sink.close()
+
+    def stop(self):
+        if self.bot.is_running:
+            self.bot.stop()
+
+
 # -----------------------------------------------------------------------------
 # 애플리케이션 실행
 # -----------------------------------------------------------------------------
-if __name__ == "__main__":
+def build_arg_parser():
+    import argparse
+    parser = argparse.ArgumentParser(description="Auto Trading Bot (Gate.io)")
+    parser.add_argument('--backtest', metavar='FILE', help="CSV/Parquet OHLCV 파일로 백테스트를 실행합니다.")
+    parser.add_argument('--simulate', metavar='FILE', help="OHLCV 파일을 모의 거래소로 재생하며 실제 봇 루프를 실행합니다.")
+    parser.add_argument('--bench', action='store_true', help="봇 루프/전략 핫패스 벤치마크를 실행합니다.")
+    parser.add_argument('--bench-data', metavar='FILE', help="벤치마크에 쓸 OHLCV 파일 (기본: 합성 데이터)")
+    parser.add_argument('--bench-cycles', type=int, default=2000, help="케이스별 반복 횟수")
+    parser.add_argument('--baseline', default=BENCH_BASELINE_FILE, help="벤치마크 기준 결과 JSON 경로")
+    parser.add_argument('--save-baseline', action='store_true', help="이번 벤치마크 결과를 기준으로 저장합니다.")
+    parser.add_argument('--monte-carlo', type=float, metavar='WIN_RATE',
+                        help="승률 WIN_RATE(0~1)와 --rr-ratio 로 재투자/사이징 정책을 몬테카를로 시뮬레이션합니다.")
+    parser.add_argument('--trades', type=int, default=200, help="몬테카를로 경로당 거래 수")
+    parser.add_argument('--paths', type=int, default=1_000_000, help="몬테카를로 경로 수")
+    parser.add_argument('--cost-r', type=float, default=0.0, help="몬테카를로 거래당 비용 (리스크 배수, 예: 0.05)")
+    parser.add_argument('--seed', type=int, help="몬테카를로 난수 시드")
+    parser.add_argument('--optimize', metavar='FILE', help="CSV/Parquet/.f64 OHLCV 파일로 파라미터 최적화를 실행합니다.")
+    parser.add_argument('--grid', action='append', default=[], metavar='NAME=V1,V2,...',
+                        help="탐색할 파라미터 값 목록 (예: rr_ratio=2,3,5). 여러 번 지정 가능")
+    parser.add_argument('--random', type=int, metavar='N', help="격자 대신 N 개 조합을 무작위로 탐색합니다. 'NAME=LOW:HIGH' 범위 지정 가능")
+    parser.add_argument('--sort-by', default='total_return', help="최적화 결과 정렬 기준 지표")
+    parser.add_argument('--top', type=int, default=10, help="출력할 상위 조합 수")
+    parser.add_argument('--workers', type=int, help="최적화 워커 프로세스 수 (기본: CPU 수)")
+    parser.add_argument('--output', metavar='FILE', help="백테스트 거래 내역(모의 실행은 체결 내역)을 저장할 CSV 경로")
+    parser.add_argument('--fee', type=float, default=0.0, help="백테스트/모의 실행 수수료율 (예: 0.0005)")
+    parser.add_argument('--headless', action='store_true',
+                        help="GUI 없이 실행합니다. API 키는 GATEIO_API_KEY / GATEIO_API_SECRET 환경 변수로 전달합니다.")
+    parser.add_argument('--symbols', help="헤드리스 다중 심볼 스캔 대상 (쉼표 구분)")
+    parser.add_argument('--max-positions', type=int, help="다중 심볼 스캔의 동시 포지션 수 상한 (기본: 심볼마다 하나)")
+    parser.add_argument('--stream', action='store_true', help="헤드리스 단일 심볼을 웹소켓 스트림 모드로 실행합니다.")
+    parser.add_argument('--shm', action='store_true', help="헤드리스 단일 심볼 캔들을 --data-daemon 의 공유 메모리에서 받습니다.")
+    parser.add_argument('--data-daemon', action='store_true',
+                        help="--symbols(또는 --symbol) x --timeframe 캔들을 받아 공유 메모리로 배포하는 데몬을 실행합니다.")
+    parser.add_argument('--daemon-interval', type=float, default=5.0, help="데이터 데몬 갱신 간격(초)")
+    parser.add_argument('--log-file', default=LOG_FILE, help="로그 파일 경로")
+    parser.add_argument('--metrics-port', type=int, help="헤드리스 지표를 http://127.0.0.1:PORT/metrics 로 제공합니다.")
+    parser.add_argument('--metrics-file', help="헤드리스 지표 스냅샷을 주기적으로 저장할 JSON 경로")
+    parser.add_argument('--sync-history', type=float, metavar='DAYS', help="최근 DAYS 일 캔들을 로컬 저장소에 받고 빈 구간을 채웁니다.")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="로컬 캔들 저장소 경로")
+    parser.add_argument('--state-dir', default=DEFAULT_STATE_DIR, help="재시작 복구용 상태 저널 경로")
+    parser.add_argument('--symbol', default='ETC_USDT')
+    parser.add_argument('--timeframe', default='5m')
+    parser.add_argument('--trend-timeframe', default='30m')
+    parser.add_argument('--rr-ratio', type=float, default=10.0)
+    parser.add_argument('--risk-usd', type=float, default=5.0)
+    parser.add_argument('--initial-capital', type=float, default=1000.0)
+    parser.add_argument('--reinvest-pct', type=float, default=50.0)
+    parser.add_argument('--ob-level', type=float, default=0.7)
+    parser.add_argument('--lookback', type=int, default=BREAKOUT_LOOKBACK, help="돌파 기준 고점을 구하는 직전 봉 개수")
+    parser.add_argument('--strategy', choices=['breakout', 'orderblock'], default='breakout')
+    parser.add_argument('--trend-data', metavar='FILE', help="추세 필터용 trend_timeframe OHLCV 파일 (없으면 리샘플링)")
+    parser.add_argument('--data-timeframe', help="백테스트 파일의 타임프레임 (기본: --timeframe 과 같음)")
+    return parser
+
+
+def params_from_args(args):
+    """명령행 인자를 App.start_bot 과 같은 형식의 params 딕셔너리로 바꿉니다."""
+    return {
+        'symbol': args.symbol,
+        'timeframe': args.timeframe,
+        'trend_timeframe': args.trend_timeframe,
+        'rr_ratio': args.rr_ratio,
+        'risk_per_trade_usd': args.risk_usd,
+        'initial_capital': args.initial_capital,
+        'reinvestment_percent': args.reinvest_pct / 100.0,
+        'ob_entry_level': args.ob_level,
+        'lookback': args.lookback,
+        'strategy': args.strategy,
+        'data_dir': args.data_dir,
+        'state_dir': args.state_dir,
+        'max_positions': args.max_positions,
+    }
+
+
+def run_backtest_cli(args):
+    started = time.perf_counter()
+    candles = load_ohlcv_file(args.backtest)
+    trend_candles = load_ohlcv_file(args.trend_data) if args.trend_data else None
+    result = Backtester(params_from_args(args), fee_rate=args.fee).run(candles, trend_candles, args.data_timeframe)
+    elapsed = time.perf_counter() - started
+
+    stats = result.summary()
+    print(f"캔들 {len(candles)}개, 거래 {stats['trades']}회 ({elapsed:.2f}초)")
+    print(f"최종 잔액: ${stats['final_equity']:.2f} (수익률 {stats['total_return']*100:.2f}%)")
+    print(f"승률: {stats['win_rate']*100:.1f}%, 최대 낙폭: {stats['max_drawdown']*100:.2f}%, PF: {stats['profit_factor']:.2f}")
+    print(f"진입 봉 청산: {stats['entry_bar_exits']}회 (봉 내 경로 가정: 양봉 시가-저가-고가-종가, 음봉 시가-고가-저가-종가)")
+    if args.output:
+        result.trades_frame().to_csv(args.output, index=False)
+        print(f"거래 내역 저장: {args.output}")
+
+
+def run_simulate_cli(args):
+    candles = load_ohlcv_file(args.simulate)
+    runner = SimulationRunner(params_from_args(args), candles, args.data_timeframe, fee_rate=args.fee)
+    stats = runner.run()
+    print(f"캔들 {len(candles)}개, 루프 {stats['cycles']}회, 체결 {stats['fills']}건 ({stats['elapsed']:.2f}초, "
+          f"실제 시간 대비 {stats['speedup']:.0f}배)")
+    print(f"최종 잔액: ${stats['final_balance']:.2f} (수수료 ${stats['fees']:.2f})")
+    if args.output:
+        pd.DataFrame(runner.exchange.trades).to_csv(args.output, index=False)
+        print(f"체결 내역 저장: {args.output}")
+
+
+def _parse_value(name, text):
+    """파라미터 name 의 값 text 를 바꿉니다. 표기와 상관없이 OPTIMIZER_INT_PARAMS 는 int, 다른 숫자는 float, 나머지는 문자열입니다."""
+    if name in OPTIMIZER_INT_PARAMS:
+        return int(text)
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def parse_search_space(specs):
+    """'이름=값1,값2' 또는 '이름=하한:상한' 목록을 탐색 공간 딕셔너리로 바꿉니다."""
+    space = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        name = name.strip()
+        if ':' in values and ',' not in values:
+            low, high = values.split(':')
+            space[name] = (_parse_value(name, low.strip()), _parse_value(name, high.strip()))
+        else:
+            space[name] = [_parse_value(name, v.strip()) for v in values.split(',') if v.strip()]
+    return space
+
+
+def run_optimize_cli(args):
+    space = parse_search_space(args.grid)
+    if not space:
+        print("--grid 로 탐색할 파라미터를 하나 이상 지정하세요. (예: --grid rr_ratio=2,3,5)")
+        return
+    optimizer = ParameterOptimizer(params_from_args(args), args.optimize, data_timeframe=args.data_timeframe,
+                                   fee_rate=args.fee, workers=args.workers)
+    if args.random:
+        candidates = ParameterOptimizer.random_samples(space, args.random)
+    else:
+        candidates = ParameterOptimizer.grid(space)
+
+    started = time.perf_counter()
+    results = optimizer.run(candidates)
+    elapsed = time.perf_counter() - started
+    reverse = args.sort_by != 'max_drawdown'
+    results.sort(key=lambda r: r[1].get(args.sort_by, 0), reverse=reverse)
+
+    print(f"{len(results)}개 조합 평가 완료 ({elapsed:.2f}초, 워커 {optimizer.workers}개)")
+    for params, metrics in results[:args.top]:
+        varied = ', '.join(f"{name}={params[name]}" for name in space)
+        print(f"{varied} | 수익률 {metrics['total_return']*100:.2f}%, 최대 낙폭 {metrics['max_drawdown']*100:.2f}%, "
+              f"승률 {metrics['win_rate']*100:.1f}%, 거래 {metrics['trades']}회")
+
+
+def run_bench_cli(args):
+    candles = load_ohlcv_file(args.bench_data) if args.bench_data else None
+    timeframe = args.data_timeframe or args.timeframe
+    results = run_benchmarks(candles, timeframe, cycles=args.bench_cycles)
+    for name, r in results.items():
+        latency = f", p50 {r['p50_ms']:.3f} / p95 {r['p95_ms']:.3f} / p99 {r['p99_ms']:.3f} ms" if 'p50_ms' in r else ''
+        print(f"{name:<36} {r['throughput']:>12.1f} {r['unit']}{latency}, 최대 메모리 {r['peak_kb']:.0f} KB")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+        print(f"기준 결과 저장: {args.baseline}")
+        return
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare_benchmarks(results, json.load(f))
+        for line in regressions:
+            print(f"회귀: {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"기준({args.baseline}) 대비 회귀 없음")
+
+
+def run_monte_carlo_cli(args):
+    if not 0 <= args.monte_carlo <= 1:
+        print("승률은 0~1 사이로 입력해주세요.", file=sys.stderr)
+        sys.exit(1)
+    simulator = MonteCarloSimulator(params_from_args(args), args.monte_carlo, cost_r=args.cost_r)
+    stats = simulator.run(args.paths, args.trades, seed=args.seed).summary()
+    print(f"경로 {stats['paths']}개 × 거래 {args.trades}회 ({stats['elapsed']:.2f}초)")
+    print(f"파산 확률: {stats['ruin_probability']*100:.2f}%, 목표(2배) 도달 확률: {stats['target_probability']*100:.2f}%")
+    print(f"평균 최종 잔액: ${stats['mean_final_equity']:.2f}")
+    for q in MC_PERCENTILES:
+        reach = stats['time_to_target'].get(q)
+        reach = f"{reach:.0f}회" if reach is not None else '-'
+        print(f"  p{q:<3} 최종 잔액 ${stats['final_equity'][q]:>12.2f} | 최대 낙폭 {stats['max_drawdown'][q]*100:6.2f}% | 목표 도달 {reach}")
+
+
+def run_sync_history_cli(args):
+    store = OHLCVStore(args.data_dir)
+    exchange = create_exchange('', '')
+    since = exchange.milliseconds() - int(args.sync_history * 86400 * 1000)
+    added = store.backfill(exchange, args.symbol, args.timeframe, since=since)
+    filled = store.fill_gaps(exchange, args.symbol, args.timeframe)
+    total = len(store.read(args.symbol, args.timeframe))
+    print(f"{args.symbol} {args.timeframe}: 새 캔들 {added}개, 빈 구간 {filled}개 채움, 총 {total}개")
+    print(f"저장 위치: {store.path(args.symbol, args.timeframe)}")
+
+
+def run_data_daemon_cli(args):
+    symbols = [s.strip() for s in args.symbols.split(',') if s.strip()] if args.symbols else [args.symbol]
+    daemon = MarketDataDaemon(create_exchange('', ''), [(symbol, args.timeframe) for symbol in symbols],
+                              interval=args.daemon_interval)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: daemon.stop())
+    print(f"{len(daemon.rings)}개 시세를 공유 메모리로 배포합니다: {', '.join(r.name for r in daemon.rings.values())}")
+    try:
+        daemon.run()
+    finally:
+        daemon.close()
+
+
+def run_headless_cli(args):
+    api_key = os.environ.get('GATEIO_API_KEY')
+    api_secret = os.environ.get('GATEIO_API_SECRET')
+    if not api_key or not api_secret:
+        print("GATEIO_API_KEY 와 GATEIO_API_SECRET 환경 변수를 설정해주세요.", file=sys.stderr)
+        sys.exit(1)
+    symbols = [s.strip() for s in args.symbols.split(',') if s.strip()] if args.symbols else None
+    runner = HeadlessRunner(api_key, api_secret, params_from_args(args), symbols=symbols,
+                            stream=args.stream, log_path=args.log_file,
+                            metrics_port=args.metrics_port, metrics_file=args.metrics_file, shared_memory=args.shm)
+    runner.run()
+
+
+def main():
+    args = build_arg_parser().parse_args()
+    if args.sync_history:
+        run_sync_history_cli(args)
+        return
+    if args.backtest:
+        run_backtest_cli(args)
+        return
+    if args.simulate:
+        run_simulate_cli(args)
+        return
+    if args.bench:
+        run_bench_cli(args)
+        return
+    if args.monte_carlo is not None:
+        run_monte_carlo_cli(args)
+        return
+    if args.optimize:
+        run_optimize_cli(args)
+        return
+    if args.data_daemon:
+        run_data_daemon_cli(args)
+        return
+    if args.headless:
+        run_headless_cli(args)
+        return
+    _load_gui()
     root = tk.Tk()
     app = App(root)
     root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
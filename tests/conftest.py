@@ -0,0 +1,40 @@
+import pytest
+
+import luvbug
+
+
+@pytest.fixture
+def candles():
+    return luvbug.synthetic_candles(2000, seed=1)
+
+
+@pytest.fixture
+def make_bot(tmp_path, candles):
+    """SimulatedExchange 에 붙은 TradingBot 을 만듭니다. state_dir 는 테스트마다 새 임시 폴더입니다."""
+
+    def make(exchange=None, symbol='ETC_USDT', **params):
+        if exchange is None:
+            exchange = luvbug.SimulatedExchange({symbol: candles}, '5m', balance=1000.0, leverage=100,
+                                                start_time=int(candles[400, luvbug.TS]))
+        bot_params = dict(luvbug.BENCH_PARAMS, symbol=symbol, timeframe='5m', state_dir=str(tmp_path / 'state'))
+        bot_params.update(params)
+        return luvbug.TradingBot('', '', bot_params, luvbug.EventBus(), exchange=exchange,
+                                 account_cache=luvbug.SnapshotCache(clock=exchange.seconds))
+
+    return make
+
+
+def open_setup(exchange, symbol='ETC_USDT'):
+    price = exchange.fetch_ticker(symbol)['last']
+    return {'side': 'buy', 'entry_price': price, 'sl_price': price * 0.99, 'tp_price': price * 1.05, 'amount': 5.0}
+
+
+@pytest.fixture
+def setup_for():
+    return open_setup
+
+
+@pytest.fixture(autouse=True)
+def _no_retry_sleep(monkeypatch):
+    monkeypatch.setattr(luvbug, 'ORDER_RETRY_DELAY', 0.0)
+    monkeypatch.setattr(luvbug, 'FILL_POLL_INTERVAL', 0.0)
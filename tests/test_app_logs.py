@@ -0,0 +1,92 @@
+from queue import Queue
+
+import pytest
+
+import luvbug
+
+pytest.importorskip('tkinter')
+
+
+class FakeText:
+    """add_logs 가 쓰는 tkinter Text 기능만 흉내 냅니다 (줄 단위)."""
+
+    def __init__(self):
+        self.lines = []
+        self.inserts = 0
+
+    def configure(self, **kwargs):
+        pass
+
+    def insert(self, index, text):
+        self.inserts += 1
+        self.lines.extend(text.splitlines())
+
+    def index(self, index):
+        return f"{len(self.lines) + 1}.0"       # Text 는 항상 빈 마지막 줄을 가집니다.
+
+    def delete(self, start, end):
+        del self.lines[:int(end.split('.')[0]) - 1]
+
+    def see(self, index):
+        pass
+
+
+class FakeRoot:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback):
+        self.scheduled.append(ms)
+
+
+class FakeLabel:
+    def config(self, text):
+        self.text = text
+
+
+class FakeVar:
+    def get(self):
+        return False
+
+
+class NullLogger:
+    def info(self, message):
+        pass
+
+
+@pytest.fixture
+def app():
+    luvbug._load_gui()
+    app = object.__new__(luvbug.App)
+    app.msg_queue = Queue()
+    app.log_text = FakeText()
+    app.root = FakeRoot()
+    app.balance_label = FakeLabel()
+    app.alarm_on = FakeVar()
+    app.file_logger = NullLogger()
+    return app
+
+
+def test_process_queue_batches_one_insert_per_tick(app):
+    for i in range(10):
+        app.msg_queue.put(luvbug.LogEvent(f"msg {i}"))
+    app.msg_queue.put(luvbug.BalanceEvent(42.0))
+    app.process_queue()
+    assert app.log_text.inserts == 1
+    assert app.log_text.lines[-1].endswith('msg 9')
+    assert app.balance_label.text == '잔액: 42.00 USDT'
+    assert app.root.scheduled == [100]
+
+
+def test_backlog_is_bounded_per_tick_and_on_screen(app):
+    total = luvbug.LOG_MAX_PER_TICK * 3 + 5
+    for i in range(total):
+        app.msg_queue.put(luvbug.LogEvent(f"msg {i}"))
+    ticks = 0
+    while not app.msg_queue.empty():
+        app.process_queue()
+        ticks += 1
+    assert ticks == 4
+    assert app.root.scheduled == [10, 10, 10, 100]
+    assert len(app.log_text.lines) == luvbug.LOG_MAX_LINES
+    assert app.log_text.lines[-1].endswith(f"msg {total - 1}")
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+import luvbug
+
+TF_MS = 300_000
+PARAMS = dict(luvbug.BENCH_PARAMS, rr_ratio=10.0, lookback=5)
+
+
+def bars(*ohlc, flat=6):
+    """가격 100 근처 횡보 flat 봉 뒤에 주어진 (시가, 고가, 저가, 종가) 봉을 잇습니다."""
+    rows = [(100.0, 101.0, 99.0, 100.0)] * flat + list(ohlc)
+    return np.array([(i * TF_MS, o, h, l, c, 1.0) for i, (o, h, l, c) in enumerate(rows)])
+
+
+def run(candles):
+    return luvbug.Backtester(PARAMS).run(candles).trades
+
+
+def test_stop_after_entry_on_the_signal_bar():
+    # 음봉: 시가 -> 고가(101 돌파 진입) -> 저가(손절가 100.495 아래) -> 종가
+    trades = run(bars((100.8, 102.0, 100.0, 100.2), (100.2, 100.5, 99.0, 99.5)))
+    assert len(trades) == 1
+    assert trades[0]['entry_time'] == trades[0]['exit_time'] == 6 * TF_MS
+    assert trades[0]['exit_price'] == pytest.approx(101.0 * luvbug.SL_BUFFER_RATIO)
+
+
+def test_low_before_the_breakout_does_not_stop_out():
+    # 양봉: 시가 -> 저가 -> 고가(진입) -> 종가. 저가는 진입 전이므로 다음 봉에서 손절됩니다.
+    trades = run(bars((100.2, 102.0, 100.0, 101.8), (101.8, 101.9, 100.0, 100.1)))
+    assert len(trades) == 1
+    assert trades[0]['exit_time'] == 7 * TF_MS
+
+
+def test_take_profit_on_the_signal_bar():
+    trades = run(bars((100.2, 107.0, 100.0, 106.5)))
+    assert len(trades) == 1 and trades[0]['exit_time'] == 6 * TF_MS
+    assert trades[0]['exit_price'] == pytest.approx(trades[0]['tp_price'])
+    assert luvbug.Backtester(PARAMS).run(bars((100.2, 107.0, 100.0, 106.5))).summary()['entry_bar_exits'] == 1
+
+
+def test_sl_wins_when_a_later_bar_touches_both():
+    trades = run(bars((100.2, 102.0, 100.6, 101.8), (101.8, 110.0, 99.0, 105.0)))
+    assert trades[0]['exit_price'] == pytest.approx(trades[0]['sl_price'])
+
+
+def test_breakout_signals_match_a_direct_loop(candles):
+    hwm, signal = luvbug.breakout_signals(candles, 30)
+    for i in range(30, 500):
+        expected = candles[i - 30:i, luvbug.HIGH].max()
+        assert hwm[i] == expected and signal[i] == (candles[i, luvbug.HIGH] > expected)
+    assert np.isnan(hwm[:30]).all() and not signal[:30].any()
+
+
+def test_pnl_follows_sizing_and_reinvestment():
+    candles = luvbug.synthetic_candles(5000, seed=2)
+    params = dict(luvbug.BENCH_PARAMS, strategy='orderblock', initial_capital=10.0, risk_per_trade_usd=1.0)
+    result = luvbug.Backtester(params).run(candles)
+    assert any(t['reinvestment'] for t in result.trades)
+
+    balance, last_profit, wins, target = 10.0, 0.0, 0, False
+    for t in result.trades:
+        target = target or balance >= 20.0
+        risk, reinvest = luvbug.select_risk_amount(1.0, 0.5, target, last_profit, wins)
+        assert (t['risk_usd'], t['reinvestment']) == (pytest.approx(risk), reinvest)
+        balance += t['pnl']
+        last_profit, wins = (t['pnl'], wins + 1 if reinvest else 0) if t['pnl'] > 0 else (0.0, 0)
+    assert balance == pytest.approx(result.summary()['final_equity'])
@@ -0,0 +1,22 @@
+import luvbug
+
+
+def test_small_suite_reports_every_case():
+    results = luvbug.run_benchmarks(cycles=40, symbols=(1, 2), histories=(600,))
+    assert set(results) == {'check_for_entry.breakout', 'check_for_entry.orderblock', 'calculate_position_size',
+                            'bot_cycle.symbols_1', 'bot_cycle.symbols_2',
+                            'backtest.breakout.bars_600', 'backtest.orderblock.bars_600'}
+    for metrics in results.values():
+        assert metrics['throughput'] > 0 and metrics['peak_kb'] > 0
+    assert luvbug.compare_benchmarks(results, results) == []
+
+
+def test_regressions_are_reported_beyond_the_tolerance():
+    base = {'case': {'throughput': 1000.0, 'unit': 'calls/s', 'p95_ms': 1.0, 'peak_kb': 1000.0}}
+    within = {'case': {'throughput': 1000.0 * (1 - luvbug.BENCH_TOLERANCE / 2), 'unit': 'calls/s',
+                       'p95_ms': 1.0, 'peak_kb': 1050.0}}
+    worse = {'case': {'throughput': 500.0, 'unit': 'calls/s', 'p95_ms': 3.0, 'peak_kb': 5000.0},
+             'new_case': {'throughput': 1.0, 'unit': 'calls/s', 'peak_kb': 1.0}}
+    assert luvbug.compare_benchmarks(within, base) == []
+    regressions = luvbug.compare_benchmarks(worse, base)
+    assert len(regressions) == 3 and all(r.startswith('case:') for r in regressions)
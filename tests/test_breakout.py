@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import luvbug
+
+
+@pytest.mark.parametrize('mode', ['max', 'min'])
+def test_rolling_extremum_matches_a_window_scan(mode):
+    values = np.random.default_rng(3).normal(size=500)
+    rolling = luvbug.RollingExtremum(7, mode)
+    pick = max if mode == 'max' else min
+    for i, value in enumerate(values):
+        rolling.push(value)
+        assert rolling.ready == (i >= 6)
+        assert rolling.value == pick(values[max(0, i - 6):i + 1])
+
+
+@pytest.mark.parametrize('lookback', [1, 5, 30])
+def test_streaming_detector_matches_breakout_signals(candles, lookback):
+    hwm, signal = luvbug.breakout_signals(candles, lookback)
+    detector = luvbug.BreakoutDetector(lookback)
+    for i, row in enumerate(candles):
+        if np.isnan(hwm[i]):
+            assert detector.high_water_mark is None
+        else:
+            assert detector.high_water_mark == hwm[i]
+            assert (detector.check(row[luvbug.HIGH], row[luvbug.LOW]) > 0) == signal[i]
+        detector.update(row)
+
+
+def test_sync_skips_seen_bars_and_reads_only_the_window(candles):
+    detector = luvbug.BreakoutDetector(10)
+    detector.sync(candles[:300])
+    assert detector.highs.count == 10
+    detector.sync(candles[:305])
+    assert detector.highs.count == 15
+    assert detector.high_water_mark == candles[295:305, luvbug.HIGH].max()
+
+
+def test_cache_rebuilds_the_detector_when_a_closed_bar_is_revised(candles):
+    exchange = luvbug.SimulatedExchange({'ETC_USDT': candles}, '5m', start_time=int(candles[400, luvbug.TS]))
+    cache = luvbug.OHLCVCache(exchange, capacity=300)
+    buf = cache.buffer('ETC_USDT', '5m')
+    buf.merge(candles[300:400])
+    detector = cache.breakout('ETC_USDT', '5m', 20)
+    assert detector.high_water_mark == candles[379:399, luvbug.HIGH].max()
+
+    revised = candles[390].copy()
+    revised[luvbug.HIGH] = 1e6
+    buf.merge(revised[None, :])
+    detector = cache.breakout('ETC_USDT', '5m', 20)
+    assert detector.high_water_mark == 1e6
@@ -0,0 +1,68 @@
+import numpy as np
+
+import luvbug
+
+
+def test_exchange_candle_replaces_trade_built_bar(candles):
+    buf = luvbug.CandleBuffer(capacity=50)
+    buf.merge(candles[:10])
+    tf_ms = int(candles[1, luvbug.TS] - candles[0, luvbug.TS])
+    for row in candles[10:12]:
+        # 체결만으로 두 봉을 만들고 나면 10번째 봉은 확정 봉과 다릅니다.
+        buf.apply_trade(row[luvbug.CLOSE] + 5, int(row[luvbug.TS]), tf_ms, 1.0)
+    assert not np.array_equal(buf.view()[-2], candles[10])
+
+    buf.merge(candles[10:12])
+    assert buf.revision == 1
+    np.testing.assert_array_equal(buf.view()[-2:], candles[10:12])
+
+    buf.merge(candles[5:6])
+    assert buf.revision == 1        # 같은 값이면 고쳐 쓰지 않습니다.
+
+
+def test_last_price_follows_the_newest_bar(candles):
+    buf = luvbug.CandleBuffer(capacity=50)
+    assert buf.last_price is None
+    buf.merge(candles[:10])
+    tf_ms = int(candles[1, luvbug.TS] - candles[0, luvbug.TS])
+    tick = float(candles[10, luvbug.CLOSE]) + 3
+    buf.apply_trade(tick, int(candles[10, luvbug.TS]) + 1000, tf_ms)
+    assert buf.last_price == tick
+
+    buf.merge(candles[9:10] + [0, 0, 1, 0, 1, 0])      # 이전 봉 수정은 현재가를 바꾸지 않습니다.
+    assert buf.last_price == tick
+    buf.merge(candles[10:11])                          # 최신 봉을 덮어쓰면 그 종가가 현재가입니다.
+    assert buf.last_price == candles[10, luvbug.CLOSE]
+
+
+class ScriptedFeed(luvbug.MarketDataFeed):
+    def __init__(self, symbol, timeframe, warmup, events):
+        super().__init__(symbol, timeframe)
+        self.warmup = warmup
+        self.events = events
+
+    def snapshot(self):
+        return self.warmup
+
+    def _run(self):
+        for event in self.events:
+            self._emit(event)
+        self._emit(luvbug.MarketEvent('end', self.symbol, self.timeframe))
+
+
+def test_event_loop_prices_entries_from_the_newest_bar(make_bot, candles, monkeypatch):
+    bot = make_bot()
+    tick = float(candles[301, luvbug.CLOSE]) + 2
+    revised = candles[300].copy()
+    revised[luvbug.CLOSE] += 1
+    events = [
+        luvbug.MarketEvent('trade', 'ETC_USDT', '5m', price=tick, amount=1.0, timestamp=int(candles[301, luvbug.TS])),
+        luvbug.MarketEvent('candle', 'ETC_USDT', '5m', candle=revised, price=revised[luvbug.CLOSE],
+                           timestamp=int(revised[luvbug.TS])),
+    ]
+    prices = []
+    monkeypatch.setattr(bot, 'try_entry', lambda refresh=True, last_price=None: prices.append(last_price))
+    bot.run_event_driven(ScriptedFeed('ETC_USDT', '5m', candles[:301], events), position_interval=60)
+
+    assert prices == [tick, tick]
+    assert bot.candle_cache.buffer('ETC_USDT', '5m').view()[-2, luvbug.CLOSE] == revised[luvbug.CLOSE]
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import luvbug
+
+
+@pytest.mark.parametrize('factor, first_index', [(1, 0), (4, 0), (4, 6), (7, 13)])
+def test_decimation_matches_a_bucket_loop(candles, factor, first_index):
+    rows = candles[:101]
+    buckets, opens, highs, lows, closes = luvbug.decimate_candles(rows, factor, first_index)
+    groups = {}
+    for i, row in enumerate(rows):
+        groups.setdefault((first_index + i) // factor, []).append(row)
+    assert list(buckets) == sorted(groups)
+    for k, bucket in enumerate(buckets):
+        group = np.array(groups[bucket])
+        assert (opens[k], highs[k], lows[k], closes[k]) == (
+            group[0, luvbug.OPEN], group[:, luvbug.HIGH].max(), group[:, luvbug.LOW].min(), group[-1, luvbug.CLOSE])
+
+
+def test_appending_bars_keeps_earlier_buckets(candles):
+    before = luvbug.decimate_candles(candles[:50], 8, 3)
+    after = luvbug.decimate_candles(candles[:70], 8, 3)
+    full = len(before[0]) - 1       # 마지막 묶음만 아직 채워지는 중입니다.
+    for old, new in zip(before, after):
+        np.testing.assert_array_equal(old[:full], new[:full])
+
+
+def test_history_merge_reports_the_first_changed_bar(candles):
+    history = luvbug.ChartHistory(max_bars=100)
+    assert history.merge(candles[:60]) == 0
+    assert history.merge(candles[:60]) is None
+    revised = candles[59].copy()
+    revised[luvbug.CLOSE] += 1
+    assert history.merge(np.vstack([revised, candles[60:65]])) == 59
+    assert history.end == 65
+
+
+def test_history_trims_to_capacity_without_moving_absolute_indexes(candles):
+    history = luvbug.ChartHistory(max_bars=100)
+    for start in range(0, 510, 30):
+        history.merge(candles[start:start + 30])
+    assert history.end == 510 and 100 <= len(history) <= 200
+    np.testing.assert_array_equal(history.view(), candles[history.base:510])
+    assert history.merge(candles[1000:1500]) == 910 and len(history) == 100
+    assert history.end == 1010
+    np.testing.assert_array_equal(history.view(), candles[1400:1500])
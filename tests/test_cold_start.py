@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+
+import luvbug
+
+
+class FakeExchange:
+    def __init__(self):
+        self.loads = 0
+        self.markets = self.currencies = None
+
+    def load_markets(self):
+        self.loads += 1
+        self.markets = {'ETC/USDT:USDT': {'id': 'ETC_USDT', 'contractSize': 10}}
+        self.currencies = {'USDT': {'id': 'USDT'}}
+
+    def set_markets(self, markets, currencies=None):
+        self.markets, self.currencies = markets, currencies
+
+
+def test_markets_are_fetched_once_then_served_from_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(luvbug, '_markets_memo', {})
+    path = str(tmp_path / 'markets.json')
+    first = FakeExchange()
+    assert luvbug.load_cached_markets(first, path) is False and first.loads == 1
+
+    second = FakeExchange()
+    assert luvbug.load_cached_markets(second, path) is True
+    assert second.loads == 0 and second.markets == first.markets
+
+    # 새 프로세스처럼 메모리 캐시가 비어도 디스크 캐시를 씁니다.
+    monkeypatch.setattr(luvbug, '_markets_memo', {})
+    third = FakeExchange()
+    assert luvbug.load_cached_markets(third, path) is True and third.currencies == first.currencies
+
+
+def test_stale_cache_is_refreshed(tmp_path, monkeypatch):
+    monkeypatch.setattr(luvbug, '_markets_memo', {})
+    path = tmp_path / 'markets.json'
+    path.write_text(json.dumps({'saved': 0, 'markets': {}, 'currencies': {}}), encoding='utf-8')
+    exchange = FakeExchange()
+    assert luvbug.load_cached_markets(exchange, str(path)) is False and exchange.loads == 1
+    assert json.loads(path.read_text(encoding='utf-8'))['markets'] == exchange.markets
+
+
+def test_import_does_not_load_heavy_modules():
+    code = "import sys, luvbug; print(sorted(m for m in ('ccxt', 'pandas', 'tkinter') if m in sys.modules))"
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    out = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True, timeout=60)
+    assert out.stdout.strip() == '[]'
@@ -0,0 +1,38 @@
+import luvbug
+
+
+def test_subscribers_get_only_their_event_types():
+    bus = luvbug.EventBus()
+    logs, everything = [], []
+    bus.subscribe(logs.append, luvbug.LogEvent)
+    bus.subscribe(everything.append)
+    bus.publish(luvbug.LogEvent('hello'))
+    bus.publish(luvbug.BalanceEvent(12.5))
+    assert [e.message for e in logs] == ['hello']
+    assert [type(e) for e in everything] == [luvbug.LogEvent, luvbug.BalanceEvent]
+
+
+def test_late_subscriber_and_failing_subscriber():
+    bus = luvbug.EventBus()
+    bus.publish(luvbug.AlarmEvent())        # 구독 전 발행으로 디스패치 표가 만들어집니다.
+    bus.subscribe(lambda event: 1 / 0, luvbug.AlarmEvent)
+    alarms = []
+    bus.subscribe(alarms.append, luvbug.AlarmEvent)
+    bus.publish(luvbug.AlarmEvent())
+    assert len(alarms) == 1
+
+
+def test_bot_logs_and_balance_reach_the_sinks(make_bot, tmp_path):
+    bot = make_bot()
+    sink = luvbug.MetricsSink()
+    file_sink = luvbug.FileLogSink(str(tmp_path / 'bot.log'))
+    bot.bus.subscribe(sink)
+    bot.bus.subscribe(file_sink, luvbug.LogEvent)
+    bot.bus.subscribe(file_sink, luvbug.BalanceEvent)
+    bot.log('테스트 메시지')
+    bot.update_balance_display()
+    file_sink.close()
+
+    assert sink.snapshot() == {'events': {'LogEvent': 1, 'BalanceEvent': 1}, 'balance': 1000.0}
+    lines = (tmp_path / 'bot.log').read_text(encoding='utf-8').splitlines()
+    assert lines[0].endswith('테스트 메시지') and lines[1].endswith('잔액: 1000.00 USDT')
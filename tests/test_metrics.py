@@ -0,0 +1,66 @@
+import json
+import urllib.request
+
+import ccxt
+import pytest
+
+import luvbug
+
+
+def test_histogram_percentiles_use_bucket_bounds():
+    hist = luvbug.LatencyHistogram()
+    for ms in [0.5] * 50 + [15] * 40 + [700] * 9 + [20000]:
+        hist.observe(ms)
+    snap = hist.snapshot()
+    assert snap['count'] == 100 and snap['max_ms'] == 20000
+    assert (snap['p50_ms'], snap['p90_ms'], snap['p99_ms']) == (1, 20, 1000)
+    assert hist.percentile(1.0) == 20000
+    assert snap['buckets']['le_inf'] == 1 and sum(snap['buckets'].values()) == 100
+
+
+class FailingExchange:
+    rateLimit = 100
+
+    def fetch_ticker(self, symbol):
+        return {'symbol': symbol, 'last': 1.0}
+
+    def create_order(self, *args, **kwargs):
+        raise ccxt.InsufficientFunds('no margin')
+
+    def parse_timeframe(self, timeframe):
+        return 60
+
+
+def test_instrumented_exchange_counts_calls_and_errors():
+    metrics = luvbug.MetricsRegistry()
+    exchange = luvbug.InstrumentedExchange(FailingExchange(), metrics)
+    assert metrics.rate_limit_per_sec == 10
+
+    exchange.fetch_ticker('ETC_USDT')
+    exchange.fetch_ticker('ETC_USDT')
+    with pytest.raises(ccxt.InsufficientFunds):
+        exchange.create_order('ETC_USDT', 'market', 'buy', 1)
+    assert exchange.parse_timeframe('1m') == 60     # REST 호출이 아니면 계측하지 않습니다.
+
+    snap = metrics.snapshot()
+    assert snap['counters'] == {'exchange.fetch_ticker.calls': 2, 'exchange.create_order.calls': 1,
+                                'exchange.create_order.errors': 1}
+    assert snap['latency']['exchange.create_order']['count'] == 1
+    assert snap['rate']['requests_per_sec'] == pytest.approx(3 / luvbug.RATE_WINDOW_SECONDS)
+
+
+def test_cycle_phases_reach_the_snapshot_and_http_endpoint():
+    metrics = luvbug.MetricsRegistry()
+    phases = {}
+    with metrics.timer('cycle.total', phases):
+        pass
+    metrics.record_cycle('ETC_USDT', phases)
+    server = luvbug.MetricsServer(metrics.snapshot, port=0)
+    try:
+        port = server.httpd.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            body = json.loads(response.read())
+    finally:
+        server.close()
+    assert set(body['cycles']['ETC_USDT']) == {'cycle.total'}
+    assert body['latency']['cycle.total']['count'] == 1
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+import luvbug
+
+PARAMS = {'rr_ratio': 2.0, 'risk_per_trade_usd': 1.0, 'reinvestment_percent': 0.5, 'initial_capital': 10.0}
+
+
+def scalar_paths(params, win_rate, cost_r, paths, trades, seed):
+    """select_risk_amount 와 sync_position 규칙을 경로마다 그대로 따라가는 기준 구현."""
+    rng = np.random.default_rng(seed)
+    draws = [rng.random(paths, dtype=np.float32) for _ in range(trades)]
+    goal = params['initial_capital'] * 2
+    finals, reinvested = [], 0
+    for p in range(paths):
+        balance = params['initial_capital']
+        last_profit, wins, target = 0.0, 0, balance >= goal
+        for t in range(trades):
+            if balance <= 0:
+                break
+            risk, is_reinvestment = luvbug.select_risk_amount(params['risk_per_trade_usd'], params['reinvestment_percent'],
+                                                              target, last_profit, wins)
+            reinvested += is_reinvestment
+            pnl = risk * (params['rr_ratio'] - cost_r) if draws[t][p] < win_rate else -risk * (1 + cost_r)
+            balance += pnl
+            if pnl > 0:
+                last_profit = pnl
+                wins = wins + 1 if is_reinvestment else 0
+            else:
+                last_profit, wins = 0.0, 0
+            target = target or balance >= goal
+        finals.append(balance)
+    return np.array(finals), reinvested
+
+
+@pytest.mark.parametrize('win_rate, cost_r', [(0.6, 0.0), (0.45, 0.1)])
+def test_vectorised_paths_follow_select_risk_amount(win_rate, cost_r):
+    result = luvbug.MonteCarloSimulator(PARAMS, win_rate, cost_r).run(paths=16, trades=300, seed=7)
+    expected, reinvested = scalar_paths(PARAMS, win_rate, cost_r, paths=16, trades=300, seed=7)
+    assert reinvested > 0
+    np.testing.assert_allclose(result.final_equity, expected, rtol=1e-9, atol=1e-9)
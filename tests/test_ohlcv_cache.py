@@ -0,0 +1,54 @@
+import numpy as np
+
+import luvbug
+
+
+class CountingExchange(luvbug.SimulatedExchange):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ohlcv_calls = []
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        self.ohlcv_calls.append((since, limit))
+        return super().fetch_ohlcv(symbol, timeframe, since=since, limit=limit, params=params)
+
+
+def make_exchange(candles):
+    return CountingExchange({'ETC_USDT': candles}, '5m', start_time=int(candles[400, luvbug.TS]))
+
+
+def test_incremental_updates_match_a_full_fetch(candles):
+    exchange = make_exchange(candles)
+    cache = luvbug.OHLCVCache(exchange, capacity=300)
+    for step in range(200):
+        exchange.advance(7)
+        view = cache.update('ETC_USDT', '5m', limit=100).view(100)
+        np.testing.assert_array_equal(view, np.asarray(exchange.fetch_ohlcv('ETC_USDT', '5m', limit=100)))
+        exchange.ohlcv_calls.pop()
+
+    first, *rest = exchange.ohlcv_calls
+    assert first == (None, 100)
+    # 이후에는 마지막(미완성) 봉부터 새로 생긴 봉만 받습니다.
+    assert all(since is not None and limit <= 4 for since, limit in rest)
+
+
+def test_long_gap_refetches_the_window(candles):
+    exchange = make_exchange(candles)
+    cache = luvbug.OHLCVCache(exchange, capacity=300)
+    cache.update('ETC_USDT', '5m', limit=50)
+    exchange.advance(luvbug.SIM_TICKS_PER_BAR * 80)
+    buf = cache.update('ETC_USDT', '5m', limit=50)
+
+    assert exchange.ohlcv_calls[-1] == (None, 50)
+    assert len(buf) == 50
+    np.testing.assert_array_equal(buf.view(), np.asarray(exchange.fetch_ohlcv('ETC_USDT', '5m', limit=50)))
+
+
+def test_view_is_contiguous_across_wraparound(candles):
+    buf = luvbug.CandleBuffer(capacity=16)
+    for row in candles[:40]:
+        buf.append(row)
+    view = buf.view(16)
+    assert view.flags['C_CONTIGUOUS'] and len(buf) == 16
+    np.testing.assert_array_equal(view, candles[24:40])
+    np.testing.assert_array_equal(buf.view(5), candles[35:40])
@@ -0,0 +1,67 @@
+import numpy as np
+
+import luvbug
+
+TF_MS = luvbug.timeframe_to_ms('5m')
+
+
+def make_exchange(candles, at=1000):
+    return luvbug.SimulatedExchange({'ETC_USDT': candles}, '5m', start_time=int(candles[at, luvbug.TS]))
+
+
+def test_find_gaps_reports_missing_ranges(tmp_path, candles):
+    store = luvbug.OHLCVStore(str(tmp_path))
+    holes = np.r_[10:13, 40:41, 100:150]
+    assert store.append('ETC_USDT', '5m', np.delete(candles[:200], holes, axis=0)) == 200 - len(holes)
+
+    ts = candles[:, luvbug.TS].astype(int)
+    assert store.find_gaps('ETC_USDT', '5m') == [(ts[10], ts[12]), (ts[40], ts[40]), (ts[100], ts[149])]
+
+
+def test_fill_gaps_restores_the_full_series(tmp_path, candles):
+    store = luvbug.OHLCVStore(str(tmp_path))
+    holes = np.r_[10:13, 40:41, 100:150, 400:1200]
+    store.append('ETC_USDT', '5m', np.delete(candles[:1300], holes, axis=0))
+    exchange = make_exchange(candles, at=1500)
+
+    assert store.fill_gaps(exchange, 'ETC_USDT', '5m', page_limit=300) == len(holes)
+    assert store.find_gaps('ETC_USDT', '5m') == []
+    np.testing.assert_array_equal(store.read('ETC_USDT', '5m'), candles[:1300])
+    assert not (tmp_path / 'ETC_USDT_5m.f64.tmp').exists()
+
+
+def test_append_keeps_order_and_skips_stored_bars(tmp_path, candles):
+    store = luvbug.OHLCVStore(str(tmp_path))
+    store.append('ETC_USDT', '5m', candles[:50])
+    assert store.append('ETC_USDT', '5m', candles[40:60]) == 10
+    assert store.append('ETC_USDT', '5m', candles[:60]) == 0
+    np.testing.assert_array_equal(store.read('ETC_USDT', '5m'), candles[:60])
+
+
+def test_torn_tail_is_truncated(tmp_path, candles):
+    store = luvbug.OHLCVStore(str(tmp_path))
+    store.append('ETC_USDT', '5m', candles[:20])
+    with open(store.path('ETC_USDT', '5m'), 'ab') as f:
+        f.write(b'\0' * 13)
+    assert store.last_timestamp('ETC_USDT', '5m') == int(candles[19, luvbug.TS])
+    store.append('ETC_USDT', '5m', candles[20:25])
+    np.testing.assert_array_equal(store.read('ETC_USDT', '5m'), candles[:25])
+
+
+def test_backfill_stores_only_closed_bars(tmp_path, candles):
+    store = luvbug.OHLCVStore(str(tmp_path))
+    exchange = make_exchange(candles, at=900)
+    exchange.advance(2)     # 900번째 봉은 아직 미완성입니다.
+    since = int(candles[100, luvbug.TS])
+    assert store.backfill(exchange, 'ETC_USDT', '5m', since=since, page_limit=128) == 800
+    np.testing.assert_array_equal(store.read('ETC_USDT', '5m'), candles[100:900])
+    assert store.backfill(exchange, 'ETC_USDT', '5m') == 0
+
+
+def test_cache_reads_through_the_store(tmp_path, candles):
+    store = luvbug.OHLCVStore(str(tmp_path))
+    store.append('ETC_USDT', '5m', candles[:800])
+    exchange = make_exchange(candles, at=1000)
+    buf = luvbug.OHLCVCache(exchange, capacity=300, store=store).update('ETC_USDT', '5m', limit=100)
+    np.testing.assert_array_equal(buf.view()[:-1], candles[701:1000])
+    np.testing.assert_array_equal(store.read('ETC_USDT', '5m'), candles[:1000])
@@ -0,0 +1,44 @@
+import luvbug
+from luvbug import ParameterOptimizer, parse_search_space
+
+
+def test_types_come_from_the_parameter_not_the_literal():
+    space = parse_search_space(['rr_ratio=1:5', 'ob_entry_level=0:1', 'lookback=10:40',
+                                'risk_per_trade_usd=1,2', 'strategy=breakout,orderblock'])
+    assert space['rr_ratio'] == (1.0, 5.0) and isinstance(space['rr_ratio'][0], float)
+    assert space['ob_entry_level'] == (0.0, 1.0)
+    assert space['lookback'] == (10, 40) and isinstance(space['lookback'][0], int)
+    assert space['risk_per_trade_usd'] == [1.0, 2.0] and all(isinstance(v, float) for v in space['risk_per_trade_usd'])
+    assert space['strategy'] == ['breakout', 'orderblock']
+
+
+def test_random_float_ranges_are_not_collapsed_to_integers():
+    space = parse_search_space(['rr_ratio=1:5', 'ob_entry_level=0:1', 'lookback=10:40'])
+    samples = ParameterOptimizer.random_samples(space, 200, seed=7)
+    rr = [s['rr_ratio'] for s in samples]
+    levels = [s['ob_entry_level'] for s in samples]
+    assert all(1 <= v <= 5 for v in rr) and len({round(v, 3) for v in rr}) > 100
+    assert all(0 <= v <= 1 for v in levels) and any(0 < v < 1 for v in levels)
+    assert all(isinstance(s['lookback'], int) and 10 <= s['lookback'] <= 40 for s in samples)
+    assert ParameterOptimizer.random_samples(space, 5, seed=7) == samples[:5]
+
+
+def test_grid_is_the_full_product():
+    combos = ParameterOptimizer.grid(parse_search_space(['rr_ratio=2,3', 'lookback=20,30,40']))
+    assert len(combos) == 6
+    assert {(c['rr_ratio'], c['lookback']) for c in combos} == {(r, k) for r in (2.0, 3.0) for k in (20, 30, 40)}
+
+
+def test_results_match_a_direct_backtest_and_are_cached(tmp_path):
+    candles = luvbug.synthetic_candles(3000, seed=4)
+    path = str(tmp_path / 'data.f64')
+    candles.tofile(path)
+    optimizer = ParameterOptimizer(luvbug.BENCH_PARAMS, path, workers=1)
+    candidates = ParameterOptimizer.grid(parse_search_space(['rr_ratio=2,3', 'lookback=20,30']))
+    results = optimizer.run(candidates)
+    for params, metrics in results:
+        assert metrics == luvbug.Backtester(params).run(candles).summary()
+
+    reloaded = ParameterOptimizer(luvbug.BENCH_PARAMS, path, workers=1)
+    assert len(reloaded.results) == 4
+    assert reloaded.run(candidates) == results
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import luvbug
+
+
+def zone_state(detector):
+    return [(z.side, z.top, z.bottom, z.entry, z.ob_timestamp, z.age) for z in detector.zones]
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+@pytest.mark.parametrize('entry_level', [0.3, 0.7])
+def test_update_matches_warmup(seed, entry_level):
+    candles = luvbug.synthetic_candles(1500, seed=seed)
+    streamed = luvbug.OrderBlockDetector(entry_level)
+    streamed.warmup(candles[:100])
+    for end in range(101, len(candles) + 1):
+        streamed.update(candles[end - 1])
+        if end % 50 == 0:
+            fresh = luvbug.OrderBlockDetector(entry_level)
+            fresh.warmup(candles[:end])
+            assert zone_state(streamed) == zone_state(fresh), end
+
+
+def test_sync_only_reads_new_bars(candles):
+    detector = luvbug.OrderBlockDetector()
+    detector.sync(candles[:300])
+    before = zone_state(detector)
+    detector.sync(candles[:300])
+    assert zone_state(detector) == before
+
+    detector.sync(candles[:301])
+    fresh = luvbug.OrderBlockDetector()
+    fresh.warmup(candles[:301])
+    assert zone_state(detector) == zone_state(fresh)
+    assert detector.last_timestamp == int(candles[300, luvbug.TS])
+
+
+def test_zones_match_the_backtester_signals(candles):
+    backtester = luvbug.Backtester(dict(luvbug.BENCH_PARAMS, strategy='orderblock'))
+    bars, sides, entries, _ = backtester.orderblock_signals(candles)
+    detector = luvbug.OrderBlockDetector(backtester.ob_entry_level)
+    detector.warmup(candles[:200])
+    live = []
+    for i in range(200, len(candles)):
+        zone = detector.match(candles[i, luvbug.LOW], candles[i, luvbug.HIGH])
+        while zone is not None:
+            live.append((i, 1 if zone.side == 'buy' else -1))
+            detector.consume(zone)
+            zone = detector.match(candles[i, luvbug.LOW], candles[i, luvbug.HIGH])
+        detector.update(candles[i])
+    expected = [(int(b), int(s)) for b, s in zip(bars, sides) if b >= 200]
+    assert set(expected) <= set(live)
+
+
+def test_trend_filter_matches_ema_trend(candles):
+    trend = luvbug.TrendFilter()
+    directions = []
+    for end in range(1, 400):
+        trend.sync(candles[:end])
+        directions.append(trend.direction)
+    np.testing.assert_array_equal(directions, luvbug.ema_trend(candles[:399, luvbug.CLOSE]))
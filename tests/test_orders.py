@@ -0,0 +1,99 @@
+import ccxt
+import pytest
+
+import luvbug
+
+
+class FlakyExchange(luvbug.SimulatedExchange):
+    """create_order 가 주문을 접수한 뒤 응답만 잃는(RequestTimeout) 상황을 흉내 냅니다."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timeouts = {}      # 주문 유형 -> 남은 타임아웃 횟수
+        self.reject = set()     # 항상 거절할 주문 유형
+        self.submitted = []
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        if type in self.reject:
+            raise ccxt.InvalidOrder(f"rejected {type}")
+        order = super().create_order(symbol, type, side, amount, price, params)
+        self.submitted.append(type)
+        if self.timeouts.get(type):
+            self.timeouts[type] -= 1
+            raise ccxt.RequestTimeout(f"timeout {type}")
+        return order
+
+
+@pytest.fixture
+def exchange(candles):
+    return FlakyExchange({'ETC_USDT': candles}, '5m', balance=1000.0, leverage=100,
+                         start_time=int(candles[400, luvbug.TS]))
+
+
+def test_confirm_fill_polls_open_order(make_bot, exchange, setup_for):
+    bot = make_bot(exchange)
+    order = exchange.create_market_order('ETC_USDT', 'buy', 3.0)
+    assert bot.confirm_fill(dict(order, status='open', filled=0.0)) == 3.0
+
+
+def test_confirm_fill_partial_and_canceled(make_bot, exchange):
+    bot = make_bot(exchange)
+    assert bot.confirm_fill({'id': '1', 'status': 'canceled', 'filled': 1.5, 'amount': 3.0}) == 1.5
+    assert bot.confirm_fill({'id': '1', 'status': 'canceled', 'filled': 0.0, 'amount': 3.0}) is None
+    assert bot.confirm_fill({'id': None, 'status': 'open', 'filled': 0.0, 'amount': 3.0}) is None
+
+
+def test_sl_tp_orders_are_placed_for_filled_amount(make_bot, exchange, setup_for):
+    bot = make_bot(exchange)
+    setup = setup_for(exchange)
+    filled = bot.confirm_fill(bot.place_entry_order(setup))
+    assert bot.place_sl_tp_orders(setup, amount=filled)
+
+    open_orders = {o['type']: o for o in exchange.fetch_open_orders('ETC_USDT')}
+    assert set(open_orders) == {'stop_market', 'take_profit_market'}
+    assert open_orders['stop_market']['amount'] == filled
+    assert open_orders['stop_market']['side'] == 'sell'
+    assert setup['orders'] == {'sl': open_orders['stop_market']['id'], 'tp': open_orders['take_profit_market']['id']}
+
+
+def test_failed_stop_loss_closes_position(make_bot, exchange, setup_for):
+    bot = make_bot(exchange)
+    setup = setup_for(exchange)
+    bot.active_setup = setup
+    filled = bot.confirm_fill(bot.place_entry_order(setup))
+    exchange.reject.add('stop_market')
+
+    assert not bot.place_sl_tp_orders(setup, amount=filled)
+    assert bot.get_position_info() is None
+    assert exchange.fetch_open_orders('ETC_USDT') == []
+    assert bot.active_setup is None
+
+
+def test_timeouts_do_not_duplicate_orders(make_bot, exchange, setup_for):
+    bot = make_bot(exchange)
+    setup = setup_for(exchange)
+    exchange.timeouts = {'market': 1, 'stop_market': 1, 'take_profit_market': 2}
+
+    order = bot.place_entry_order(setup)
+    assert order is not None and order['status'] == 'closed'
+    assert bot.place_sl_tp_orders(setup, amount=bot.confirm_fill(order))
+
+    assert sorted(exchange.submitted) == ['market', 'stop_market', 'take_profit_market']
+    assert len(exchange.fetch_open_orders('ETC_USDT')) == 2
+
+
+def test_failed_entry_waits_for_next_bar(make_bot, exchange, monkeypatch):
+    bot = make_bot(exchange)
+    attempts = []
+    monkeypatch.setattr(bot, 'place_entry_order', lambda setup: attempts.append(setup) or None)
+    bars = {}
+    tf_ms = exchange.parse_timeframe('5m') * 1000
+    for _ in range(3000):
+        exchange.advance()
+        before = len(attempts)
+        bot.try_entry()
+        if len(attempts) > before:
+            bar = exchange.milliseconds() // tf_ms
+            assert bar not in bars
+            bars[bar] = True
+    assert attempts, "시그널이 한 번도 나오지 않아 재시도 간격을 확인할 수 없습니다."
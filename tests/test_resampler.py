@@ -0,0 +1,77 @@
+import threading
+
+import numpy as np
+
+import luvbug
+
+H1 = luvbug.timeframe_to_ms('1h')
+
+
+def test_streamed_bars_match_batch_resampling(candles):
+    resampler = luvbug.TimeframeResampler('1h', capacity=400)
+    buf = luvbug.CandleBuffer(capacity=2000)
+    for row in candles[:1200]:
+        # 기본 봉이 미완성 값으로 두 번 덮어써진 뒤 확정된다고 봅니다.
+        for partial in (0.5, 0.8):
+            forming = row.copy()
+            forming[luvbug.HIGH] = row[luvbug.OPEN] + partial * (row[luvbug.HIGH] - row[luvbug.OPEN])
+            forming[luvbug.CLOSE] = forming[luvbug.HIGH]
+            forming[luvbug.LOW] = min(row[luvbug.OPEN], forming[luvbug.HIGH])
+            forming[luvbug.VOLUME] = row[luvbug.VOLUME] * partial
+            buf.merge([forming])
+            resampler.sync(buf.view())
+        buf.merge([row])
+        resampler.sync(buf.view())
+
+    expected = luvbug.resample_candles(candles[:1200], H1)
+    np.testing.assert_allclose(resampler.buffer.view(), expected[-400:])
+
+
+def test_cache_seeds_then_extends_from_base_bars(candles):
+    exchange = luvbug.SimulatedExchange({'ETC_USDT': candles}, '5m', start_time=int(candles[600, luvbug.TS]))
+    cache = luvbug.OHLCVCache(exchange, capacity=500)
+    for _ in range(300):
+        exchange.advance(3)
+        base = cache.update('ETC_USDT', '5m', limit=200).view()
+        higher = cache.resampled('ETC_USDT', '5m', '1h', seed_limit=50).view()
+        np.testing.assert_allclose(higher[-10:], np.asarray(exchange.fetch_ohlcv('ETC_USDT', '1h', limit=10)))
+        np.testing.assert_allclose(higher[-5:], luvbug.resample_candles(base, H1)[-5:])
+
+
+class BlockingExchange(luvbug.SimulatedExchange):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = threading.Event()
+        self.entered = threading.Event()
+        self.seed_calls = 0
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        if timeframe == '1h':
+            self.seed_calls += 1
+            self.entered.set()
+            self.release.wait(5)
+        return super().fetch_ohlcv(symbol, timeframe, since=since, limit=limit, params=params)
+
+
+def test_seed_fetch_does_not_hold_the_cache_lock(candles):
+    exchange = BlockingExchange({'ETC_USDT': candles, 'BTC_USDT': candles}, '5m', start_time=int(candles[600, luvbug.TS]))
+    cache = luvbug.OHLCVCache(exchange)
+    cache.update('ETC_USDT', '5m', limit=100)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.resampled('ETC_USDT', '5m', '1h', seed_limit=20)))
+               for _ in range(2)]
+    for t in threads:
+        t.start()
+    assert exchange.entered.wait(5)
+
+    other = []
+    worker = threading.Thread(target=lambda: other.append(cache.update('BTC_USDT', '5m', limit=50)))
+    worker.start()
+    worker.join(2)
+    assert other, "다른 심볼의 update 가 상위 봉 시드 조회에 막혔습니다."
+
+    exchange.release.set()
+    for t in threads:
+        t.join(5)
+    assert len(results) == 2 and results[0] is results[1]
+    assert cache.resampled('ETC_USDT', '5m', '1h') is results[0]
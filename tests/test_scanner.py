@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import luvbug
+
+
+def rising_candles(n=400, start=100.0, step=0.05):
+    ts = np.arange(n) * 300_000
+    close = start + step * np.arange(n)
+    return np.column_stack([ts, close - step, close + step, close - 2 * step, close, np.ones(n)])
+
+
+@pytest.fixture
+def exchange():
+    candles = rising_candles()
+    return luvbug.SimulatedExchange({'AAA_USDT': candles, 'BBB_USDT': candles * [1, 2, 2, 2, 2, 1]}, '5m',
+                                    balance=10_000.0, fee_rate=0.001, leverage=10, start_time=int(candles[100, 0]))
+
+
+def make_bots(make_bot, exchange, slots):
+    cache = luvbug.SnapshotCache(clock=exchange.seconds)
+    bots = []
+    for symbol in ('AAA_USDT', 'BBB_USDT'):
+        bot = make_bot(exchange, symbol=symbol)
+        bot.account_cache, bot.position_slots = cache, slots
+        bots.append(bot)
+    return bots
+
+
+def enter(bot, monkeypatch):
+    price = bot.exchange.fetch_ticker(bot.symbol)['last']
+    setup = {'side': 'buy', 'entry_price': price, 'sl_price': price * 0.9, 'tp_price': price * 1.5, 'amount': 10.0}
+    monkeypatch.setattr(bot, 'check_for_entry', lambda refresh=True, last_price=None: dict(setup))
+    bot.try_entry()
+
+
+def test_position_slots_limit():
+    slots = luvbug.PositionSlots(limit=1)
+    assert slots.claim('A') and slots.claim('A')
+    assert not slots.available('B') and not slots.claim('B')
+    assert not slots.claim('B', force=True) and slots.owners == {'A', 'B'}
+    slots.release('A')
+    slots.release('B')
+    assert slots.claim('B')
+    unlimited = luvbug.PositionSlots()
+    assert all(unlimited.claim(s) for s in 'ABCDE')
+
+
+def test_each_symbol_can_hold_a_position(make_bot, exchange, monkeypatch):
+    bots = make_bots(make_bot, exchange, luvbug.PositionSlots())
+    for bot in bots:
+        enter(bot, monkeypatch)
+    assert all(bot.get_position_info() for bot in bots)
+
+
+def test_limit_blocks_the_second_symbol(make_bot, exchange, monkeypatch):
+    first, second = make_bots(make_bot, exchange, luvbug.PositionSlots(limit=1))
+    enter(first, monkeypatch)
+    enter(second, monkeypatch)
+    assert first.get_position_info() and second.get_position_info() is None
+
+
+def test_trade_pnl_comes_from_own_fills(make_bot, exchange, monkeypatch):
+    first, second = make_bots(make_bot, exchange, luvbug.PositionSlots())
+    enter(first, monkeypatch)
+    exchange.advance(luvbug.SIM_TICKS_PER_BAR * 20)
+    enter(second, monkeypatch)      # 다른 심볼의 수수료가 잔액을 바꿉니다.
+    exchange.cancel_all_orders('AAA_USDT')
+    exchange.create_market_order('AAA_USDT', 'sell', 10.0, params={'reduce_only': True})
+    first.invalidate_account()
+    first.sync_position()
+
+    own = [t for t in exchange.trades if t['symbol'] == 'AAA_USDT']
+    expected = sum(t['realized_pnl'] - t['fee'] for t in own)
+    assert expected > 0
+    assert first.last_trade_profit == pytest.approx(expected)
+    assert first.active_setup is None and first.position_slots.owners == {'BBB_USDT'}
+
+
+def test_restored_trade_without_fills_uses_balance(make_bot, exchange):
+    bot = make_bot(exchange, symbol='AAA_USDT')
+    bot.active_setup = {'side': 'buy'}
+    bot.balance_at_trade_start = exchange.wallet - 12.5
+    assert bot.closed_trade_pnl() == pytest.approx(12.5)
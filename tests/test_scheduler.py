@@ -0,0 +1,99 @@
+import collections
+
+import numpy as np
+import pytest
+
+import luvbug
+
+TF_MS = 300_000
+
+
+def scheduler(timeframe='5m'):
+    return luvbug.RequestScheduler(timeframe)
+
+
+@pytest.mark.parametrize('timeframe, in_position', [('1m', 30), ('5m', 75), ('1h', 120), ('4h', 120)])
+def test_position_polls_scale_with_the_bar_while_in_position(timeframe, in_position):
+    sched = scheduler(timeframe)
+    assert sched.position_delay(in_position=True) == in_position
+    assert sched.position_delay(in_position=False) == luvbug.SCHED_FLAT_POSITION_INTERVAL
+
+
+def test_far_from_the_trigger_waits_the_idle_interval_but_not_past_the_close():
+    sched = scheduler('1h')
+    assert sched.signal_delay(600_000, distance=3.0) == luvbug.SCHED_IDLE_INTERVAL
+    # 마감 30초 전이면 마감 직후(유예 포함) 캔들 조회 시각에 깨어납니다.
+    assert sched.signal_delay(3_570_000, distance=3.0) == pytest.approx(30 + luvbug.SCHED_CLOSE_GRACE)
+
+
+def test_armed_interval_shrinks_with_distance():
+    sched = scheduler('1h')
+    far = sched.signal_delay(600_000, distance=0.9)
+    near = sched.signal_delay(600_000, distance=0.3)
+    assert luvbug.SCHED_ARMED_INTERVAL <= near < far <= luvbug.SCHED_IDLE_INTERVAL
+    assert sched.signal_delay(600_000, distance=None) == luvbug.SCHED_ARMED_INTERVAL
+
+
+def test_near_close_burst_only_when_hot():
+    sched = scheduler('5m')
+    near_close = 300_000 - 10_000
+    assert sched.signal_delay(near_close, distance=0.1) == luvbug.SCHED_MIN_INTERVAL
+    assert sched.signal_delay(near_close, distance=0.5) == pytest.approx(10 + luvbug.SCHED_CLOSE_GRACE)
+    # hot 이어도 마감 직전 구간 전에는 그 구간이 시작될 때까지 기다립니다.
+    assert sched.signal_delay(250_000, distance=0.1) == pytest.approx(50 - sched.near_window)
+
+
+class CountingExchange(luvbug.SimulatedExchange):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = collections.Counter()
+
+    def fetch_ohlcv(self, *args, **kwargs):
+        self.calls['fetch_ohlcv'] += 1
+        return super().fetch_ohlcv(*args, **kwargs)
+
+    def fetch_ticker(self, *args, **kwargs):
+        self.calls['fetch_ticker'] += 1
+        return super().fetch_ticker(*args, **kwargs)
+
+    def fetch_positions(self, *args, **kwargs):
+        self.calls['fetch_positions'] += 1
+        return super().fetch_positions(*args, **kwargs)
+
+
+def breakout_exchange():
+    flat = [(i * TF_MS, 100, 101, 99, 100, 10.0) for i in range(40)]
+    # 양봉 경로: 시가 100 -> 저가 99.8 -> 고가 103 (직전 고점 101 돌파) -> 종가 102.5
+    rows = np.array(flat + [(40 * TF_MS, 100, 103, 99.8, 102.5, 10.0), (41 * TF_MS, 102.5, 103, 102, 102.5, 10.0)])
+    return CountingExchange({'ETC_USDT': rows}, '5m', balance=1000.0, leverage=100, start_time=40 * TF_MS)
+
+
+def test_mid_bar_polls_use_the_ticker_and_catch_an_intrabar_breakout(make_bot):
+    exchange = breakout_exchange()
+    bot = make_bot(exchange, lookback=5)
+    bot.poll_signal(exchange.milliseconds())
+    assert exchange.calls['fetch_ohlcv'] == 1 and not bot.active_setup
+
+    exchange.advance()      # 저가 구간: 기준가 아래
+    bot.poll_signal(exchange.milliseconds())
+    assert exchange.calls['fetch_ohlcv'] == 1 and exchange.calls['fetch_ticker'] == 1
+    assert not bot.active_setup
+    assert bot.signal_distance() == pytest.approx((101 - 99.8) / 2)
+
+    exchange.advance()      # 고가 구간: 현재가 103 이 직전 고점 101 을 넘습니다.
+    bot.poll_signal(exchange.milliseconds())
+    assert exchange.calls['fetch_ohlcv'] == 1
+    assert bot.active_setup and bot.active_setup['entry_price'] == 103
+    assert bot.active_setup['sl_price'] == pytest.approx(101 * luvbug.SL_BUFFER_RATIO)
+
+
+def test_poll_once_runs_only_the_due_tasks(make_bot):
+    exchange = breakout_exchange()
+    bot = make_bot(exchange, lookback=5)
+    bot.poll_once()
+    assert exchange.calls == {'fetch_positions': 1, 'fetch_ohlcv': 1}
+    delay = bot.next_poll_delay()
+    assert delay <= luvbug.SCHED_ARMED_INTERVAL
+
+    bot.poll_once()         # 시계가 그대로면 아무 작업도 하지 않습니다.
+    assert exchange.calls == {'fetch_positions': 1, 'fetch_ohlcv': 1}
@@ -0,0 +1,116 @@
+import os
+import subprocess
+import sys
+import threading
+import uuid
+
+import numpy as np
+import pytest
+
+import luvbug
+from tests.test_candle_buffer import ScriptedFeed
+
+
+@pytest.fixture
+def ring():
+    ring = luvbug.SharedCandleRing(f"lbtest_{uuid.uuid4().hex[:12]}", capacity=64, create=True)
+    yield ring
+    ring.close()
+    ring.unlink()
+
+
+def test_publish_and_read(ring, candles):
+    seq, rows = ring.read()
+    assert seq == 0 and len(rows) == 0
+    ring.publish(candles[:100])
+    seq, rows = ring.read()
+    assert seq == 2
+    np.testing.assert_array_equal(rows, candles[36:100])
+    np.testing.assert_array_equal(ring.read(10)[1], candles[90:100])
+
+
+def test_reader_attaches_by_name(ring, candles):
+    ring.publish(candles[:20])
+    reader = luvbug.SharedCandleRing(ring.name)
+    try:
+        assert reader.capacity == 64
+        seq, rows = reader.read()
+        assert seq == ring.seq
+        np.testing.assert_array_equal(rows, candles[:20])
+    finally:
+        reader.close()
+
+
+def test_reads_never_see_a_half_written_window(ring):
+    width = len(luvbug.OHLCV_COLUMNS)
+    stop = threading.Event()
+
+    def writer():
+        value = 0.0
+        while not stop.is_set():
+            value += 1.0
+            ring.publish(np.full((64, width), value))
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        reader = luvbug.SharedCandleRing(ring.name)
+        last_seq = 0
+        for _ in range(2000):
+            seq, rows = reader.read()
+            assert seq % 2 == 0 and seq >= last_seq
+            if len(rows):
+                assert (rows == rows[0, 0]).all()
+            last_seq = seq
+        reader.close()
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_shm_name_is_safe():
+    assert luvbug.shm_name('lb', 'ETC/USDT:USDT', '5m') == 'lb_ETC_USDT_USDT_5m'
+
+
+def test_reader_exit_leaves_the_segment_alive(ring, candles):
+    ring.publish(candles[:20])
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    code = f"import luvbug; luvbug.SharedCandleRing({ring.name!r}).close()"
+    subprocess.run([sys.executable, '-c', code], env=env, check=True, timeout=60)
+    reader = luvbug.SharedCandleRing(ring.name)
+    try:
+        np.testing.assert_array_equal(reader.read()[1], candles[:20])
+    finally:
+        reader.close()
+
+
+def test_attach_does_not_patch_the_resource_tracker(ring):
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+    luvbug.SharedCandleRing(ring.name).close()
+    assert resource_tracker.register is register
+
+
+class LateDaemonFeed(ScriptedFeed):
+    """데이터 데몬이 늦게 떠서 처음 몇 번은 스냅샷이 실패하는 피드."""
+
+    def __init__(self, *args, failures=2, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = failures
+
+    def snapshot(self):
+        if self.failures:
+            self.failures -= 1
+            raise FileNotFoundError('no daemon')
+        return super().snapshot()
+
+
+def test_event_loop_retries_the_warmup_snapshot(make_bot, candles, monkeypatch):
+    bot = make_bot()
+    sleeps = []
+    monkeypatch.setattr(luvbug.time, 'sleep', sleeps.append)
+    feed = LateDaemonFeed('ETC_USDT', '5m', candles[:301], [])
+    bot.run_event_driven(feed, position_interval=60)
+
+    assert feed.failures == 0 and len(sleeps) >= 2
+    assert bot.candle_cache.buffer('ETC_USDT', '5m').last_timestamp == candles[300, luvbug.TS]
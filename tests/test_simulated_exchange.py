@@ -0,0 +1,77 @@
+import ccxt
+import numpy as np
+import pytest
+
+import luvbug
+
+TF_MS = 300_000
+
+
+def candles(*ohlc):
+    return np.array([(i * TF_MS, o, h, l, c, 10.0) for i, (o, h, l, c) in enumerate(ohlc)])
+
+
+def make_exchange(rows, contract_size=1.0, fee_rate=0.0, balance=1000.0):
+    return luvbug.SimulatedExchange({'ETC_USDT': rows}, '5m', balance=balance, fee_rate=fee_rate, leverage=10,
+                                    contract_size=contract_size, start_time=TF_MS)
+
+
+def run_bars(exchange, bars):
+    exchange.advance(luvbug.SIM_TICKS_PER_BAR * bars)
+
+
+def test_stop_fills_at_trigger_inside_the_bar():
+    ex = make_exchange(candles((100, 100, 100, 100), (100, 100.5, 99.5, 100), (100, 101, 97, 99)))
+    ex.create_market_order('ETC_USDT', 'buy', 2.0)
+    stop = ex.create_order('ETC_USDT', 'stop_market', 'sell', 2.0, params={'reduce_only': True, 'stopPrice': 98})
+    run_bars(ex, 2)
+    assert ex.fetch_order(stop['id'])['status'] == 'closed'
+    assert ex.fetch_order(stop['id'])['average'] == 98
+    assert ex.wallet == pytest.approx(1000 - 2 * 2)
+
+
+def test_gap_through_the_stop_fills_at_the_open():
+    ex = make_exchange(candles((100, 100, 100, 100), (100, 100.5, 99.5, 100), (95, 96, 94, 95.5)))
+    ex.create_market_order('ETC_USDT', 'buy', 1.0)
+    stop = ex.create_order('ETC_USDT', 'stop_market', 'sell', 1.0, params={'reduce_only': True, 'stopPrice': 98})
+    run_bars(ex, 2)
+    assert ex.fetch_order(stop['id'])['average'] == 95
+
+
+def test_take_profit_cancels_the_stop():
+    ex = make_exchange(candles((100, 100, 100, 100), (100, 100.5, 99.5, 100), (100, 106, 99, 105)))
+    ex.create_market_order('ETC_USDT', 'buy', 1.0)
+    sl = ex.create_order('ETC_USDT', 'stop_market', 'sell', 1.0, params={'reduce_only': True, 'stopPrice': 98})
+    tp = ex.create_order('ETC_USDT', 'take_profit_market', 'sell', 1.0, params={'reduce_only': True, 'stopPrice': 104})
+    run_bars(ex, 2)
+    assert ex.fetch_order(tp['id'])['average'] == 104
+    assert ex.fetch_order(sl['id'])['status'] == 'canceled'
+    assert ex.fetch_positions(['ETC_USDT']) == [] or float(ex.fetch_positions(['ETC_USDT'])[0]['contracts']) == 0
+
+
+def test_amounts_are_contracts():
+    ex = make_exchange(candles((100, 100, 100, 100), (100, 100, 100, 100)), contract_size=0.1, fee_rate=0.001)
+    ex.create_market_order('ETC_USDT', 'buy', 30.0)
+    position = ex.fetch_positions(['ETC_USDT'])[0]
+    assert float(position['contracts']) == 30.0
+    assert ex.fees_paid == pytest.approx(30 * 0.1 * 100 * 0.001)
+    with pytest.raises(ccxt.InsufficientFunds):
+        ex.create_market_order('ETC_USDT', 'buy', 1000.0)     # 1000 x 0.1 x 100 / 10 > 잔액
+
+
+@pytest.mark.parametrize('contract_size', [1.0, 0.01])
+def test_stopped_trade_loses_the_risk_amount_in_sim_and_backtest(contract_size):
+    flat = [(100, 101, 99, 100)] * 8
+    rows = candles(*flat, (100, 102, 100.2, 101.8), (101.8, 101.9, 100.0, 100.1), *flat)
+    params = dict(luvbug.BENCH_PARAMS, symbol='ETC_USDT', rr_ratio=10.0, risk_per_trade_usd=5.0, lookback=5,
+                  contract_size=contract_size)
+
+    trades = luvbug.Backtester(params).run(rows).trades
+    assert len(trades) == 1 and trades[0]['pnl'] == pytest.approx(-5.0)
+
+    runner = luvbug.SimulationRunner(params, rows, warmup=6)
+    runner.run()
+    assert runner.exchange.wallet == pytest.approx(params['initial_capital'] - 5.0)
+    fills = runner.exchange.trades
+    assert fills[0]['amount'] == pytest.approx(luvbug.calc_contract_amount(5.0, fills[0]['price'], 101 * luvbug.SL_BUFFER_RATIO,
+                                                                           contract_size))
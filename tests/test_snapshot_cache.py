@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+import luvbug
+
+
+def test_concurrent_gets_share_one_call():
+    cache = luvbug.SnapshotCache()
+    calls = []
+    gate = threading.Event()
+
+    def loader():
+        calls.append(1)
+        gate.wait(1)
+        return {'total': 42}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('balance', loader, 5))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == [{'total': 42}] * 8
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    cache = luvbug.SnapshotCache()
+    gate = threading.Event()
+
+    def failing():
+        gate.wait(1)
+        raise RuntimeError('boom')
+
+    errors = []
+
+    def worker():
+        try:
+            cache.get('k', failing, 5)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(errors) == 4
+    assert cache.get('k', lambda: 'ok', 5) == 'ok'
+
+
+def test_ttl_and_invalidate():
+    now = [0.0]
+    cache = luvbug.SnapshotCache(clock=lambda: now[0])
+    counter = iter(range(100))
+    assert cache.get('k', lambda: next(counter), ttl=2) == 0
+    now[0] = 1.9
+    assert cache.get('k', lambda: next(counter), ttl=2) == 0
+    now[0] = 2.0
+    assert cache.get('k', lambda: next(counter), ttl=2) == 1
+    cache.invalidate('k')
+    assert cache.get('k', lambda: next(counter), ttl=2) == 2
+
+
+def test_invalidate_during_load_drops_stale_result():
+    cache = luvbug.SnapshotCache()
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(1)
+        return 'stale'
+
+    t = threading.Thread(target=cache.get, args=('k', slow, 5))
+    t.start()
+    started.wait(1)
+    cache.invalidate('k')
+    release.set()
+    t.join()
+    assert cache.get('k', lambda: 'fresh', 5) == 'fresh'
+
+
+@pytest.mark.parametrize('ttl', [0])
+def test_zero_ttl_always_reloads(ttl):
+    cache = luvbug.SnapshotCache()
+    counter = iter(range(10))
+    assert cache.get('k', lambda: next(counter), ttl) == 0
+    assert cache.get('k', lambda: next(counter), ttl) == 1
+
+
+def test_manual_close_sizes_from_a_fresh_position(make_bot, setup_for, monkeypatch):
+    bot = make_bot()
+    exchange = bot.exchange
+    setup = setup_for(exchange)
+    bot.active_setup = setup
+    bot.place_sl_tp_orders(setup, amount=bot.confirm_fill(bot.place_entry_order(setup)))
+    assert float(bot.get_position_info()['contracts']) == 5.0     # 캐시에 5 계약 스냅샷
+
+    exchange.create_market_order('ETC_USDT', 'sell', 2.0, params={'reduce_only': True})   # 캐시 밖의 부분 청산
+    orders = []
+    create = exchange.create_market_order
+    monkeypatch.setattr(exchange, 'create_market_order',
+                        lambda symbol, side, amount, price=None, params=None: orders.append((side, amount, params))
+                        or create(symbol, side, amount, price, params))
+    bot.close_position_market()
+
+    assert orders == [('sell', 3.0, {'reduceOnly': True})]
+    assert bot.get_position_info() is None and exchange.fetch_open_orders('ETC_USDT') == []
+    assert bot.active_setup is None
@@ -0,0 +1,83 @@
+import json
+
+import luvbug
+
+
+def test_replay_restores_state_and_orders(tmp_path):
+    path = str(tmp_path / 'bot.jsonl')
+    journal = luvbug.StateJournal(path)
+    journal.update({'last_trade_profit': 0.0, 'active_setup': None})
+    journal.update({'last_trade_profit': 12.5})
+    journal.record_order('entry', {'id': '1', 'side': 'buy', 'amount': 3.0, 'status': 'closed'})
+    journal.close()
+
+    restored = luvbug.StateJournal(path)
+    assert restored.state == {'last_trade_profit': 12.5, 'active_setup': None}
+    assert [o['order']['id'] for o in restored.orders] == ['1']
+
+
+def test_update_writes_only_changed_fields(tmp_path):
+    journal = luvbug.StateJournal(str(tmp_path / 'bot.jsonl'))
+    assert journal.update({'a': 1, 'b': 2}) == {'a': 1, 'b': 2}
+    assert journal.update({'a': 1, 'b': 3}) == {'b': 3}
+    assert journal.update({'a': 1, 'b': 3}) == {}
+
+
+def test_in_place_edits_of_a_journaled_dict_are_recorded(tmp_path):
+    path = str(tmp_path / 'bot.jsonl')
+    journal = luvbug.StateJournal(path)
+    setup = {'side': 'buy', 'orders': {'entry': '1'}}
+    journal.update({'active_setup': setup})
+    setup['orders']['sl'] = '2'
+    setup['orders']['tp'] = '3'
+    assert journal.update({'active_setup': setup})
+    journal.close()
+
+    assert luvbug.StateJournal(path).state['active_setup']['orders'] == {'entry': '1', 'sl': '2', 'tp': '3'}
+
+
+def test_torn_last_line_is_dropped(tmp_path):
+    path = str(tmp_path / 'bot.jsonl')
+    journal = luvbug.StateJournal(path)
+    journal.update({'a': 1})
+    journal.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"t": 1, "kind": "state", "state": {"a": ')
+
+    journal = luvbug.StateJournal(path)
+    assert journal.state == {'a': 1}
+    journal.update({'a': 2})
+    journal.close()
+    assert luvbug.StateJournal(path).state == {'a': 2}
+
+
+def test_compaction_keeps_latest_state(tmp_path):
+    path = str(tmp_path / 'bot.jsonl')
+    journal = luvbug.StateJournal(path, snapshot_every=10)
+    for i in range(95):
+        journal.update({'n': i, 'fixed': 'x'})
+    journal.close()
+
+    with open(path, encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) < 10
+    assert lines[0]['kind'] == 'snapshot'
+    assert luvbug.StateJournal(path).state == {'n': 94, 'fixed': 'x'}
+
+
+def test_bot_recovers_protective_order_ids_after_restart(make_bot, setup_for):
+    bot = make_bot()
+    setup = setup_for(bot.exchange)
+    bot.active_setup = setup
+    order = bot.place_entry_order(setup)
+    with bot.journal.batch():
+        bot.journal_order('entry', order)
+        setup['orders'] = {'entry': order['id']}
+        bot.save_state()
+    assert bot.place_sl_tp_orders(setup, amount=bot.confirm_fill(order))
+    bot.save_state(durable=True)
+    bot.journal.close()
+
+    restarted = make_bot(exchange=bot.exchange)
+    assert set(restarted.active_setup['orders']) == {'entry', 'sl', 'tp'}
+    assert restarted.reconcile() is not None